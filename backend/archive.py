@@ -0,0 +1,330 @@
+"""Archival of old consultations to compressed monthly files.
+
+Almost every read touches recent months, yet ``consultations`` and its
+indexes grow forever. The archival job moves consultations dated before the
+month that was current ``ARCHIVE_AFTER_DAYS`` ago out of the hot table into
+one SQLite file per month in ``ARCHIVE_DIR``
+(``consultations-2023-04.db``), with the treatment notes zlib-compressed.
+``consultation_archives`` keeps one manifest row per file: its month, row
+count, ID range and size.
+
+Each batch is written to its archive files and committed there first; only
+then are the rows deleted from ``consultations`` and the manifest updated,
+in one transaction. A crash in between leaves the rows in both places until
+the next run (which also runs at startup) copies them again, replacing the
+earlier copies, and deletes them. Reads check the hot table first, so a
+consultation is never lost and never served twice by ``get``.
+
+Archived consultations leave the list, search, per-code lists and counts
+and the change feed (as deletes). The dashboard rollups keep counting them:
+the job adds them back before deleting, so analytics still cover every
+month (``python rollups.py`` recounts from the hot table only).
+``GET /api/consultation/{id}`` and the export read the archives when called
+with ``include_archived=true``.
+
+Run one pass by hand with::
+
+    python archive.py --after-days 365
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import zlib
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import bindparam, delete, select, text
+from sqlalchemy.orm import Session
+
+import config
+from cache import consultation_key, invalidate_consultation_lists, result_cache
+from diagnosis_tree import diagnosis_tree
+from models import Consultation, ConsultationArchive
+from rollups import rollups_supported
+
+logger = logging.getLogger("cliniccare.archive")
+
+# Archives are written once and read rarely: favour size over speed
+COMPRESSION_LEVEL = 9
+
+ARCHIVE_FIELDS = (
+    "id",
+    "patient_name",
+    "diagnosis_codes",
+    "treatment_notes",
+    "consultation_date",
+    "created_at",
+)
+ARCHIVE_COLUMNS = tuple(getattr(Consultation, field) for field in ARCHIVE_FIELDS)
+
+ARCHIVE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS consultations (
+        id INTEGER PRIMARY KEY,
+        patient_name TEXT NOT NULL,
+        diagnosis_codes TEXT NOT NULL,
+        treatment_notes BLOB NOT NULL,
+        consultation_date TEXT,
+        created_at TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_consultations_date_id ON consultations (consultation_date, id)",
+]
+
+# Added to the rollups before the archived rows are deleted, cancelling
+# out what the delete triggers subtract
+KEEP_IN_ROLLUPS = [
+    text("""
+        INSERT INTO daily_consultation_counts (day, count)
+        SELECT date(consultation_date), COUNT(*) FROM consultations
+        WHERE id IN :ids
+        GROUP BY date(consultation_date)
+        ON CONFLICT(day) DO UPDATE SET count = count + excluded.count
+    """).bindparams(bindparam("ids", expanding=True)),
+    text("""
+        INSERT INTO daily_diagnosis_counts (day, code, count)
+        SELECT date(consultation_date), code, COUNT(*) FROM consultation_diagnoses
+        WHERE consultation_id IN :ids
+        GROUP BY date(consultation_date), code
+        ON CONFLICT(day, code) DO UPDATE SET count = count + excluded.count
+    """).bindparams(bindparam("ids", expanding=True)),
+]
+
+
+def month_of(value: datetime) -> str:
+    return value.strftime("%Y-%m")
+
+
+def month_bounds(month: str):
+    """First moment of ``month`` and of the month after it."""
+    start = datetime.strptime(month, "%Y-%m")
+    following = (start + timedelta(days=32)).replace(day=1)
+    return start, following
+
+
+def archive_cutoff(now: datetime, archive_after_days: float) -> datetime:
+    """Start of the month ``archive_after_days`` before ``now``.
+
+    Only whole months are archived, so each file is written in one go
+    rather than a few rows every day.
+    """
+    horizon = now - timedelta(days=archive_after_days)
+    return horizon.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def archive_file_name(month: str) -> str:
+    return f"consultations-{month}.db"
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    # Fixed width, so the text sorts like the datetime
+    return value.isoformat(sep=" ", timespec="microseconds") if value else None
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def write_archive(path: str, rows: Sequence) -> tuple:
+    """Add ``rows`` to the archive file at ``path`` and commit.
+
+    Rows already in the file (from an interrupted run) are replaced.
+    Returns the file's row count, lowest and highest ID.
+    """
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            for ddl in ARCHIVE_SCHEMA:
+                conn.execute(ddl)
+            conn.executemany(
+                "INSERT OR REPLACE INTO consultations VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        row.id,
+                        row.patient_name,
+                        json.dumps(row.diagnosis_codes),
+                        zlib.compress(row.treatment_notes.encode("utf-8"), COMPRESSION_LEVEL),
+                        _timestamp(row.consultation_date),
+                        _timestamp(row.created_at),
+                    )
+                    for row in rows
+                ]
+            )
+        return conn.execute("SELECT COUNT(*), MIN(id), MAX(id) FROM consultations").fetchone()
+    finally:
+        conn.close()
+
+
+def archive_consultations(session_factory: Callable[[], Session], archive_dir: str,
+                          before: datetime, batch_size: int = 500) -> int:
+    """Move live consultations dated before ``before`` into monthly archives.
+
+    Works in batches of ``batch_size`` rows, one short transaction each.
+    Returns the number of consultations archived.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    archived = 0
+    while True:
+        with session_factory() as db:
+            rows = db.execute(
+                select(*ARCHIVE_COLUMNS)
+                .where(Consultation.consultation_date < before, Consultation.deleted_at.is_(None))
+                .order_by(Consultation.consultation_date, Consultation.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return archived
+
+            by_month = {}
+            for row in rows:
+                by_month.setdefault(month_of(row.consultation_date), []).append(row)
+            for month, month_rows in by_month.items():
+                name = archive_file_name(month)
+                path = os.path.join(archive_dir, name)
+                row_count, min_id, max_id = write_archive(path, month_rows)
+                db.merge(ConsultationArchive(
+                    month=month,
+                    path=name,
+                    row_count=row_count,
+                    min_id=min_id,
+                    max_id=max_id,
+                    size_bytes=os.path.getsize(path),
+                    archived_at=datetime.utcnow()
+                ))
+
+            ids = [row.id for row in rows]
+            if rollups_supported(db.get_bind()):
+                for statement in KEEP_IN_ROLLUPS:
+                    db.execute(statement, {"ids": ids})
+            db.execute(
+                delete(Consultation)
+                .where(Consultation.id.in_(ids))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+
+        for consultation_id in ids:
+            result_cache.delete(consultation_key(consultation_id))
+        invalidate_consultation_lists()
+        diagnosis_tree.expire_usage()
+        archived += len(rows)
+
+
+def _open_archive(archive_dir: str, name: str) -> sqlite3.Connection:
+    path = os.path.abspath(os.path.join(archive_dir, name))
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def _archived_row(row: tuple) -> dict:
+    consultation_id, patient_name, codes, notes, consultation_date, created_at = row
+    return {
+        "id": consultation_id,
+        "patient_name": patient_name,
+        "diagnosis_codes": json.loads(codes),
+        "treatment_notes": zlib.decompress(notes).decode("utf-8"),
+        "consultation_date": _parse_timestamp(consultation_date),
+        "created_at": _parse_timestamp(created_at),
+    }
+
+
+def find_archived_consultation(db: Session, archive_dir: str,
+                               consultation_id: int) -> Optional[dict]:
+    """An archived consultation by ID, or None.
+
+    Only the files whose ID range covers the ID are opened, newest first.
+    """
+    names = db.scalars(
+        select(ConsultationArchive.path)
+        .where(ConsultationArchive.min_id <= consultation_id,
+               ConsultationArchive.max_id >= consultation_id)
+        .order_by(ConsultationArchive.month.desc())
+    ).all()
+    for name in names:
+        conn = _open_archive(archive_dir, name)
+        try:
+            row = conn.execute(
+                "SELECT * FROM consultations WHERE id = ?", (consultation_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is not None:
+            return _archived_row(row)
+    return None
+
+
+def iter_archived_rows(session_factory: Callable[[], Session], archive_dir: str,
+                       start: Optional[datetime] = None,
+                       end: Optional[datetime] = None) -> Iterator[dict]:
+    """Yield archived consultations in date order, like ``iter_consultation_rows``."""
+    db = session_factory()
+    try:
+        archives: List[ConsultationArchive] = db.scalars(
+            select(ConsultationArchive).order_by(ConsultationArchive.month)
+        ).all()
+    finally:
+        db.close()
+
+    for archive in archives:
+        month_start, month_end = month_bounds(archive.month)
+        if (start and month_end <= start) or (end and month_start >= end):
+            continue
+        conn = _open_archive(archive_dir, archive.path)
+        try:
+            cursor = conn.execute(
+                "SELECT * FROM consultations "
+                "WHERE consultation_date >= ? AND consultation_date < ? "
+                "ORDER BY consultation_date, id",
+                (_timestamp(max(start or month_start, month_start)),
+                 _timestamp(min(end or month_end, month_end)))
+            )
+            for row in cursor:
+                yield _archived_row(row)
+        finally:
+            conn.close()
+
+
+async def archive_periodically(session_factory: Callable[[], Session], archive_dir: str,
+                               interval: float, archive_after_days: float,
+                               batch_size: int) -> None:
+    """Run ``archive_consultations`` every ``interval`` seconds until cancelled.
+
+    The job writes files and uses a sync session, so it runs in a thread.
+    """
+    while True:
+        try:
+            archived = await asyncio.to_thread(
+                archive_consultations,
+                session_factory,
+                archive_dir,
+                archive_cutoff(datetime.utcnow(), archive_after_days),
+                batch_size
+            )
+            if archived:
+                logger.info("Archived %d consultations", archived)
+        except Exception:
+            logger.exception("Archiving consultations failed")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    from database import engine, Base, SessionLocal
+    from migrations import run_migrations
+
+    parser = argparse.ArgumentParser(description="Archive old consultations once")
+    parser.add_argument("--after-days", type=float, default=config.ARCHIVE_AFTER_DAYS,
+                        help="Archive whole months older than this many days")
+    parser.add_argument("--batch-size", type=int, default=config.ARCHIVE_BATCH_SIZE,
+                        help="Consultations per transaction")
+    args = parser.parse_args()
+    if args.after_days <= 0:
+        parser.error("--after-days (or ARCHIVE_AFTER_DAYS) must be positive")
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    cutoff = archive_cutoff(datetime.utcnow(), args.after_days)
+    count = archive_consultations(SessionLocal, config.ARCHIVE_DIR, cutoff, args.batch_size)
+    print(f"Archived {count} consultations dated before {cutoff:%Y-%m-%d} to {config.ARCHIVE_DIR}")
@@ -0,0 +1,4 @@
+"""Benchmarks for the ClinicCare API.
+
+Run from the backend directory, e.g. ``python -m benchmarks.concurrency``.
+"""
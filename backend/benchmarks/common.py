@@ -0,0 +1,119 @@
+"""Shared helpers for the HTTP benchmarks: a threaded load driver and
+latency statistics reported as JSON."""
+
+import http.client
+import json
+import statistics
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+# A request factory returns (method, path, body) for the i-th request.
+RequestFactory = Callable[[int], tuple]
+
+# Optional callback receiving (i, status, body bytes) for every response.
+ResponseHandler = Callable[[int, int, bytes], None]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    """Latency percentiles (milliseconds) and throughput for one scenario."""
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+def run_load(
+    base_url: str,
+    make_request: RequestFactory,
+    concurrency: int = 16,
+    requests_per_client: int = 100,
+    headers: Optional[Dict[str, str]] = None,
+    on_response: Optional[ResponseHandler] = None
+) -> Dict[str, float]:
+    """Drive ``concurrency`` keep-alive clients, each sending
+    ``requests_per_client`` requests, and return the latency summary."""
+    url = urlsplit(base_url)
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    headers = {"Content-Type": "application/json", **(headers or {})}
+
+    def client(client_id: int) -> None:
+        conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+        local: List[float] = []
+        failed = 0
+        for i in range(requests_per_client):
+            index = client_id * requests_per_client + i
+            method, path, body = make_request(index)
+            payload = json.dumps(body) if body is not None else None
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                if on_response is not None:
+                    on_response(index, response.status, data)
+                if response.status >= 400:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+                continue
+            local.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], time.perf_counter() - started)
+
+
+def wait_for_server(base_url: str, timeout: float = 15.0) -> None:
+    """Block until the API answers its health check."""
+    url = urlsplit(base_url)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=2)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def write_report(report: dict, path: Optional[str]) -> None:
+    """Print the report as JSON and optionally save it for later comparison."""
+    text = json.dumps(report, indent=2)
+    print(text)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
@@ -0,0 +1,56 @@
+"""Compare two benchmark reports scenario by scenario.
+
+::
+
+    python -m benchmarks.compare before.json after.json
+
+Prints throughput and latency percentiles side by side with the relative
+change; lower latency and higher throughput are improvements.
+"""
+
+import argparse
+import json
+
+COLUMNS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "errors")
+
+
+def change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def compare(before: dict, after: dict) -> str:
+    rows = [("scenario", "metric", "before", "after", "change")]
+    for name, old in before.get("scenarios", {}).items():
+        new = after.get("scenarios", {}).get(name)
+        if new is None:
+            continue
+        for column in COLUMNS:
+            rows.append((name, column, str(old[column]), str(new[column]),
+                         change(old[column], new[column])))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+        for row in rows
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    for label, report in (("before", before), ("after", after)):
+        meta = report.get("meta", {})
+        print(f"{label}: {meta.get('git_commit', '?')} at {meta.get('timestamp', '?')}")
+    print(compare(before, after))
+
+
+if __name__ == "__main__":
+    main()
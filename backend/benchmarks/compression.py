@@ -0,0 +1,76 @@
+"""Bytes on the wire and latency of list pages per content encoding.
+
+Seeds a scratch database, starts the API on it and fetches list pages of
+each size with every encoding::
+
+    python -m benchmarks.compression --limits 100 500 --output compression.json
+
+Loopback latency hides transfer time, so the report also estimates it for
+a ``--bandwidth-mbps`` link from the measured body size.
+"""
+
+import argparse
+import os
+import tempfile
+
+from benchmarks.common import run_load, wait_for_server, write_report
+from benchmarks.seed import seed_database
+from benchmarks.suite import free_port, start_server
+
+ENCODINGS = ("identity", "gzip", "br")
+
+
+def measure(base_url: str, limit: int, encoding: str, args) -> dict:
+    sizes = []
+
+    def record(i, status, body):
+        sizes.append(len(body))
+
+    summary = run_load(
+        base_url,
+        lambda i: ("GET", f"/api/consultations?limit={limit}&include_total=false", None),
+        args.concurrency, args.requests,
+        headers={"Accept-Encoding": encoding},
+        on_response=record
+    )
+    body_bytes = max(sizes) if sizes else 0
+    return {
+        "body_bytes": body_bytes,
+        "est_transfer_ms": round(body_bytes * 8 / (args.bandwidth_mbps * 1000), 2),
+        **summary,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limits", type=int, nargs="+", default=[100, 500], help="Page sizes")
+    parser.add_argument("--consultations", type=int, default=5000, help="Rows in the scratch database")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per client")
+    parser.add_argument("--bandwidth-mbps", type=float, default=20.0,
+                        help="Link speed for the transfer time estimate")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "compression.db")
+        seed_database(path, args.consultations, code_count=1000)
+        port = free_port()
+        server = start_server(path, port)
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            wait_for_server(base_url, timeout=60)
+            for limit in args.limits:
+                results[f"limit_{limit}"] = {
+                    encoding: measure(base_url, limit, encoding, args) for encoding in ENCODINGS
+                }
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    write_report({"bandwidth_mbps": args.bandwidth_mbps, "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Concurrent throughput of the consultation and diagnosis endpoints.
+
+Start the API first (``uvicorn main:app --port 8000``), then run::
+
+    python -m benchmarks.concurrency --concurrency 32 --output after.json
+
+Run it against two builds and compare the JSON reports. The ``mixed``
+scenario interleaves heavy list pages with single-record reads, which is
+where handlers that block the event loop hurt the most.
+"""
+
+import argparse
+import http.client
+import json
+import random
+from urllib.parse import urlsplit
+
+from benchmarks.common import run_load, wait_for_server, write_report
+
+CODES = ["A09", "A90", "A01.0", "B20", "A41.9", "B34.9"]
+
+
+def seed(base_url: str, count: int) -> int:
+    """Create ``count`` consultations and return the highest id."""
+    url = urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80)
+    last_id = 0
+    for i in range(count):
+        body = {
+            "patient_name": f"Benchmark Patient {i}",
+            "diagnosis_codes": random.sample(CODES, 2),
+            "treatment_notes": "Benchmark consultation. " * 20,
+        }
+        conn.request("POST", "/api/consultation", body=json.dumps(body),
+                     headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        last_id = json.loads(response.read())["id"]
+    conn.close()
+    return last_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per client")
+    parser.add_argument("--seed", type=int, default=500, help="Consultations to create first")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    wait_for_server(args.base_url)
+    max_id = seed(args.base_url, args.seed)
+    min_id = max(1, max_id - args.seed + 1)
+
+    def get_one(i):
+        return "GET", f"/api/consultation/{random.randint(min_id, max_id)}", None
+
+    def list_page(i):
+        return "GET", "/api/consultations?limit=50", None
+
+    def search(i):
+        return "GET", f"/api/diagnosis?search={random.choice(['a0', 'fever', 'sepsis', 'b'])}", None
+
+    def create(i):
+        return "POST", "/api/consultation", {
+            "patient_name": f"Load Patient {i}",
+            "diagnosis_codes": random.sample(CODES, 2),
+            "treatment_notes": "Created by the load benchmark.",
+        }
+
+    def mixed(i):
+        if i % 4 == 0:
+            return "GET", "/api/consultations?limit=500", None
+        return get_one(i)
+
+    scenarios = {
+        "get_consultation": get_one,
+        "list_consultations": list_page,
+        "diagnosis_search": search,
+        "create_consultation": create,
+        "mixed_heavy_list_and_get": mixed,
+    }
+    report = {
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "requests_per_client": args.requests,
+        "scenarios": {
+            name: run_load(args.base_url, factory, args.concurrency, args.requests)
+            for name, factory in scenarios.items()
+        },
+    }
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Mixed read/write load against each SQLite engine profile.
+
+Runs in-process against a scratch database per profile, so no server is
+needed::
+
+    python -m benchmarks.mixed_read_write --readers 16 --writers 4 --output profiles.json
+
+Reader threads alternate between a 50-row list page and a single-record
+lookup while writer threads insert consultations one transaction at a
+time, the same statements the API issues. Under the rollback journal
+every commit locks readers out; under WAL they keep going.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from benchmarks.common import summarize, write_report
+from database import Base, SQLITE_PROFILES, create_db_engine, sqlite_pragmas
+from migrations import run_migrations
+from models import Consultation
+
+CODES = ["A09", "A90", "A01.0", "B20", "A41.9", "B34.9"]
+NOTES = "Benchmark consultation. " * 20
+
+
+def seed(engine, count: int) -> None:
+    """Insert ``count`` consultations in one transaction."""
+    now = datetime.utcnow()
+    rows = [
+        {
+            "patient_name": f"Benchmark Patient {i}",
+            "diagnosis_codes": random.sample(CODES, 2),
+            "treatment_notes": NOTES,
+            "consultation_date": now - timedelta(minutes=i),
+            "created_at": now,
+        }
+        for i in range(count)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(Consultation), rows)
+
+
+def run_profile(profile: str, args) -> dict:
+    """Seed a fresh database and run readers and writers side by side."""
+    directory = tempfile.mkdtemp(prefix=f"cliniccare-{profile}-")
+    engine = create_db_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", profile)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    seed(engine, args.seed)
+
+    deadline = time.perf_counter() + args.duration
+    results = {"reads": ([], [0]), "writes": ([], [0])}
+    lock = threading.Lock()
+
+    list_page = (
+        select(Consultation)
+        .order_by(Consultation.consultation_date.desc(), Consultation.id.desc())
+        .limit(50)
+    )
+
+    def reader(n: int) -> None:
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    if n % 2:
+                        conn.execute(list_page).all()
+                    else:
+                        conn.execute(
+                            select(Consultation).where(
+                                Consultation.id == random.randint(1, args.seed)
+                            )
+                        ).first()
+            except Exception:
+                failed += 1
+                continue
+            local.append(time.perf_counter() - started)
+        with lock:
+            results["reads"][0].extend(local)
+            results["reads"][1][0] += failed
+
+    def writer(n: int) -> None:
+        local, failed = [], 0
+        i = 0
+        while time.perf_counter() < deadline:
+            i += 1
+            started = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(Consultation).values(
+                        patient_name=f"Writer {n} Patient {i}",
+                        diagnosis_codes=random.sample(CODES, 2),
+                        treatment_notes=NOTES,
+                        consultation_date=datetime.utcnow(),
+                        created_at=datetime.utcnow(),
+                    ))
+            except Exception:
+                failed += 1
+                continue
+            local.append(time.perf_counter() - started)
+        with lock:
+            results["writes"][0].extend(local)
+            results["writes"][1][0] += failed
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    return {
+        "pragmas": sqlite_pragmas(profile),
+        **{
+            kind: summarize(latencies, failed[0], elapsed)
+            for kind, (latencies, failed) in results.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", default=list(SQLITE_PROFILES),
+                        choices=list(SQLITE_PROFILES))
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per profile")
+    parser.add_argument("--seed", type=int, default=20000, help="Consultations to create first")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = {
+        "readers": args.readers,
+        "writers": args.writers,
+        "duration_s": args.duration,
+        "seed": args.seed,
+        "profiles": {profile: run_profile(profile, args) for profile in args.profiles},
+    }
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
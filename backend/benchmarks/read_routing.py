@@ -0,0 +1,166 @@
+"""Read throughput while writes are running, with and without a read pool.
+
+Seeds one database, then for each mode starts the API on a fresh copy of
+it::
+
+    python -m benchmarks.read_routing --consultations 20000 --output read_routing.json
+
+- ``shared``: the default, reads and writes share one pool;
+- ``read_pool``: ``READ_ONLY_POOL=1``, GET requests use a read-only pool
+  on the WAL file. Both pools hold 4 connections: SQLite runs one write
+  at a time, so queued writes wait in the pool instead of polling for the
+  write lock, and reads always have connections of their own.
+
+Writer clients create consultations back to back while reader clients
+page through lists, per-code lists and full-text search. With
+``--hold-lock-ms`` a background connection also takes the write lock for
+that long every second, as an import batch or purge does; creates then
+wait for the lock while holding pooled connections. The report has one
+read and one write summary per mode.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.common import run_load, summarize, wait_for_server, write_report
+from benchmarks.seed import WORDS, seed_database
+from benchmarks.suite import free_port, start_server
+
+MODES = {
+    "shared": {"READ_ONLY_POOL": "0"},
+    "read_pool": {"READ_ONLY_POOL": "1", "DB_POOL_SIZE": "4", "DB_MAX_OVERFLOW": "0"},
+}
+CODES = ["A09", "A00.1", "A01.0", "B20", "A41.9", "B34.9"]
+
+
+def write_continuously(base_url: str, stop: threading.Event, results: list) -> None:
+    """Create consultations one after another until ``stop`` is set."""
+    url = urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=60)
+    latencies, errors = [], 0
+    rng = random.Random()
+    while not stop.is_set():
+        body = json.dumps({
+            "patient_name": f"Writer {rng.randint(1, 10 ** 6)}",
+            "diagnosis_codes": rng.sample(CODES, 2),
+            "treatment_notes": " ".join(rng.choices(WORDS, k=40)),
+        })
+        started = time.perf_counter()
+        try:
+            conn.request("POST", "/api/consultation", body=body,
+                         headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(url.hostname, url.port, timeout=60)
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+    results.append((latencies, errors))
+
+
+def hold_write_lock(db_path: str, hold: float, stop: threading.Event) -> None:
+    """Take the write lock for ``hold`` seconds once a second until ``stop``."""
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    while not stop.wait(1.0 - hold):
+        conn.execute("BEGIN IMMEDIATE")
+        time.sleep(hold)
+        conn.execute("COMMIT")
+    conn.close()
+
+
+def run_mode(db_path: str, env: dict, args) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(db_path, port, env)
+    try:
+        wait_for_server(base_url, timeout=120)
+        rng = random.Random(args.seed)
+
+        def read(i):
+            kind = i % 3
+            if kind == 0:
+                return "GET", f"/api/consultations?limit=50&skip={rng.randint(0, 5000)}&include_total=false", None
+            if kind == 1:
+                return "GET", f"/api/diagnosis/{rng.choice(CODES)}/consultations?limit=50&include_total=false", None
+            return "GET", f"/api/search?q={rng.choice(WORDS)}&limit=20", None
+
+        run_load(base_url, read, 1, args.warmup)
+
+        stop = threading.Event()
+        write_results = []
+        writers = [
+            threading.Thread(target=write_continuously, args=(base_url, stop, write_results))
+            for _ in range(args.writers)
+        ]
+        if args.hold_lock_ms:
+            writers.append(threading.Thread(
+                target=hold_write_lock, args=(db_path, args.hold_lock_ms / 1000, stop)
+            ))
+        started = time.perf_counter()
+        for writer in writers:
+            writer.start()
+        try:
+            reads = run_load(base_url, read, args.readers, args.requests)
+        finally:
+            stop.set()
+            for writer in writers:
+                writer.join()
+        elapsed = time.perf_counter() - started
+
+        latencies = [value for values, _ in write_results for value in values]
+        errors = sum(failed for _, failed in write_results)
+        return {"reads": reads, "writes": summarize(latencies, errors, elapsed)}
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--consultations", type=int, default=20000, help="Rows in the seeded database")
+    parser.add_argument("--readers", type=int, default=16, help="Concurrent reader clients")
+    parser.add_argument("--writers", type=int, default=16, help="Concurrent writer clients")
+    parser.add_argument("--requests", type=int, default=100, help="Reads per reader client")
+    parser.add_argument("--hold-lock-ms", type=float, default=0,
+                        help="Hold the write lock this long every second (0 = never)")
+    parser.add_argument("--warmup", type=int, default=30, help="Sequential warm-up reads per mode")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        seeded = os.path.join(workdir, "seeded.db")
+        seed_database(seeded, args.consultations, code_count=1000, seed=args.seed)
+        for mode in args.modes:
+            path = os.path.join(workdir, f"{mode}.db")
+            shutil.copyfile(seeded, path)
+            results[mode] = run_mode(path, MODES[mode], args)
+
+    write_report({
+        "consultations": args.consultations,
+        "readers": args.readers,
+        "writers": args.writers,
+        "hold_lock_ms": args.hold_lock_ms,
+        "modes": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Seed a synthetic ClinicCare database at a chosen scale.
+
+::
+
+    python -m benchmarks.seed --db bench-100k.db --consultations 100000
+
+Rows are generated from a fixed random seed, so two runs at the same scale
+produce the same data. The load is fast because it skips the per-row ORM
+path: tables are created without their secondary indexes, rows go in with
+``executemany`` straight through the driver, and ``run_migrations`` then
+builds the indexes, link table, counters, rollups and FTS index in
+set-based passes instead of firing triggers row by row.
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Iterator, List, Tuple
+
+from sqlalchemy import text
+
+from database import Base, create_db_engine
+from init_db import ICD10_CODES
+from migrations import run_migrations
+from models import Consultation, ConsultationDiagnosis
+
+# The 2024 ICD-10-CM release has about 74k codes
+FULL_CODE_SET = 74000
+BATCH_SIZE = 10000
+SQLITE_DATETIME = "%Y-%m-%d %H:%M:%S.%f"
+
+CHAPTER_LETTERS = "ABCDEFGHIJKLMNOPQRSTVWXYZ"
+WORDS = (
+    "acute chronic infection fever viral bacterial unspecified pain fracture "
+    "syndrome disorder disease lesion injury inflammation deficiency stenosis "
+    "neoplasm malignant benign left right upper lower limb chest abdominal "
+    "respiratory cardiac renal hepatic gastric intestinal skin joint spine "
+    "with without complication recurrent episode mild moderate severe "
+    "diabetes hypertension asthma pneumonia dengue typhoid cholera sepsis "
+    "migraine anemia obesity arthritis dermatitis bronchitis gastroenteritis"
+).split()
+FIRST_NAMES = (
+    "Aisha Ahmad Alice Amir Ben Chen Daniel Deepa Elena Farah Grace Hana "
+    "Ibrahim Ivan James Jia Karim Kumar Lina Maria Mei Nadia Omar Priya "
+    "Rahul Sara Siti Tan Wei Yusuf Zara"
+).split()
+LAST_NAMES = (
+    "Abdullah Ali Chan Chong Das Fernandez Goh Hassan Ibrahim Khan Lee Lim "
+    "Martin Menon Nair Ng Ong Patel Rahman Raj Singh Smith Tan Teo Wong Yusof"
+).split()
+
+
+def generate_codes(count: int, rng: random.Random) -> List[Tuple[str, str]]:
+    """The real sample codes first, then synthetic ICD-10-shaped ones."""
+    codes = list(ICD10_CODES[:count])
+    seen = {code for code, _ in codes}
+
+    def synthetic() -> Iterator[str]:
+        for letter in CHAPTER_LETTERS:
+            for number in range(100):
+                category = f"{letter}{number:02d}"
+                yield category
+                for sub in range(10):
+                    yield f"{category}.{sub}"
+                    for extension in range(10):
+                        yield f"{category}.{sub}{extension}"
+
+    for code in synthetic():
+        if len(codes) >= count:
+            break
+        if code not in seen:
+            seen.add(code)
+            codes.append((code, " ".join(rng.sample(WORDS, rng.randint(2, 7))).capitalize()))
+    return codes
+
+
+def generate_consultations(count: int, codes: List[str], days: int,
+                           rng: random.Random) -> Iterator[tuple]:
+    """Consultation rows as driver parameters, spread over ``days`` days."""
+    now = datetime(2025, 1, 1)
+    # A realistic skew: a few hundred codes account for most visits
+    common = codes[:min(len(codes), 500)]
+    for _ in range(count):
+        pool = common if rng.random() < 0.8 else codes
+        diagnosis_codes = rng.sample(pool, rng.randint(1, 3))
+        date = now - timedelta(seconds=rng.randint(0, days * 86400))
+        notes = " ".join(rng.choices(WORDS, k=rng.randint(15, 80))).capitalize() + "."
+        yield (
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.randint(1, 999)}",
+            json.dumps(diagnosis_codes),
+            notes,
+            date.strftime(SQLITE_DATETIME),
+            date.strftime(SQLITE_DATETIME),
+        )
+
+
+def seed_database(path: str, consultations: int, code_count: int = FULL_CODE_SET,
+                  days: int = 3 * 365, seed: int = 42) -> dict:
+    """Create ``path`` from scratch and fill it. Returns timing figures."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    rng = random.Random(seed)
+    engine = create_db_engine(f"sqlite:///{path}", "production")
+    Base.metadata.create_all(bind=engine)
+    timings = {}
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        # Indexes are rebuilt by run_migrations once the data is in
+        for table in (Consultation.__table__, ConsultationDiagnosis.__table__):
+            for index in table.indexes:
+                index.drop(bind=conn)
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+
+        codes = generate_codes(code_count, rng)
+        conn.exec_driver_sql(
+            "INSERT INTO diagnosis_codes (code, description) VALUES (?, ?)", codes
+        )
+        rows = generate_consultations(consultations, [code for code, _ in codes], days, rng)
+        while True:
+            batch = list(islice(rows, BATCH_SIZE))
+            if not batch:
+                break
+            conn.exec_driver_sql(
+                "INSERT INTO consultations (patient_name, diagnosis_codes, treatment_notes, "
+                "consultation_date, created_at) VALUES (?, ?, ?, ?, ?)",
+                batch
+            )
+    timings["insert_s"] = round(time.perf_counter() - started, 2)
+
+    started = time.perf_counter()
+    run_migrations(engine)
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+    timings["derive_s"] = round(time.perf_counter() - started, 2)
+    engine.dispose()
+
+    total = timings["insert_s"] + timings["derive_s"]
+    return {
+        "path": path,
+        "consultations": consultations,
+        "diagnosis_codes": len(codes),
+        **timings,
+        "rows_per_s": round(consultations / total) if total else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="bench.db", help="SQLite file to (re)create")
+    parser.add_argument("--consultations", type=int, default=100000)
+    parser.add_argument("--codes", type=int, default=FULL_CODE_SET, help="Diagnosis codes to create")
+    parser.add_argument("--days", type=int, default=3 * 365, help="Spread consultations over this many days")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    print(json.dumps(
+        seed_database(args.db, args.consultations, args.codes, args.days, args.seed),
+        indent=2
+    ))
+
+
+if __name__ == "__main__":
+    main()
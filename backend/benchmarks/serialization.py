@@ -0,0 +1,131 @@
+"""CPU and allocation cost of serializing one list page, per row.
+
+Runs in-process against a scratch database, no server needed::
+
+    python -m benchmarks.serialization --limit 500 --output serialization.json
+
+Compares three ways of turning the newest ``--limit`` consultations into a
+JSON body:
+
+- ``fastapi_response_model``: ORM entities returned from the route, then
+  validated against ``response_model`` and encoded with ``json`` by
+  FastAPI (how the list endpoint used to work);
+- ``pydantic_dump``: ORM entities wrapped in ``ConsultationListResponse``
+  and dumped with ``model_dump_json``;
+- ``lean``: column tuples, dicts and ``orjson``, as the endpoints do now.
+
+CPU time is the median over ``--repeat`` runs; allocations are the
+tracemalloc peak of one run. Both include the query itself.
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from benchmarks.common import write_report
+from benchmarks.seed import seed_database
+from database import create_db_engine
+from models import Consultation
+from schemas import ConsultationListResponse
+from serialization import CONSULTATION_COLUMNS, dumps, rows_to_dicts
+
+RESPONSE_FIELD = create_response_field("Response_list_consultations", ConsultationListResponse)
+
+
+def newest(query, limit: int):
+    return query.order_by(Consultation.consultation_date.desc(), Consultation.id.desc()).limit(limit)
+
+
+def fastapi_response_model(db: Session, limit: int) -> bytes:
+    consultations = db.scalars(newest(select(Consultation), limit)).all()
+    content = {"consultations": consultations, "total": None, "next_cursor": None}
+    value = asyncio.run(serialize_response(
+        field=RESPONSE_FIELD, response_content=content, is_coroutine=True
+    ))
+    return JSONResponse(value).body
+
+
+def pydantic_dump(db: Session, limit: int) -> bytes:
+    consultations = db.scalars(newest(select(Consultation), limit)).all()
+    return ConsultationListResponse(consultations=consultations).model_dump_json().encode()
+
+
+def lean(db: Session, limit: int) -> bytes:
+    rows = db.execute(newest(select(*CONSULTATION_COLUMNS), limit)).all()
+    return dumps({"consultations": rows_to_dicts(rows), "total": None, "next_cursor": None})
+
+
+STRATEGIES = {
+    "fastapi_response_model": fastapi_response_model,
+    "pydantic_dump": pydantic_dump,
+    "lean": lean,
+}
+
+
+def measure(engine, strategy, limit: int, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        # A fresh session per run, like a request; the identity map is empty
+        with Session(engine) as db:
+            gc.collect()
+            started = time.process_time()
+            body = strategy(db, limit)
+            timings.append(time.process_time() - started)
+
+    with Session(engine) as db:
+        gc.collect()
+        tracemalloc.start()
+        strategy(db, limit)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    cpu = statistics.median(timings)
+    return {
+        "cpu_ms": round(cpu * 1000, 2),
+        "cpu_us_per_row": round(cpu * 1e6 / limit, 2),
+        "peak_alloc_kb": round(peak / 1024, 1),
+        "alloc_bytes_per_row": round(peak / limit),
+        "body_bytes": len(body),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=500, help="Rows per page")
+    parser.add_argument("--consultations", type=int, default=5000, help="Rows in the scratch database")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs per strategy")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "serialization.db")
+        seed_database(path, args.consultations, code_count=1000)
+        engine = create_db_engine(f"sqlite:///{path}", "production")
+        try:
+            with Session(engine) as db:
+                bodies = {name: strategy(db, args.limit) for name, strategy in STRATEGIES.items()}
+            if len(set(bodies.values())) != 1:
+                raise SystemExit("Strategies produced different JSON bodies")
+            results = {
+                name: measure(engine, strategy, args.limit, args.repeat)
+                for name, strategy in STRATEGIES.items()
+            }
+        finally:
+            engine.dispose()
+
+    write_report({"limit": args.limit, "repeat": args.repeat, "strategies": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Reproducible end-to-end benchmark of the EMR API.
+
+Seeds a synthetic database at the requested scale (reused across runs),
+starts the API on it, drives the diagnosis search, list, get, create and
+delete endpoints with concurrent keep-alive clients and writes a JSON
+report::
+
+    python -m benchmarks.suite --consultations 100000 --output before.json
+    # ...change something...
+    python -m benchmarks.suite --consultations 100000 --output after.json
+    python -m benchmarks.compare before.json after.json
+
+Pass ``--base-url`` to benchmark an already running server instead; the
+ids it uses then come from the server's own data.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from benchmarks.common import run_load, wait_for_server, write_report
+from benchmarks.seed import FULL_CODE_SET, WORDS, seed_database
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEARCH_PREFIXES = ["a0", "b2", "e11", "j", "k5", "m54", "r1", "z"]
+SCENARIOS = (
+    "diagnosis_search",
+    "list_first_page",
+    "list_offset_page",
+    "get_consultation",
+    "create_consultation",
+    "delete_consultation",
+)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def prepare_database(args) -> dict:
+    """Seed the database unless one with the same parameters exists."""
+    os.makedirs(args.workdir, exist_ok=True)
+    params = {"consultations": args.consultations, "codes": args.codes, "seed": args.seed}
+    path = os.path.join(args.workdir, f"bench-{args.consultations}.db")
+    stamp_path = path + ".json"
+    if not args.reseed and os.path.exists(path) and os.path.exists(stamp_path):
+        with open(stamp_path) as f:
+            stamp = json.load(f)
+        if stamp.get("params") == params:
+            return {**stamp["result"], "reused": True}
+
+    result = seed_database(path, args.consultations, args.codes, seed=args.seed)
+    with open(stamp_path, "w") as f:
+        json.dump({"params": params, "result": result}, f)
+    return {**result, "reused": False}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path: str, port: int, env: dict = None) -> subprocess.Popen:
+    """Run the API on ``db_path``; ``env`` adds or overrides settings."""
+    env = {**os.environ, **(env or {}), "DATABASE_URL": f"sqlite:///{os.path.abspath(db_path)}"}
+    env.pop("ASYNC_DATABASE_URL", None)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+
+
+def fetch_json(base_url: str, path: str) -> dict:
+    url = urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+    conn.request("GET", path)
+    body = json.loads(conn.getresponse().read())
+    conn.close()
+    return body
+
+
+def run_scenarios(base_url: str, args) -> dict:
+    """Drive every endpoint and return one latency summary per scenario."""
+    # Seeded databases have contiguous ids, so the total is the highest id
+    total = fetch_json(base_url, "/api/consultations?limit=1")["total"] or 1
+    codes = [hit["code"] for hit in fetch_json(base_url, "/api/diagnosis")][:10] or ["A09"]
+    terms = SEARCH_PREFIXES + WORDS
+    created_ids = {}
+
+    def rng(name, i):
+        # The i-th request of a scenario is the same in every run
+        return random.Random(f"{args.seed}-{name}-{i}")
+
+    def search(i):
+        return "GET", f"/api/diagnosis?search={rng('search', i).choice(terms)}", None
+
+    def list_first_page(i):
+        return "GET", "/api/consultations?limit=50", None
+
+    def list_offset_page(i):
+        skip = rng("list", i).randint(0, max(0, total - 50))
+        return "GET", f"/api/consultations?limit=50&skip={skip}&include_total=false", None
+
+    def get_one(i):
+        return "GET", f"/api/consultation/{rng('get', i).randint(1, total)}", None
+
+    def create(i):
+        r = rng("create", i)
+        return "POST", "/api/consultation", {
+            "patient_name": f"Benchmark Patient {i}",
+            "diagnosis_codes": r.sample(codes, min(2, len(codes))),
+            "treatment_notes": " ".join(r.choices(WORDS, k=40)),
+        }
+
+    def remember_created(i, status, body):
+        if status == 201:
+            created_ids[i] = json.loads(body)["id"]
+
+    # Deletes remove exactly the rows the create scenario added
+    def delete(i):
+        return "DELETE", f"/api/consultation/{created_ids.get(i, 0)}", None
+
+    factories = dict(zip(SCENARIOS, (
+        search, list_first_page, list_offset_page, get_one, create, delete
+    )))
+    scenarios = {name: factories[name] for name in args.scenarios or SCENARIOS}
+
+    results = {}
+    for name, factory in scenarios.items():
+        if args.warmup and name not in ("create_consultation", "delete_consultation"):
+            run_load(base_url, factory, 1, args.warmup)
+        results[name] = run_load(
+            base_url, factory, args.concurrency, args.requests,
+            on_response=remember_created if name == "create_consultation" else None
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", help="Benchmark this running server instead of starting one")
+    parser.add_argument("--consultations", type=int, default=100000, help="Synthetic dataset size")
+    parser.add_argument("--codes", type=int, default=FULL_CODE_SET, help="Diagnosis codes to create")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for data and requests")
+    parser.add_argument("--reseed", action="store_true", help="Recreate the dataset even if cached")
+    parser.add_argument("--workdir", default=".benchmarks", help="Where seeded databases are kept")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per client")
+    parser.add_argument("--warmup", type=int, default=50, help="Sequential warm-up requests per read scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS,
+                        help="Only run these (delete_consultation needs create_consultation)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "concurrency": args.concurrency,
+            "requests_per_client": args.requests,
+        },
+    }
+
+    server = None
+    base_url = args.base_url
+    try:
+        if base_url is None:
+            report["dataset"] = prepare_database(args)
+            port = free_port()
+            server = start_server(report["dataset"]["path"], port)
+            base_url = f"http://127.0.0.1:{port}"
+        report["meta"]["base_url"] = base_url
+        wait_for_server(base_url, timeout=120)
+        report["scenarios"] = run_scenarios(base_url, args)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
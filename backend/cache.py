@@ -0,0 +1,198 @@
+"""Result cache for hot consultation reads.
+
+Serialized JSON responses are cached under keys built from the request.
+The default backend is a bounded in-process LRU with a TTL; setting
+``CACHE_BACKEND=redis`` shares the cache between workers through any
+Redis-compatible client (``get``, ``set(ex=)``, ``delete``, ``incr``), so a
+small fake object can stand in for Redis in tests.
+
+Invalidation:
+
+- a single consultation is cached under ``consultation:<id>`` and that key
+  is deleted when the consultation is deleted;
+- list pages are cached under a generation number. Any write bumps the
+  generation, which makes every cached page unreachable at once; the old
+  entries then age out of the LRU (or expire in Redis).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import config
+
+LIST_GENERATION_KEY = "consultations:list:generation"
+
+
+class MemoryCache:
+    """Thread-safe LRU cache with a per-entry time to live."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Counters live outside the LRU so a generation is never evicted
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def counter(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class RedisCache:
+    """Cache backed by a Redis-compatible client.
+
+    Redis enforces the TTL and its own eviction policy, so evictions and
+    entry counts are not tracked here; hits and misses are counted per
+    process.
+    """
+
+    name = "redis"
+
+    def __init__(self, client, ttl: float = 30.0, prefix: str = "cliniccare:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.client.get(self.prefix + key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        seconds = max(1, int(self.ttl if ttl is None else ttl))
+        self.client.set(self.prefix + key, value, ex=seconds)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def counter(self, key: str) -> int:
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(self.prefix + key))
+
+    def clear(self) -> None:
+        # Cached pages become unreachable; single records expire by TTL
+        self.incr(LIST_GENERATION_KEY)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "entries": None,
+                "max_entries": None,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": None,
+                "expirations": None,
+            }
+
+
+def create_cache():
+    """Build the backend selected by ``CACHE_BACKEND``."""
+    if config.CACHE_BACKEND == "redis":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "CACHE_BACKEND=redis requires the redis package (pip install redis)"
+            ) from e
+        return RedisCache(redis.Redis.from_url(config.REDIS_URL), ttl=config.CACHE_TTL_SECONDS)
+    if config.CACHE_BACKEND == "memory":
+        return MemoryCache(config.CACHE_MAX_ENTRIES, config.CACHE_TTL_SECONDS)
+    raise ValueError(f"Unknown CACHE_BACKEND {config.CACHE_BACKEND!r}; expected memory or redis")
+
+
+result_cache = create_cache()
+
+
+def consultation_key(consultation_id: int) -> str:
+    return f"consultation:{consultation_id}"
+
+
+def consultation_list_key(skip: int, limit: int, cursor: Optional[str], include_total: bool,
+                          fields: str = "full") -> str:
+    generation = result_cache.counter(LIST_GENERATION_KEY)
+    return (
+        f"consultations:list:{generation}:{fields}:{skip}:{limit}:"
+        f"{cursor or ''}:{int(include_total)}"
+    )
+
+
+def invalidate_consultation(consultation_id: int) -> None:
+    """Forget one consultation and every cached list page."""
+    result_cache.delete(consultation_key(consultation_id))
+    invalidate_consultation_lists()
+
+
+def invalidate_consultation_lists() -> None:
+    """Make every cached list page stale (after any write)."""
+    result_cache.incr(LIST_GENERATION_KEY)
@@ -0,0 +1,266 @@
+"""Change feed for consultations: delta sync and server-sent events.
+
+SQLite triggers append one row to ``consultation_changes`` for every insert,
+update, soft delete or hard delete of a consultation, in the writing
+transaction. Its AUTOINCREMENT ``seq`` is the feed position: it only grows
+and is never reused, even after old changes are trimmed.
+
+A client remembers the last ``seq`` it has seen and asks for what happened
+since. The answer is the current state of each consultation that changed,
+or a tombstone (its id under ``deleted``) if it is gone, so replaying a
+change twice is harmless and a client that was away for a while only gets
+each consultation once.
+
+Changes are kept for ``CHANGE_FEED_RETENTION_SECONDS``. A client asking for
+an older position gets ``ChangesExpired`` (410 Gone) and reloads the list.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable, Sequence
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Consultation, ConsultationChange
+from serialization import dumps, rows_to_dicts
+
+logger = logging.getLogger("cliniccare.changes")
+
+# An SSE comment line every so often keeps proxies from closing idle streams
+KEEPALIVE_SECONDS = 15.0
+# Reconnect delay EventSource clients are told to use
+RETRY_MILLISECONDS = 3000
+TRIM_BATCH_SIZE = 1000
+
+CHANGE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS consultation_changes_ai AFTER INSERT ON consultations BEGIN
+        INSERT INTO consultation_changes (consultation_id, changed_at)
+        VALUES (new.id, datetime('now'));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS consultation_changes_au AFTER UPDATE ON consultations BEGIN
+        INSERT INTO consultation_changes (consultation_id, changed_at)
+        VALUES (new.id, datetime('now'));
+    END
+    """,
+    # Purging a soft-deleted row changes nothing clients can see
+    """
+    CREATE TRIGGER IF NOT EXISTS consultation_changes_ad AFTER DELETE ON consultations
+    WHEN old.deleted_at IS NULL BEGIN
+        INSERT INTO consultation_changes (consultation_id, changed_at)
+        VALUES (old.id, datetime('now'));
+    END
+    """,
+]
+
+
+class ChangesExpired(Exception):
+    """The requested position is older than the retained changes."""
+
+
+def changes_supported(engine: Engine) -> bool:
+    """The change triggers are SQLite-only."""
+    return engine.dialect.name == "sqlite"
+
+
+def install_change_feed(engine: Engine) -> None:
+    """Install the change triggers if they do not exist yet.
+
+    Existing consultations need no backfill: clients start from the
+    current position after loading the list.
+    """
+    if not changes_supported(engine):
+        return
+
+    with engine.begin() as conn:
+        for ddl in CHANGE_TRIGGERS:
+            conn.execute(text(ddl))
+
+
+async def latest_change_seq(db: AsyncSession) -> int:
+    """The newest feed position, 0 before the first change."""
+    seq = await db.scalar(
+        text("SELECT seq FROM sqlite_sequence WHERE name = 'consultation_changes'")
+    )
+    return seq or 0
+
+
+async def read_changes(db: AsyncSession, since: int, limit: int,
+                       columns: Sequence, fields: Sequence[str]) -> dict:
+    """Consultations changed after position ``since``.
+
+    Returns ``seq`` (the position to continue from), the changed
+    consultations that still exist as ``columns``/``fields`` rows, newest
+    first, the ``deleted`` ids and ``has_more`` when more than ``limit``
+    changes are pending.
+    """
+    latest = await latest_change_seq(db)
+    oldest = await db.scalar(select(func.min(ConsultationChange.seq)))
+    first_retained = oldest if oldest is not None else latest + 1
+    if since > latest or since < first_retained - 1:
+        raise ChangesExpired(f"Changes since {since} are no longer available; reload the list")
+
+    changes = (await db.execute(
+        select(ConsultationChange.seq, ConsultationChange.consultation_id)
+        .where(ConsultationChange.seq > since)
+        .order_by(ConsultationChange.seq)
+        .limit(limit + 1)
+    )).all()
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    changed_ids = {consultation_id for _, consultation_id in changes}
+    rows = []
+    if changed_ids:
+        rows = (await db.execute(
+            select(*columns)
+            .where(Consultation.id.in_(changed_ids), Consultation.deleted_at.is_(None))
+            .order_by(Consultation.consultation_date.desc(), Consultation.id.desc())
+        )).all()
+    live_ids = {row.id for row in rows}
+
+    return {
+        "seq": changes[-1].seq if changes else since,
+        "consultations": rows_to_dicts(rows, fields),
+        "deleted": sorted(changed_ids - live_ids),
+        "has_more": has_more,
+    }
+
+
+class ChangeNotifier:
+    """Wakes change streams when consultations may have changed.
+
+    Requests that write call ``notify`` after committing; ``watch_changes``
+    polls the feed position to catch writes by other processes.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self.closed = False
+        self._event = asyncio.Event()
+
+    def notify(self, seq: int = None) -> None:
+        if seq is not None:
+            self.seq = max(self.seq, seq)
+        self._event.set()
+        self._event = asyncio.Event()
+
+    async def wait(self, after: int, timeout: float) -> bool:
+        """Wait until the position passes ``after`` or a write is reported.
+
+        Returns False if ``timeout`` seconds passed without either.
+        """
+        if self.seq > after or self.closed:
+            return True
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def close(self) -> None:
+        """End every open stream (on shutdown)."""
+        self.closed = True
+        self.notify()
+
+
+change_notifier = ChangeNotifier()
+
+
+def format_event(data: bytes, event: str = None, event_id: int = None) -> bytes:
+    """One server-sent event; ``data`` must be a single line (compact JSON is)."""
+    lines = []
+    if event_id is not None:
+        lines.append(b"id: %d" % event_id)
+    if event:
+        lines.append(b"event: " + event.encode())
+    lines.append(b"data: " + data)
+    return b"\n".join(lines) + b"\n\n"
+
+
+async def change_events(session_factory: Callable[[], AsyncSession], since: int,
+                        columns: Sequence, fields: Sequence[str], limit: int,
+                        count: Callable, duration: float) -> AsyncIterator[bytes]:
+    """Server-sent ``changes`` events from position ``since`` on.
+
+    Each event carries a ``read_changes`` result plus ``total``; its id is
+    the position, so a reconnecting EventSource resumes via
+    ``Last-Event-ID``. The stream ends after ``duration`` seconds.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    position = since
+    yield b"retry: %d\n\n" % RETRY_MILLISECONDS
+
+    check = True
+    while not change_notifier.closed:
+        if check:
+            async with session_factory() as db:
+                delta = await read_changes(db, position, limit, columns, fields)
+                if delta["consultations"] or delta["deleted"]:
+                    delta["total"] = await count(db)
+            if delta["seq"] != position:
+                position = delta["seq"]
+                yield format_event(dumps(delta), "changes", position)
+            if delta["has_more"]:
+                continue
+
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return
+        check = await change_notifier.wait(position, min(KEEPALIVE_SECONDS, remaining))
+        if not check:
+            yield b": keepalive\n\n"
+
+
+async def watch_changes(session_factory: Callable[[], AsyncSession], interval: float) -> None:
+    """Report the feed position to ``change_notifier`` every ``interval`` seconds."""
+    while True:
+        try:
+            async with session_factory() as db:
+                seq = await latest_change_seq(db)
+            if seq > change_notifier.seq:
+                change_notifier.notify(seq)
+        except Exception:
+            logger.exception("Reading the change feed position failed")
+        await asyncio.sleep(interval)
+
+
+async def trim_changes(db: AsyncSession, changed_before: datetime,
+                       batch_size: int = TRIM_BATCH_SIZE) -> int:
+    """Delete changes older than ``changed_before`` in short transactions."""
+    trimmed = 0
+    while True:
+        batch = (
+            select(ConsultationChange.seq)
+            .where(ConsultationChange.changed_at < changed_before)
+            .limit(batch_size)
+        )
+        result = await db.execute(
+            delete(ConsultationChange).where(ConsultationChange.seq.in_(batch))
+        )
+        await db.commit()
+        trimmed += result.rowcount
+        if result.rowcount < batch_size:
+            return trimmed
+
+
+async def trim_periodically(session_factory: Callable[[], AsyncSession],
+                            interval: float, retention: float) -> None:
+    """Run ``trim_changes`` every ``interval`` seconds until cancelled."""
+    while True:
+        try:
+            async with session_factory() as db:
+                trimmed = await trim_changes(
+                    db, datetime.utcnow() - timedelta(seconds=retention)
+                )
+            if trimmed:
+                logger.info("Trimmed %d consultation changes", trimmed)
+        except Exception:
+            logger.exception("Trimming consultation changes failed")
+        await asyncio.sleep(interval)
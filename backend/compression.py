@@ -0,0 +1,217 @@
+"""Response compression negotiated from ``Accept-Encoding``.
+
+gzip is always available; brotli is offered when the ``brotli`` package is
+installed. Bodies smaller than ``COMPRESSION_MIN_SIZE`` go out as is: for a
+few hundred bytes of autocomplete results the extra header and CPU time
+cost more than they save.
+
+Streaming responses (the CSV/NDJSON export) are compressed chunk by chunk
+and flushed after every chunk, so the client keeps receiving data while the
+export runs. Responses that already carry a ``Content-Encoding``, or whose
+media type is compressed already (``application/gzip``, images), pass
+through untouched.
+"""
+
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+import config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+class GzipEncoder:
+    """Incremental gzip stream."""
+
+    def __init__(self, level: int = 6):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """Emit everything buffered so far without ending the stream."""
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    """Incremental brotli stream."""
+
+    def __init__(self, quality: int = 4):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+ENCODERS = {
+    "br": lambda: BrotliEncoder(config.BROTLI_QUALITY),
+    "gzip": lambda: GzipEncoder(config.GZIP_LEVEL),
+}
+
+
+def available_encodings(names: Iterable[str]) -> List[str]:
+    """The configured encodings this process can produce, in order."""
+    encodings = []
+    for name in names:
+        if name not in ENCODERS:
+            raise ValueError(f"Unknown compression encoding {name!r}; expected br or gzip")
+        if name == "br" and brotli is None:
+            continue
+        encodings.append(name)
+    return encodings
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each coding in an ``Accept-Encoding`` header to its q-value."""
+    weights = {}
+    for item in header.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[name] = quality
+    return weights
+
+
+def choose_encoding(header: Optional[str], encodings: List[str]) -> Optional[str]:
+    """The client's highest-weighted encoding; ties go to ``encodings`` order."""
+    if not header:
+        return None
+    weights = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for name in encodings:
+        quality = weights.get(name, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def is_compressible(status: int, headers: Headers) -> bool:
+    if status < 200 or status in (204, 304) or "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressedResponder:
+    """Wraps ``send`` for one response, compressing its body if worthwhile.
+
+    The start message is held back until the first body chunk arrives: only
+    then is it known whether the response is small (sent as is) or streamed
+    (no Content-Length).
+    """
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.encoder = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            headers = MutableHeaders(scope=start)
+            if not is_compressible(start["status"], headers) or (
+                not more_body and len(body) < self.minimum_size
+            ):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self.encoder = ENCODERS[self.encoding]()
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            # The compressed bytes are a different representation
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = "W/" + etag
+            chunk = self._encode(body, more_body)
+            if more_body:
+                if "content-length" in headers:
+                    del headers["content-length"]
+            else:
+                headers["Content-Length"] = str(len(chunk))
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+        await self.send({
+            "type": "http.response.body",
+            "body": self._encode(body, more_body),
+            "more_body": more_body,
+        })
+
+    def _encode(self, body: bytes, more_body: bool) -> bytes:
+        data = self.encoder.compress(body)
+        return data + (self.encoder.flush() if more_body else self.encoder.finish())
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses the client accepts compressed."""
+
+    def __init__(self, app, encodings: Optional[Iterable[str]] = None,
+                 minimum_size: Optional[int] = None):
+        self.app = app
+        self.encodings = available_encodings(
+            config.COMPRESSION_ENCODINGS if encodings is None else encodings
+        )
+        self.minimum_size = config.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, CompressedResponder(send, encoding, self.minimum_size))
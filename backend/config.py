@@ -0,0 +1,120 @@
+"""Application settings, read from environment variables."""
+
+import os
+
+
+def _async_url(url: str) -> str:
+    """Derive the async driver URL for a sync database URL."""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith(("postgresql:", "postgres:")):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+
+def _parse_pragmas(value: str) -> dict:
+    """Parse ``"name=value,name=value"`` into a dict."""
+    pragmas = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, setting = item.partition("=")
+        pragmas[name.strip()] = setting.strip()
+    return pragmas
+
+
+# Database used by the API, init_db.py and the CLIs
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./cliniccare.db")
+
+# Driver URL for the async request path; derived from DATABASE_URL by default
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+
+# Optional read replica for GET requests (e.g. a Postgres standby); its async
+# URL is derived the same way unless ASYNC_READ_DATABASE_URL is set
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL") or None
+ASYNC_READ_DATABASE_URL = os.getenv("ASYNC_READ_DATABASE_URL") or (
+    _async_url(READ_DATABASE_URL) if READ_DATABASE_URL else None
+)
+
+# Without a replica, READ_ONLY_POOL=1 gives GET requests on a SQLite file in
+# WAL mode a second, read-only connection pool on the same file
+READ_ONLY_POOL = os.getenv("READ_ONLY_POOL", "0") == "1"
+
+# A client that wrote reads from the primary for this many seconds afterwards
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Engine profile: "production" (WAL and tuned pragmas) or "default" (SQLite defaults)
+DB_PROFILE = os.getenv("DB_PROFILE", "production")
+
+# Extra or overriding SQLite pragmas, e.g. "cache_size=-131072,mmap_size=0"
+DB_PRAGMAS = _parse_pragmas(os.getenv("DB_PRAGMAS", ""))
+
+# Connection pool sizing (ignored for in-memory SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Sizing of the read pool (replica or read-only SQLite), if there is one.
+# SQLite runs one write at a time, so with a read pool the primary pool can
+# be much smaller than this.
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", str(DB_POOL_SIZE)))
+DB_READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", str(DB_MAX_OVERFLOW)))
+
+# How often (seconds) cached version stamps are re-read from the database
+VERSION_CHECK_SECONDS = float(os.getenv("VERSION_CHECK_SECONDS", "5"))
+
+# How often (seconds) the diagnosis tree recounts code usage, to pick up
+# imports and writes by other processes
+DIAGNOSIS_USAGE_RECOUNT_SECONDS = float(os.getenv("DIAGNOSIS_USAGE_RECOUNT_SECONDS", "300"))
+
+# Cache-Control max-age (seconds) for diagnosis code lookups
+DIAGNOSIS_CACHE_MAX_AGE = int(os.getenv("DIAGNOSIS_CACHE_MAX_AGE", "300"))
+
+# Result cache for consultation reads: "memory" (per process) or "redis"
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Log SQL statements slower than this many milliseconds (0 disables the log)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+
+# Response compression: encodings to offer, in order of preference ("" disables)
+COMPRESSION_ENCODINGS = [
+    name.strip() for name in os.getenv("COMPRESSION_ENCODINGS", "br,gzip").split(",") if name.strip()
+]
+# Responses smaller than this many bytes are sent uncompressed (the default
+# is about one TCP segment, below which compression saves no round trips)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1400"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "4"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# How long (seconds) a create request's Idempotency-Key and response are kept
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# How often (seconds) expired idempotency keys are purged
+IDEMPOTENCY_PURGE_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_SECONDS", "3600"))
+
+# Group commit for POST /api/consultation: wait up to this many milliseconds
+# to batch concurrent creates into one transaction (0 disables)
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "0"))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "64"))
+
+# Deleted consultations are hard-deleted this many seconds after deletion,
+# checked every PURGE_INTERVAL_SECONDS, PURGE_BATCH_SIZE rows per transaction
+PURGE_AFTER_SECONDS = float(os.getenv("PURGE_AFTER_SECONDS", str(7 * 86400)))
+PURGE_INTERVAL_SECONDS = float(os.getenv("PURGE_INTERVAL_SECONDS", "300"))
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+
+# Change feed: how long changes stay available to delta sync, how often the
+# database is checked for writes by other processes, and how long one
+# server-sent event stream stays open before the client reconnects
+CHANGE_FEED_RETENTION_SECONDS = float(os.getenv("CHANGE_FEED_RETENTION_SECONDS", "86400"))
+CHANGE_FEED_POLL_SECONDS = float(os.getenv("CHANGE_FEED_POLL_SECONDS", "1"))
+CHANGE_STREAM_SECONDS = float(os.getenv("CHANGE_STREAM_SECONDS", "300"))
+
+# Archival: consultations dated before the month that was current
+# ARCHIVE_AFTER_DAYS ago move to compressed monthly SQLite files in
+# ARCHIVE_DIR, checked every ARCHIVE_INTERVAL_SECONDS, ARCHIVE_BATCH_SIZE rows
+# per transaction (0 days disables archival)
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "0"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
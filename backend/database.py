@@ -1,18 +1,194 @@
-"""Database connection and session management."""
+"""Database connection and session management.
 
-from sqlalchemy import create_engine
+Writes use ``engine``/``async_engine``. Reads may use a separate read-only
+pool, ``read_engine``/``async_read_engine``: a replica given by
+``READ_DATABASE_URL``, or a read-only connection pool on the same SQLite
+file when it runs in WAL mode. Without either, the read names are aliases
+of the primary ones. See read_routing.py for which requests use them.
+"""
+
+import os
+from typing import Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./cliniccare.db"
+import config
+
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
+
+# Async driver for the same database. Pointing ASYNC_DATABASE_URL (or
+# DATABASE_URL) at Postgres is all it takes to move the request path there.
+ASYNC_SQLALCHEMY_DATABASE_URL = config.ASYNC_DATABASE_URL
+
+# Pragmas applied to every new SQLite connection, per engine profile.
+SQLITE_PROFILES = {
+    # Stock SQLite: rollback journal, writers block readers.
+    "default": {},
+    # WAL lets readers run alongside the single writer; NORMAL sync is
+    # durable across application crashes and only fsyncs at checkpoints.
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,         # wait up to 5 s for the write lock
+        "cache_size": -65536,         # 64 MB page cache per connection
+        "mmap_size": 268435456,       # read up to 256 MB through mmap
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def sqlite_pragmas(profile: str) -> dict:
+    """Pragmas for ``profile``, with ``DB_PRAGMAS`` overrides applied."""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(
+            f"Unknown DB_PROFILE {profile!r}; expected one of: {', '.join(SQLITE_PROFILES)}"
+        )
+    return {**SQLITE_PROFILES[profile], **config.DB_PRAGMAS}
+
+
+def _install_pragmas(engine: Engine, pragmas: dict) -> None:
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def _engine_options(url: str, poolclass, pool_size: int = config.DB_POOL_SIZE,
+                    max_overflow: int = config.DB_MAX_OVERFLOW) -> dict:
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return {
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": config.DB_POOL_TIMEOUT,
+            "pool_pre_ping": True,
+        }
+    options = {"connect_args": {"check_same_thread": False}}
+    if parsed.database and parsed.database != ":memory:":
+        # File databases: keep warm connections (and their page caches)
+        # around instead of reopening the file per request.
+        options.update(
+            poolclass=poolclass,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def read_only_url(url: str, profile: str = config.DB_PROFILE) -> Optional[str]:
+    """A read-only URL for the SQLite file behind ``url``, if reads can use one.
+
+    Only WAL lets read-only connections run alongside the writer; under the
+    rollback journal a second pool would wait for the same locks.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or not parsed.database:
+        return None
+    if parsed.database == ":memory:" or parsed.database.startswith("file:"):
+        return None
+    if str(sqlite_pragmas(profile).get("journal_mode", "")).upper() != "WAL":
+        return None
+    path = os.path.abspath(parsed.database)
+    return f"{parsed.drivername}:///file:{path}?mode=ro&uri=true"
+
+
+def read_pragmas(profile: str) -> dict:
+    """Pragmas for read-only connections: the journal mode is the writer's
+    business, and ``query_only`` rejects writes even on a writable URL."""
+    pragmas = {name: value for name, value in sqlite_pragmas(profile).items() if name != "journal_mode"}
+    pragmas["query_only"] = 1
+    return pragmas
+
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: str = config.DB_PROFILE) -> Engine:
+    """Create a sync engine for ``url`` tuned according to ``profile``."""
+    engine = create_engine(url, **_engine_options(url, QueuePool))
+    if engine.dialect.name == "sqlite":
+        _install_pragmas(engine, sqlite_pragmas(profile))
+    return engine
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}
-)
+
+def create_async_db_engine(url: str = ASYNC_SQLALCHEMY_DATABASE_URL, profile: str = config.DB_PROFILE):
+    """Create an async engine for ``url`` tuned according to ``profile``."""
+    engine = create_async_engine(url, **_engine_options(url, AsyncAdaptedQueuePool))
+    if engine.dialect.name == "sqlite":
+        _install_pragmas(engine.sync_engine, sqlite_pragmas(profile))
+    return engine
+
+
+def create_read_engine(url: str, profile: str = config.DB_PROFILE) -> Engine:
+    """Create a sync engine for read-only use."""
+    engine = create_engine(url, **_engine_options(
+        url, QueuePool, config.DB_READ_POOL_SIZE, config.DB_READ_MAX_OVERFLOW
+    ))
+    if engine.dialect.name == "sqlite":
+        _install_pragmas(engine, read_pragmas(profile))
+    return engine
+
+
+def create_async_read_engine(url: str, profile: str = config.DB_PROFILE):
+    """Create an async engine for read-only use."""
+    engine = create_async_engine(url, **_engine_options(
+        url, AsyncAdaptedQueuePool, config.DB_READ_POOL_SIZE, config.DB_READ_MAX_OVERFLOW
+    ))
+    if engine.dialect.name == "sqlite":
+        _install_pragmas(engine.sync_engine, read_pragmas(profile))
+    return engine
+
+
+def _read_url(replica_url: Optional[str], primary_url: str) -> Optional[str]:
+    if replica_url:
+        return replica_url
+    if config.READ_ONLY_POOL:
+        return read_only_url(primary_url)
+    return None
+
+
+engine = create_db_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_db_engine()
+
+# Objects stay usable after commit: lazy refreshes are not possible in async code.
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+READ_DATABASE_URL = _read_url(config.READ_DATABASE_URL, SQLALCHEMY_DATABASE_URL)
+ASYNC_READ_DATABASE_URL = _read_url(config.ASYNC_READ_DATABASE_URL, ASYNC_SQLALCHEMY_DATABASE_URL)
+
+# True when reads have connections of their own
+has_read_pool = READ_DATABASE_URL is not None and ASYNC_READ_DATABASE_URL is not None
+
+if has_read_pool:
+    read_engine = create_read_engine(READ_DATABASE_URL)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+    async_read_engine = create_async_read_engine(ASYNC_READ_DATABASE_URL)
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False
+    )
+else:
+    read_engine = engine
+    ReadSessionLocal = SessionLocal
+    async_read_engine = async_engine
+    AsyncReadSessionLocal = AsyncSessionLocal
+
 Base = declarative_base()
 
 
@@ -23,3 +199,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency to get an async database session for non-blocking handlers."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,385 @@
+"""In-memory search index for ICD-10 diagnosis codes.
+
+The index is built once from the ``diagnosis_codes`` table and answers
+autocomplete queries without touching the database:
+
+- a prefix trie over normalized codes ("a09" and "A09.9" both work)
+- an inverted index from description tokens to codes
+- a trigram index over the token vocabulary for partial-word matches
+"""
+
+import asyncio
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import product
+from typing import (
+    AbstractSet, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence,
+    Set, Tuple
+)
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import config
+from http_cache import DIAGNOSIS_CODES_VERSION, VersionCache, read_version
+from models import DiagnosisCode
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Relevance weights for description matches. Code matches always outrank
+# them so that typing a code prefix behaves like a classic autocomplete.
+SCORE_WORD_EXACT = 30
+SCORE_WORD_PREFIX = 20
+SCORE_WORD_SUBSTRING = 10
+SCORE_LEADING_WORD = 5
+TIER_SCORES = (SCORE_WORD_EXACT, SCORE_WORD_PREFIX, SCORE_WORD_SUBSTRING)
+
+MAX_QUERY_TOKENS = 4
+MATCH_CACHE_SIZE = 4096
+RESULT_CACHE_SIZE = 4096
+DIRECT_SCORING_LIMIT = 2000
+SCAN_DENSITY = 50
+
+EMPTY: FrozenSet[int] = frozenset()
+
+INDEX_QUERY = select(DiagnosisCode.id, DiagnosisCode.code, DiagnosisCode.description)
+
+
+class IndexedCode(NamedTuple):
+    """A diagnosis code as held by the index."""
+    id: int
+    code: str
+    description: str
+
+
+def normalize_code(code: str) -> str:
+    """Normalize a code for prefix lookups (case and dots are ignored)."""
+    return code.lower().replace(".", "").strip()
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase alphanumeric tokens."""
+    return TOKEN_RE.findall(text.lower())
+
+
+def trigrams(token: str) -> Set[str]:
+    """Return the set of trigrams in a token."""
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def _union(sets: Iterable[FrozenSet[int]]) -> FrozenSet[int]:
+    """Union posting sets, avoiding a copy when only one is non-empty."""
+    non_empty = [subset for subset in sets if subset]
+    if not non_empty:
+        return EMPTY
+    if len(non_empty) == 1:
+        return non_empty[0]
+    return frozenset().union(*non_empty)
+
+
+class _TrieNode:
+    __slots__ = ("children", "entries")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # Positions of every entry in this subtree, in code order.
+        self.entries: List[int] = []
+
+
+class _TokenMatches(NamedTuple):
+    """Entry positions matching one query token, split by match quality."""
+    exact: FrozenSet[int]
+    prefix: FrozenSet[int]
+    substring: FrozenSet[int]
+    all: FrozenSet[int]
+    # Entries whose description starts with a word matching the token.
+    leading: FrozenSet[int]
+
+
+class _Snapshot:
+    """Immutable index structures built from one load of the table.
+
+    Entries are kept sorted by code, so an entry's position doubles as its
+    tie-break rank and "first N positions" means "first N codes".
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, str, str]]):
+        self.entries: List[IndexedCode] = sorted(
+            (IndexedCode(*row) for row in rows),
+            key=lambda entry: entry.code
+        )
+        self.trie = _TrieNode()
+        postings: Dict[str, Set[int]] = defaultdict(set)
+        leading: Dict[str, Set[int]] = defaultdict(set)
+
+        for position, entry in enumerate(self.entries):
+            node = self.trie
+            node.entries.append(position)
+            for char in normalize_code(entry.code):
+                node = node.children.setdefault(char, _TrieNode())
+                node.entries.append(position)
+
+            tokens = tokenize(entry.description)
+            for token in tokens:
+                postings[token].add(position)
+            if tokens:
+                leading[tokens[0]].add(position)
+
+        self.postings: Dict[str, FrozenSet[int]] = {
+            token: frozenset(positions) for token, positions in postings.items()
+        }
+        self.leading: Dict[str, FrozenSet[int]] = {
+            token: frozenset(positions) for token, positions in leading.items()
+        }
+        self.vocabulary: List[str] = sorted(self.postings)
+        self.token_trigrams: Dict[str, Set[str]] = defaultdict(set)
+        for token in self.vocabulary:
+            for gram in trigrams(token):
+                self.token_trigrams[gram].add(token)
+
+        self._match_cache: Dict[str, _TokenMatches] = {}
+        self.result_cache: Dict[Tuple[str, int], List[IndexedCode]] = {}
+
+    def code_prefix(self, prefix: str) -> List[int]:
+        node = self.trie
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.entries
+
+    def vocabulary_prefix(self, prefix: str) -> List[str]:
+        start = bisect_left(self.vocabulary, prefix)
+        end = bisect_left(self.vocabulary, prefix + "\uffff", start)
+        return self.vocabulary[start:end]
+
+    def token_matches(self, query_token: str) -> _TokenMatches:
+        """Return (and cache) the entries matching a query token."""
+        cached = self._match_cache.get(query_token)
+        if cached is not None:
+            return cached
+
+        prefix_tokens = self.vocabulary_prefix(query_token)
+        exact = self.postings.get(query_token, EMPTY)
+        prefix = _union(
+            self.postings[token] for token in prefix_tokens if token != query_token
+        )
+        if prefix and exact:
+            prefix = prefix - exact
+
+        substring = EMPTY
+        if len(query_token) >= 3:
+            candidates = set.intersection(
+                *(self.token_trigrams.get(gram, set()) for gram in trigrams(query_token))
+            )
+            substring = _union(
+                self.postings[token] for token in candidates
+                if query_token in token and not token.startswith(query_token)
+            )
+            if substring and (exact or prefix):
+                substring = substring - exact - prefix
+
+        leading = _union(self.leading.get(token, EMPTY) for token in prefix_tokens)
+        matches = _TokenMatches(
+            exact, prefix, substring, _union((exact, prefix, substring)), leading
+        )
+        if len(self._match_cache) >= MATCH_CACHE_SIZE:
+            self._match_cache.clear()
+        self._match_cache[query_token] = matches
+        return matches
+
+    def first_positions(self, count: int, include: Sequence[AbstractSet[int]],
+                        exclude: Sequence[AbstractSet[int]] = ()) -> List[int]:
+        """Return the ``count`` first positions in all of ``include`` and none
+        of ``exclude``, without materializing the intersection."""
+        smallest = min(include, key=len)
+        if count <= 0 or not smallest:
+            return []
+        if len(smallest) * SCAN_DENSITY < len(self.entries):
+            positions = sorted(smallest)
+        else:
+            # Dense sets: walking positions in order finds matches almost at once.
+            positions = range(len(self.entries))
+
+        found = []
+        for position in positions:
+            if (all(position in subset for subset in include)
+                    and not any(position in subset for subset in exclude)):
+                found.append(position)
+                if len(found) == count:
+                    break
+        return found
+
+
+class DiagnosisIndex:
+    """Rebuildable search index over diagnosis codes.
+
+    A rebuild swaps in a new snapshot, so searches never see a half-built
+    index.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[_Snapshot] = None
+        # Taken on the event loop only: a threading lock held across the
+        # awaits of a reload would block the loop for every other request
+        self._reload_lock = asyncio.Lock()
+        self._stale = True
+        self.version: Optional[str] = None
+
+    @property
+    def stale(self) -> bool:
+        """Whether the index must be rebuilt before it can be trusted."""
+        return self._stale or self._snapshot is None
+
+    def needs_load(self, version: Optional[str]) -> bool:
+        """Whether codes changed since the build, here or (per the stored
+        ``version`` stamp) in another process."""
+        return self.stale or version != self.version
+
+    def __len__(self) -> int:
+        return len(self._snapshot.entries) if self._snapshot else 0
+
+    def invalidate(self) -> None:
+        """Mark the index stale; the next ``refresh`` rebuilds it."""
+        self._stale = True
+
+    def build(self, rows: Iterable[Tuple[int, str, str]], version: Optional[str] = None) -> None:
+        """Build the index from ``(id, code, description)`` rows."""
+        snapshot = _Snapshot(rows)
+        self._snapshot = snapshot
+        self.version = version
+        self._stale = False
+
+    def load(self, db) -> None:
+        """(Re)build the index from the ``diagnosis_codes`` table (sync
+        session, e.g. at startup)."""
+        version = read_version(db, DIAGNOSIS_CODES_VERSION)
+        rows = db.execute(INDEX_QUERY).all()
+        self.build(rows, version)
+
+    async def refresh(self, db: AsyncSession, version: Optional[str]) -> None:
+        """Rebuild the index if ``needs_load(version)``.
+
+        Concurrent callers wait for a single rebuild. The rows are read with
+        async queries and the index is built in a worker thread, so the
+        event loop keeps serving other requests meanwhile.
+        """
+        if not self.needs_load(version):
+            return
+        async with self._reload_lock:
+            # Another request may have rebuilt it while this one waited
+            if not self.needs_load(version):
+                return
+            version = await db.run_sync(read_version, DIAGNOSIS_CODES_VERSION)
+            rows = (await db.execute(INDEX_QUERY)).all()
+            await asyncio.to_thread(self.build, rows, version)
+
+    def search(self, term: Optional[str], limit: int = 20) -> List[IndexedCode]:
+        """Return up to ``limit`` codes ranked by relevance to ``term``."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return []
+
+        term = (term or "").strip().lower()
+        if not term:
+            return snapshot.entries[:limit]
+
+        # Autocomplete repeats the same prefixes constantly.
+        cached = snapshot.result_cache.get((term, limit))
+        if cached is not None:
+            return cached
+
+        # Code matches always rank first: exact code, then prefix in code order.
+        code_term = normalize_code(term)
+        positions = snapshot.code_prefix(code_term)[:limit] if code_term else []
+        for i, position in enumerate(positions):
+            if normalize_code(snapshot.entries[position].code) == code_term:
+                positions.insert(0, positions.pop(i))
+                break
+
+        if len(positions) < limit:
+            positions += self._match_descriptions(
+                snapshot, term, limit - len(positions), exclude=set(positions)
+            )
+
+        results = [snapshot.entries[position] for position in positions]
+        if len(snapshot.result_cache) >= RESULT_CACHE_SIZE:
+            snapshot.result_cache.clear()
+        snapshot.result_cache[(term, limit)] = results
+        return results
+
+    @staticmethod
+    def _match_descriptions(snapshot: _Snapshot, term: str, limit: int,
+                            exclude: Set[int]) -> List[int]:
+        query_tokens = tokenize(term)[:MAX_QUERY_TOKENS]
+        if not query_tokens:
+            return []
+
+        # Every query token has to match (AND semantics).
+        matches = [snapshot.token_matches(token) for token in query_tokens]
+        if len(matches) == 1:
+            candidates = matches[0].all
+        else:
+            candidates = frozenset.intersection(*(match.all for match in matches))
+        if exclude:
+            candidates = candidates - exclude
+        if not candidates:
+            return []
+        leading = matches[0].leading
+
+        if len(candidates) <= DIRECT_SCORING_LIMIT:
+            def rank(position):
+                score = SCORE_LEADING_WORD if position in leading else 0
+                for match in matches:
+                    if position in match.exact:
+                        score += SCORE_WORD_EXACT
+                    elif position in match.prefix:
+                        score += SCORE_WORD_PREFIX
+                    else:
+                        score += SCORE_WORD_SUBSTRING
+                return -score, position
+            return sorted(candidates, key=rank)[:limit]
+
+        # Large candidate sets: walk score tiers from best to worst and stop
+        # as soon as a page is full. Within a tier, leading-word matches
+        # come first, then code order.
+        tiers = defaultdict(list)
+        for combination in product(range(3), repeat=len(matches)):
+            score = sum(TIER_SCORES[quality] for quality in combination)
+            tiers[score].append([match[quality] for match, quality
+                                 in zip(matches, combination)])
+
+        results: List[int] = []
+        for score in sorted(tiers, reverse=True):
+            for with_leading in (True, False):
+                wanted = limit - len(results)
+                found: List[int] = []
+                for include in tiers[score]:
+                    if with_leading:
+                        found += snapshot.first_positions(
+                            wanted, include + [leading], [exclude]
+                        )
+                    else:
+                        found += snapshot.first_positions(
+                            wanted, include, [leading, exclude]
+                        )
+                results += sorted(found)[:wanted]
+                if len(results) >= limit:
+                    return results
+        return results
+
+
+diagnosis_index = DiagnosisIndex()
+
+# Stamp of the codes table, re-read at most every few seconds
+diagnosis_codes_version = VersionCache(DIAGNOSIS_CODES_VERSION, config.VERSION_CHECK_SECONDS)
+
+
+def _invalidate_on_change(mapper, connection, target):
+    diagnosis_index.invalidate()
+    diagnosis_codes_version.expire()
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(DiagnosisCode, _event_name, _invalidate_on_change)
@@ -0,0 +1,227 @@
+"""In-memory ICD-10 hierarchy with subtree usage counts.
+
+The tree is built from the ``chapter``, ``block`` and ``category`` columns
+stored on ``diagnosis_codes`` (see icd10.py) and only holds branches that
+contain loaded codes. Every node carries its subtree's usage: how many
+times codes below it are recorded on current consultations, counted from
+``consultation_diagnoses``. Browsing a node is a dictionary lookup, however
+many codes or consultations there are.
+
+Usage is counted with one GROUP BY over the code index when the tree is
+built. After that, creates and deletes in this process adjust it in place,
+walking from the code up to its chapter. Writes the process does not see
+one by one (imports, archival, other workers) are picked up by a recount
+every ``DIAGNOSIS_USAGE_RECOUNT_SECONDS``, or sooner after ``expire_usage``.
+The recount also corrects the odd write that lands while one is running.
+"""
+
+import asyncio
+import time
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import config
+from http_cache import DIAGNOSIS_CODES_VERSION, read_version
+from icd10 import BLOCKS_BY_KEY, CHAPTERS, category_of
+from models import ConsultationDiagnosis, DiagnosisCode
+
+TREE_QUERY = select(
+    DiagnosisCode.code,
+    DiagnosisCode.description,
+    DiagnosisCode.chapter,
+    DiagnosisCode.block,
+    DiagnosisCode.category
+)
+USAGE_QUERY = select(ConsultationDiagnosis.code, func.count()).group_by(ConsultationDiagnosis.code)
+
+
+class TreeNode:
+    __slots__ = ("key", "level", "title", "code_range", "parent", "children", "usage", "is_code")
+
+    def __init__(self, key: str, level: str, title: Optional[str] = None,
+                 code_range: Optional[str] = None, parent: Optional["TreeNode"] = None):
+        self.key = key
+        self.level = level
+        self.title = title
+        self.code_range = code_range
+        self.parent = parent
+        self.children: List["TreeNode"] = []
+        self.usage = 0
+        # A category that is itself a code (e.g. A09) is not repeated below itself
+        self.is_code = False
+
+    def describe(self) -> dict:
+        return {
+            "key": self.key,
+            "level": self.level,
+            "title": self.title,
+            "code_range": self.code_range,
+            "usage": self.usage,
+            "child_count": len(self.children),
+            "is_code": self.is_code,
+        }
+
+
+class _Tree:
+    """The nodes built from one load of the codes table."""
+
+    def __init__(self, rows: Iterable[Tuple[str, str, Optional[int], Optional[str], Optional[str]]],
+                 usage: Mapping[str, int]):
+        self.root = TreeNode("", "root")
+        self.nodes: Dict[str, TreeNode] = {}
+        # Code -> the node its usage is added to
+        self.code_nodes: Dict[str, TreeNode] = {}
+
+        for code, description, chapter, block, category in rows:
+            parent = self.root
+            if chapter is not None:
+                chapter_range = CHAPTERS.get(chapter)
+                parent = self._node(
+                    str(chapter), "chapter", parent,
+                    chapter_range.title if chapter_range else None,
+                    chapter_range.key if chapter_range else None
+                )
+            if block is not None:
+                block_range = BLOCKS_BY_KEY.get(block)
+                parent = self._node(block, "block", parent,
+                                    block_range.title if block_range else None, block)
+            category = category or category_of(code)
+            node = self._node(category, "category", parent)
+            if code != category:
+                node = self._node(code, "code", node)
+            node.title = description
+            node.is_code = True
+            self.code_nodes[code] = node
+
+        # Chapters in numeric order, everything else by key
+        self.root.children.sort(
+            key=lambda child: (child.level != "chapter", int(child.key) if child.level == "chapter" else child.key)
+        )
+        for node in self.nodes.values():
+            node.children.sort(key=lambda child: child.key)
+        for code, count in usage.items():
+            self.add_usage(code, count)
+
+    def _node(self, key: str, level: str, parent: TreeNode, title: Optional[str] = None,
+              code_range: Optional[str] = None) -> TreeNode:
+        node = self.nodes.get(key)
+        if node is None:
+            node = TreeNode(key, level, title, code_range, parent)
+            parent.children.append(node)
+            self.nodes[key] = node
+        return node
+
+    def add_usage(self, code: str, count: int) -> None:
+        node = self.code_nodes.get(code)
+        while node is not None:
+            node.usage += count
+            node = node.parent
+
+
+class DiagnosisTree:
+    """Rebuildable ICD-10 hierarchy with incrementally updated usage."""
+
+    def __init__(self):
+        self._tree: Optional[_Tree] = None
+        # Taken on the event loop only: a threading lock held across the
+        # awaits of a reload would block the loop for every other request
+        self._reload_lock = asyncio.Lock()
+        self._stale = True
+        self._counted_at = 0.0
+        self.version: Optional[str] = None
+
+    def invalidate(self) -> None:
+        """Codes changed: rebuild on the next ``load``."""
+        self._stale = True
+
+    def expire_usage(self) -> None:
+        """Consultations changed in bulk: recount on the next ``load``."""
+        self._counted_at = 0.0
+
+    def needs_load(self, version: Optional[str] = None) -> bool:
+        """Whether codes changed (here or, per ``version``, in another
+        process) or usage is due for a recount."""
+        return (
+            self._stale
+            or self._tree is None
+            or (version is not None and version != self.version)
+            or time.monotonic() - self._counted_at > config.DIAGNOSIS_USAGE_RECOUNT_SECONDS
+        )
+
+    def load(self, db) -> None:
+        """(Re)build the tree and its usage from the database (sync session,
+        e.g. at startup)."""
+        version = read_version(db, DIAGNOSIS_CODES_VERSION)
+        counted_at = time.monotonic()
+        rows = db.execute(TREE_QUERY).all()
+        usage = dict(db.execute(USAGE_QUERY).all())
+        self._install(_Tree(rows, usage), version, counted_at)
+
+    async def refresh(self, db: AsyncSession, version: Optional[str] = None) -> None:
+        """Rebuild the tree if ``needs_load(version)``.
+
+        Concurrent callers wait for a single rebuild. The rows are read with
+        async queries and the tree is built in a worker thread, so the event
+        loop keeps serving other requests meanwhile.
+        """
+        if not self.needs_load(version):
+            return
+        async with self._reload_lock:
+            # Another request may have rebuilt it while this one waited
+            if not self.needs_load(version):
+                return
+            version = await db.run_sync(read_version, DIAGNOSIS_CODES_VERSION)
+            counted_at = time.monotonic()
+            rows = (await db.execute(TREE_QUERY)).all()
+            usage = dict((await db.execute(USAGE_QUERY)).all())
+            tree = await asyncio.to_thread(_Tree, rows, usage)
+            self._install(tree, version, counted_at)
+
+    def _install(self, tree: _Tree, version: Optional[str], counted_at: float) -> None:
+        self._tree = tree
+        self.version = version
+        self._stale = False
+        self._counted_at = counted_at
+
+    def record_usage(self, codes: Iterable[str], delta: int) -> None:
+        """Add ``delta`` (1 for a new consultation, -1 for a deleted one) to
+        each of a consultation's codes and their ancestors."""
+        tree = self._tree
+        if tree is None:
+            return
+        # Links are unique per consultation and code
+        for code in set(codes):
+            tree.add_usage(code, delta)
+
+    def browse(self, key: Optional[str] = None) -> dict:
+        """The node ``key`` (the top level when None), its ancestors and its
+        children. Raises KeyError for an unknown key."""
+        tree = self._tree
+        if tree is None:
+            raise KeyError(key)
+        node = tree.root if key is None else tree.nodes[key]
+
+        path = []
+        ancestor = node.parent
+        while ancestor is not None and ancestor is not tree.root:
+            path.append(ancestor.describe())
+            ancestor = ancestor.parent
+        return {
+            "node": None if node is tree.root else node.describe(),
+            "path": path[::-1],
+            "usage": node.usage,
+            "children": [child.describe() for child in node.children],
+        }
+
+
+diagnosis_tree = DiagnosisTree()
+
+
+def _invalidate_on_change(mapper, connection, target):
+    diagnosis_tree.invalidate()
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(DiagnosisCode, _event_name, _invalidate_on_change)
@@ -0,0 +1,245 @@
+"""SQLite FTS5 full-text search over diagnosis codes and consultations.
+
+The FTS tables are external-content tables: they store only the search
+index and read column values from ``diagnosis_codes``/``consultations``.
+Triggers keep them in sync with every insert, update and delete.
+Soft-deleted consultations stay indexed until they are purged; searches
+filter them out.
+"""
+
+import html
+import re
+from typing import List, Optional
+
+from sqlalchemy import JSON, DateTime, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+# SQLite wraps matches in these control characters; the stored text around
+# them is HTML-escaped before they become <mark> tags, so snippets are safe
+# to render as HTML
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+SNIPPET_ELLIPSIS = "…"
+SNIPPET_TOKENS = 16
+
+# Column weights for bm25(): a hit in the patient name matters more than
+# the same word somewhere in a long treatment note.
+PATIENT_NAME_WEIGHT = 5.0
+TREATMENT_NOTES_WEIGHT = 1.0
+
+FTS_TABLES = {
+    "diagnosis_codes_fts": """
+        CREATE VIRTUAL TABLE diagnosis_codes_fts USING fts5(
+            description,
+            content='diagnosis_codes',
+            content_rowid='id',
+            tokenize='porter unicode61'
+        )
+    """,
+    "consultations_fts": """
+        CREATE VIRTUAL TABLE consultations_fts USING fts5(
+            patient_name,
+            treatment_notes,
+            content='consultations',
+            content_rowid='id',
+            tokenize='porter unicode61'
+        )
+    """,
+}
+
+FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS diagnosis_codes_fts_ai AFTER INSERT ON diagnosis_codes BEGIN
+        INSERT INTO diagnosis_codes_fts(rowid, description)
+        VALUES (new.id, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS diagnosis_codes_fts_ad AFTER DELETE ON diagnosis_codes BEGIN
+        INSERT INTO diagnosis_codes_fts(diagnosis_codes_fts, rowid, description)
+        VALUES ('delete', old.id, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS diagnosis_codes_fts_au AFTER UPDATE ON diagnosis_codes BEGIN
+        INSERT INTO diagnosis_codes_fts(diagnosis_codes_fts, rowid, description)
+        VALUES ('delete', old.id, old.description);
+        INSERT INTO diagnosis_codes_fts(rowid, description)
+        VALUES (new.id, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS consultations_fts_ai AFTER INSERT ON consultations BEGIN
+        INSERT INTO consultations_fts(rowid, patient_name, treatment_notes)
+        VALUES (new.id, new.patient_name, new.treatment_notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS consultations_fts_ad AFTER DELETE ON consultations BEGIN
+        INSERT INTO consultations_fts(consultations_fts, rowid, patient_name, treatment_notes)
+        VALUES ('delete', old.id, old.patient_name, old.treatment_notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS consultations_fts_au
+    AFTER UPDATE OF patient_name, treatment_notes ON consultations BEGIN
+        INSERT INTO consultations_fts(consultations_fts, rowid, patient_name, treatment_notes)
+        VALUES ('delete', old.id, old.patient_name, old.treatment_notes);
+        INSERT INTO consultations_fts(rowid, patient_name, treatment_notes)
+        VALUES (new.id, new.patient_name, new.treatment_notes);
+    END
+    """,
+]
+
+
+def fts_supported(engine: Engine) -> bool:
+    """FTS5 is only available on SQLite."""
+    return engine.dialect.name == "sqlite"
+
+
+def install_fts(engine: Engine) -> None:
+    """Create the FTS tables and sync triggers if they do not exist yet.
+
+    Newly created tables are backfilled from their content tables, so this
+    is safe to run against an existing database.
+    """
+    if not fts_supported(engine):
+        return
+
+    with engine.begin() as conn:
+        existing = {
+            row[0] for row in conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'table'")
+            )
+        }
+        for table, ddl in FTS_TABLES.items():
+            if table not in existing:
+                conn.execute(text(ddl))
+                conn.execute(text(f"INSERT INTO {table}({table}) VALUES ('rebuild')"))
+        for ddl in FTS_TRIGGERS:
+            conn.execute(text(ddl))
+
+
+def fts_installed(conn, table: str) -> bool:
+    """Whether ``table`` has an FTS index (i.e. migrations have run)."""
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": f"{table}_fts"}
+    ).first() is not None
+
+
+def drop_fts_triggers(conn, table: str) -> None:
+    """Stop syncing ``table``'s FTS index, e.g. for the length of a bulk load."""
+    for suffix in ("ai", "ad", "au"):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}"))
+
+
+def rebuild_fts(conn, table: str) -> None:
+    """Rebuild ``table``'s FTS index in one pass and reinstall its triggers."""
+    fts_table = f"{table}_fts"
+    conn.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
+    for ddl in FTS_TRIGGERS:
+        if f" ON {table} BEGIN" in ddl:
+            conn.execute(text(ddl))
+
+
+def render_snippet(marked: str) -> str:
+    """HTML-escape a highlighted excerpt and turn its match markers into
+    ``<mark>`` tags."""
+    return (
+        html.escape(marked, quote=False)
+        .replace(MATCH_START, HIGHLIGHT_START)
+        .replace(MATCH_END, HIGHLIGHT_END)
+    )
+
+
+def build_match_query(search: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term, so user input can never be
+    interpreted as FTS5 query syntax. All words must match.
+    """
+    tokens = TOKEN_RE.findall(search or "")
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search_diagnosis_codes_fts(db: Session, search: str, limit: int = 20) -> List[dict]:
+    """Return diagnosis codes ranked by bm25 with highlighted snippets."""
+    match = build_match_query(search)
+    if match is None:
+        return []
+
+    rows = db.execute(
+        text("""
+            SELECT d.id, d.code, d.description,
+                   highlight(diagnosis_codes_fts, 0, :start, :end) AS snippet,
+                   bm25(diagnosis_codes_fts) AS rank
+            FROM diagnosis_codes_fts
+            JOIN diagnosis_codes AS d ON d.id = diagnosis_codes_fts.rowid
+            WHERE diagnosis_codes_fts MATCH :match
+            ORDER BY rank
+            LIMIT :limit
+        """),
+        {"match": match, "start": MATCH_START, "end": MATCH_END, "limit": limit}
+    ).mappings()
+
+    return [
+        {
+            "id": row["id"],
+            "code": row["code"],
+            "description": row["description"],
+            "snippet": render_snippet(row["snippet"]),
+            "score": -row["rank"],
+        }
+        for row in rows
+    ]
+
+
+def search_consultations_fts(db: Session, search: str, limit: int = 20) -> List[dict]:
+    """Return consultations ranked by bm25 with highlighted snippets."""
+    match = build_match_query(search)
+    if match is None:
+        return []
+
+    # Typed columns decode the JSON and datetime values like the ORM does
+    rows = db.execute(
+        text("""
+            SELECT c.id, c.patient_name, c.diagnosis_codes, c.consultation_date,
+                   snippet(consultations_fts, -1, :start, :end, :ellipsis, :tokens) AS snippet,
+                   bm25(consultations_fts, :name_weight, :notes_weight) AS rank
+            FROM consultations_fts
+            JOIN consultations AS c ON c.id = consultations_fts.rowid
+            WHERE consultations_fts MATCH :match AND c.deleted_at IS NULL
+            ORDER BY rank
+            LIMIT :limit
+        """).columns(diagnosis_codes=JSON, consultation_date=DateTime),
+        {
+            "match": match,
+            "start": MATCH_START,
+            "end": MATCH_END,
+            "ellipsis": SNIPPET_ELLIPSIS,
+            "tokens": SNIPPET_TOKENS,
+            "name_weight": PATIENT_NAME_WEIGHT,
+            "notes_weight": TREATMENT_NOTES_WEIGHT,
+            "limit": limit,
+        }
+    ).mappings()
+
+    return [
+        {
+            "id": row["id"],
+            "patient_name": row["patient_name"],
+            "diagnosis_codes": row["diagnosis_codes"],
+            "consultation_date": row["consultation_date"],
+            "snippet": render_snippet(row["snippet"]),
+            "score": -row["rank"],
+        }
+        for row in rows
+    ]
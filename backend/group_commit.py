@@ -0,0 +1,113 @@
+"""Consultation inserts, one per transaction or group-committed.
+
+Every commit is a synchronous disk write (an fsync under the rollback
+journal or ``synchronous=FULL``, a WAL append otherwise) plus a round of
+write-lock handoff between connections. Under a burst of creates most of
+the time goes there, not into the inserts themselves.
+
+With ``GROUP_COMMIT_WINDOW_MS`` set, ``GroupCommitter`` collects the creates
+that arrive within that window (or until ``GROUP_COMMIT_MAX_BATCH``) and
+writes them in one transaction. Each request still gets its own response
+once the shared commit succeeded. If the batch fails, its creates are
+retried one by one, so a single bad row (e.g. a reused idempotency key)
+only fails its own request.
+"""
+
+import asyncio
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from idempotency import remember_response
+from models import Consultation
+from schemas import ConsultationResponse
+
+
+class PendingConsultation(NamedTuple):
+    """A validated create request waiting to be written."""
+    values: dict
+    idempotency_key: Optional[str] = None
+    request_hash: Optional[str] = None
+
+
+async def save_consultations(db: AsyncSession, pending: List[PendingConsultation]) -> List[bytes]:
+    """Insert ``pending`` in one transaction and return each JSON response."""
+    consultations = [Consultation(**item.values) for item in pending]
+    db.add_all(consultations)
+    # Assigns the ids the responses need
+    await db.flush()
+    bodies = [
+        ConsultationResponse.model_validate(consultation).model_dump_json().encode()
+        for consultation in consultations
+    ]
+    for item, body in zip(pending, bodies):
+        if item.idempotency_key:
+            await remember_response(db, item.idempotency_key, item.request_hash, 201, body)
+    await db.commit()
+    return bodies
+
+
+class GroupCommitter:
+    """Batches concurrent ``save_consultations`` calls into shared commits."""
+
+    def __init__(self, session_factory: Callable[[], AsyncSession],
+                 window: float, max_batch: int = 64):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[PendingConsultation, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        # Batches commit one after another, in arrival order
+        self._lock = asyncio.Lock()
+
+    async def submit(self, item: PendingConsultation) -> bytes:
+        """Queue ``item`` and wait until its batch is committed."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._start_batch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._start_batch)
+        return await future
+
+    def _start_batch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._commit(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _commit(self, batch: List[Tuple[PendingConsultation, asyncio.Future]]) -> None:
+        async with self._lock:
+            try:
+                async with self.session_factory() as db:
+                    bodies = await save_consultations(db, [item for item, _ in batch])
+            except Exception:
+                # Isolate the failure: every item gets its own transaction
+                for item, future in batch:
+                    try:
+                        async with self.session_factory() as db:
+                            body = (await save_consultations(db, [item]))[0]
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        if not future.done():
+                            future.set_result(body)
+                return
+
+            for (_, future), body in zip(batch, bodies):
+                # The client may have disconnected meanwhile
+                if not future.done():
+                    future.set_result(body)
+
+    async def drain(self) -> None:
+        """Commit whatever is queued and wait for running batches."""
+        self._start_batch()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
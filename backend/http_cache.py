@@ -0,0 +1,76 @@
+"""HTTP caching helpers: table version stamps, ETags and conditional requests.
+
+Slowly changing tables (the ICD-10 codes) carry a version stamp in
+``app_meta``. Whoever rewrites the table bumps the stamp; responses derive
+a strong ETag from it, so clients can revalidate with ``If-None-Match``
+and get a ``304 Not Modified`` instead of the full body.
+"""
+
+import time
+import uuid
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import AppMeta
+
+DIAGNOSIS_CODES_VERSION = "diagnosis_codes_version"
+
+
+def new_stamp() -> str:
+    """A fresh, globally unique version stamp."""
+    return uuid.uuid4().hex
+
+
+def read_version(db: Session, key: str) -> Optional[str]:
+    """Current stamp for ``key``, or None if it was never set."""
+    return db.scalar(select(AppMeta.value).where(AppMeta.key == key))
+
+
+def bump_version(db: Session, key: str) -> str:
+    """Give ``key`` a new stamp. The caller commits."""
+    stamp = new_stamp()
+    db.merge(AppMeta(key=key, value=stamp))
+    return stamp
+
+
+class VersionCache:
+    """Reads a version stamp at most once per ``interval`` seconds.
+
+    This keeps the per-request cost of a conditional GET to a dict lookup
+    while still noticing, within ``interval``, a reload done by another
+    process such as ``init_db.py``.
+    """
+
+    def __init__(self, key: str, interval: float):
+        self.key = key
+        self.interval = interval
+        self._value: Optional[str] = None
+        self._checked_at = float("-inf")
+
+    def expire(self) -> None:
+        """Force the next ``get`` to read the stamp from the database."""
+        self._checked_at = float("-inf")
+
+    async def get(self, db: AsyncSession) -> Optional[str]:
+        now = time.monotonic()
+        if now - self._checked_at >= self.interval:
+            self._value = await db.run_sync(read_version, self.key)
+            self._checked_at = now
+        return self._value
+
+
+def make_etag(*parts: str) -> str:
+    """Strong ETag built from a version stamp and any qualifiers."""
+    return '"' + "-".join(parts) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header matches ``etag`` (or is ``*``)."""
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
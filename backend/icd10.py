@@ -0,0 +1,409 @@
+"""ICD-10-CM chapters and blocks, and where a code sits in them.
+
+A code belongs to a category (its first three characters: ``A04.72`` is in
+``A04``), the category to a block of categories (``A00-A09``) and the block
+to a chapter (1, ``A00-B99``). Chapters and blocks follow the ICD-10-CM
+tabular list; chapters cover every category, and blocks every category in
+use (the tabular list skips a few, e.g. ``A10``-``A14``).
+
+Category ranges compare as strings, which orders most letter-suffixed
+categories correctly (``O99`` < ``O9A``). The exceptions are singleton
+blocks nested in a wider range and the two categories in ``CATEGORY_BLOCKS``.
+"""
+
+from bisect import bisect_right
+from itertools import accumulate
+from typing import NamedTuple, Optional
+
+
+class CodeRange(NamedTuple):
+    first: str
+    last: str
+    title: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.first}-{self.last}"
+
+
+class Classification(NamedTuple):
+    """Where a code sits in the hierarchy."""
+    chapter: Optional[int]
+    block: Optional[str]
+    category: str
+
+
+# Chapter number -> categories it covers
+CHAPTERS = {
+    1: CodeRange("A00", "B99", "Certain infectious and parasitic diseases"),
+    2: CodeRange("C00", "D49", "Neoplasms"),
+    3: CodeRange("D50", "D89", "Diseases of the blood and blood-forming organs and certain disorders involving the immune mechanism"),
+    4: CodeRange("E00", "E89", "Endocrine, nutritional and metabolic diseases"),
+    5: CodeRange("F01", "F99", "Mental, behavioral and neurodevelopmental disorders"),
+    6: CodeRange("G00", "G99", "Diseases of the nervous system"),
+    7: CodeRange("H00", "H59", "Diseases of the eye and adnexa"),
+    8: CodeRange("H60", "H95", "Diseases of the ear and mastoid process"),
+    9: CodeRange("I00", "I99", "Diseases of the circulatory system"),
+    10: CodeRange("J00", "J99", "Diseases of the respiratory system"),
+    11: CodeRange("K00", "K95", "Diseases of the digestive system"),
+    12: CodeRange("L00", "L99", "Diseases of the skin and subcutaneous tissue"),
+    13: CodeRange("M00", "M99", "Diseases of the musculoskeletal system and connective tissue"),
+    14: CodeRange("N00", "N99", "Diseases of the genitourinary system"),
+    15: CodeRange("O00", "O9A", "Pregnancy, childbirth and the puerperium"),
+    16: CodeRange("P00", "P96", "Certain conditions originating in the perinatal period"),
+    17: CodeRange("Q00", "Q99", "Congenital malformations, deformations and chromosomal abnormalities"),
+    18: CodeRange("R00", "R99", "Symptoms, signs and abnormal clinical and laboratory findings, not elsewhere classified"),
+    19: CodeRange("S00", "T88", "Injury, poisoning and certain other consequences of external causes"),
+    20: CodeRange("V00", "Y99", "External causes of morbidity"),
+    21: CodeRange("Z00", "Z99", "Factors influencing health status and contact with health services"),
+    22: CodeRange("U00", "U85", "Codes for special purposes"),
+}
+
+BLOCKS = [
+    # 1: Certain infectious and parasitic diseases
+    CodeRange("A00", "A09", "Intestinal infectious diseases"),
+    CodeRange("A15", "A19", "Tuberculosis"),
+    CodeRange("A20", "A28", "Certain zoonotic bacterial diseases"),
+    CodeRange("A30", "A49", "Other bacterial diseases"),
+    CodeRange("A50", "A64", "Infections with a predominantly sexual mode of transmission"),
+    CodeRange("A65", "A69", "Other spirochetal diseases"),
+    CodeRange("A70", "A74", "Other diseases caused by chlamydiae"),
+    CodeRange("A75", "A79", "Rickettsioses"),
+    CodeRange("A80", "A89", "Viral and prion infections of the central nervous system"),
+    CodeRange("A90", "A99", "Arthropod-borne viral fevers and viral hemorrhagic fevers"),
+    CodeRange("B00", "B09", "Viral infections characterized by skin and mucous membrane lesions"),
+    CodeRange("B10", "B10", "Other human herpesviruses"),
+    CodeRange("B15", "B19", "Viral hepatitis"),
+    CodeRange("B20", "B20", "Human immunodeficiency virus [HIV] disease"),
+    CodeRange("B25", "B34", "Other viral diseases"),
+    CodeRange("B35", "B49", "Mycoses"),
+    CodeRange("B50", "B64", "Protozoal diseases"),
+    CodeRange("B65", "B83", "Helminthiases"),
+    CodeRange("B85", "B89", "Pediculosis, acariasis and other infestations"),
+    CodeRange("B90", "B94", "Sequelae of infectious and parasitic diseases"),
+    CodeRange("B95", "B97", "Bacterial and viral infectious agents"),
+    CodeRange("B99", "B99", "Other infectious diseases"),
+    # 2: Neoplasms
+    CodeRange("C00", "C14", "Malignant neoplasms of lip, oral cavity and pharynx"),
+    CodeRange("C15", "C26", "Malignant neoplasms of digestive organs"),
+    CodeRange("C30", "C39", "Malignant neoplasms of respiratory and intrathoracic organs"),
+    CodeRange("C40", "C41", "Malignant neoplasms of bone and articular cartilage"),
+    CodeRange("C43", "C44", "Melanoma and other malignant neoplasms of skin"),
+    CodeRange("C45", "C49", "Malignant neoplasms of mesothelial and soft tissue"),
+    CodeRange("C50", "C50", "Malignant neoplasms of breast"),
+    CodeRange("C51", "C58", "Malignant neoplasms of female genital organs"),
+    CodeRange("C60", "C63", "Malignant neoplasms of male genital organs"),
+    CodeRange("C64", "C68", "Malignant neoplasms of urinary tract"),
+    CodeRange("C69", "C72", "Malignant neoplasms of eye, brain and other parts of central nervous system"),
+    CodeRange("C73", "C75", "Malignant neoplasms of thyroid and other endocrine glands"),
+    CodeRange("C7A", "C7A", "Malignant neuroendocrine tumors"),
+    CodeRange("C7B", "C7B", "Secondary neuroendocrine tumors"),
+    CodeRange("C76", "C80", "Malignant neoplasms of ill-defined, other secondary and unspecified sites"),
+    CodeRange("C81", "C96", "Malignant neoplasms of lymphoid, hematopoietic and related tissue"),
+    CodeRange("D00", "D09", "In situ neoplasms"),
+    CodeRange("D10", "D36", "Benign neoplasms, except benign neuroendocrine tumors"),
+    CodeRange("D3A", "D3A", "Benign neuroendocrine tumors"),
+    CodeRange("D37", "D48", "Neoplasms of uncertain behavior, polycythemia vera and myelodysplastic syndromes"),
+    CodeRange("D49", "D49", "Neoplasms of unspecified behavior"),
+    # 3: Diseases of the blood and blood-forming organs
+    CodeRange("D50", "D53", "Nutritional anemias"),
+    CodeRange("D55", "D59", "Hemolytic anemias"),
+    CodeRange("D60", "D64", "Aplastic and other anemias and other bone marrow failure syndromes"),
+    CodeRange("D65", "D69", "Coagulation defects, purpura and other hemorrhagic conditions"),
+    CodeRange("D70", "D77", "Other disorders of blood and blood-forming organs"),
+    CodeRange("D78", "D78", "Intraoperative and postprocedural complications of the spleen"),
+    CodeRange("D80", "D89", "Certain disorders involving the immune mechanism"),
+    # 4: Endocrine, nutritional and metabolic diseases
+    CodeRange("E00", "E07", "Disorders of thyroid gland"),
+    CodeRange("E08", "E13", "Diabetes mellitus"),
+    CodeRange("E15", "E16", "Other disorders of glucose regulation and pancreatic internal secretion"),
+    CodeRange("E20", "E35", "Disorders of other endocrine glands"),
+    CodeRange("E36", "E36", "Intraoperative complications of endocrine system"),
+    CodeRange("E40", "E46", "Malnutrition"),
+    CodeRange("E50", "E64", "Other nutritional deficiencies"),
+    CodeRange("E65", "E68", "Overweight, obesity and other hyperalimentation"),
+    CodeRange("E70", "E88", "Metabolic disorders"),
+    CodeRange("E89", "E89", "Postprocedural endocrine and metabolic complications and disorders, not elsewhere classified"),
+    # 5: Mental, behavioral and neurodevelopmental disorders
+    CodeRange("F01", "F09", "Mental disorders due to known physiological conditions"),
+    CodeRange("F10", "F19", "Mental and behavioral disorders due to psychoactive substance use"),
+    CodeRange("F20", "F29", "Schizophrenia, schizotypal, delusional, and other non-mood psychotic disorders"),
+    CodeRange("F30", "F39", "Mood [affective] disorders"),
+    CodeRange("F40", "F48", "Anxiety, dissociative, stress-related, somatoform and other nonpsychotic mental disorders"),
+    CodeRange("F50", "F59", "Behavioral syndromes associated with physiological disturbances and physical factors"),
+    CodeRange("F60", "F69", "Disorders of adult personality and behavior"),
+    CodeRange("F70", "F79", "Intellectual disabilities"),
+    CodeRange("F80", "F89", "Pervasive and specific developmental disorders"),
+    CodeRange("F90", "F98", "Behavioral and emotional disorders with onset usually occurring in childhood and adolescence"),
+    CodeRange("F99", "F99", "Unspecified mental disorder"),
+    # 6: Diseases of the nervous system
+    CodeRange("G00", "G09", "Inflammatory diseases of the central nervous system"),
+    CodeRange("G10", "G14", "Systemic atrophies primarily affecting the central nervous system"),
+    CodeRange("G20", "G26", "Extrapyramidal and movement disorders"),
+    CodeRange("G30", "G32", "Other degenerative diseases of the nervous system"),
+    CodeRange("G35", "G37", "Demyelinating diseases of the central nervous system"),
+    CodeRange("G40", "G47", "Episodic and paroxysmal disorders"),
+    CodeRange("G50", "G59", "Nerve, nerve root and plexus disorders"),
+    CodeRange("G60", "G65", "Polyneuropathies and other disorders of the peripheral nervous system"),
+    CodeRange("G70", "G73", "Diseases of myoneural junction and muscle"),
+    CodeRange("G80", "G83", "Cerebral palsy and other paralytic syndromes"),
+    CodeRange("G89", "G99", "Other disorders of the nervous system"),
+    # 7: Diseases of the eye and adnexa
+    CodeRange("H00", "H05", "Disorders of eyelid, lacrimal system and orbit"),
+    CodeRange("H10", "H11", "Disorders of conjunctiva"),
+    CodeRange("H15", "H22", "Disorders of sclera, cornea, iris and ciliary body"),
+    CodeRange("H25", "H28", "Disorders of lens"),
+    CodeRange("H30", "H36", "Disorders of choroid and retina"),
+    CodeRange("H40", "H42", "Glaucoma"),
+    CodeRange("H43", "H44", "Disorders of vitreous body and globe"),
+    CodeRange("H46", "H47", "Disorders of optic nerve and visual pathways"),
+    CodeRange("H49", "H52", "Disorders of ocular muscles, binocular movement, accommodation and refraction"),
+    CodeRange("H53", "H54", "Visual disturbances and blindness"),
+    CodeRange("H55", "H57", "Other disorders of eye and adnexa"),
+    CodeRange("H59", "H59", "Intraoperative and postprocedural complications and disorders of eye and adnexa, not elsewhere classified"),
+    # 8: Diseases of the ear and mastoid process
+    CodeRange("H60", "H62", "Diseases of external ear"),
+    CodeRange("H65", "H75", "Diseases of middle ear and mastoid"),
+    CodeRange("H80", "H83", "Diseases of inner ear"),
+    CodeRange("H90", "H94", "Other disorders of ear"),
+    CodeRange("H95", "H95", "Intraoperative and postprocedural complications and disorders of ear and mastoid process, not elsewhere classified"),
+    # 9: Diseases of the circulatory system
+    CodeRange("I00", "I02", "Acute rheumatic fever"),
+    CodeRange("I05", "I09", "Chronic rheumatic heart diseases"),
+    CodeRange("I10", "I1A", "Hypertensive diseases"),
+    CodeRange("I20", "I25", "Ischemic heart diseases"),
+    CodeRange("I26", "I28", "Pulmonary heart disease and diseases of pulmonary circulation"),
+    CodeRange("I30", "I5A", "Other forms of heart disease"),
+    CodeRange("I60", "I69", "Cerebrovascular diseases"),
+    CodeRange("I70", "I79", "Diseases of arteries, arterioles and capillaries"),
+    CodeRange("I80", "I89", "Diseases of veins, lymphatic vessels and lymph nodes, not elsewhere classified"),
+    CodeRange("I95", "I99", "Other and unspecified disorders of the circulatory system"),
+    # 10: Diseases of the respiratory system
+    CodeRange("J00", "J06", "Acute upper respiratory infections"),
+    CodeRange("J09", "J18", "Influenza and pneumonia"),
+    CodeRange("J20", "J22", "Other acute lower respiratory infections"),
+    CodeRange("J30", "J39", "Other diseases of upper respiratory tract"),
+    CodeRange("J40", "J4A", "Chronic lower respiratory diseases"),
+    CodeRange("J60", "J70", "Lung diseases due to external agents"),
+    CodeRange("J80", "J84", "Other respiratory diseases principally affecting the interstitium"),
+    CodeRange("J85", "J86", "Suppurative and necrotic conditions of the lower respiratory tract"),
+    CodeRange("J90", "J94", "Other diseases of the pleura"),
+    CodeRange("J95", "J95", "Intraoperative and postprocedural complications and disorders of respiratory system, not elsewhere classified"),
+    CodeRange("J96", "J99", "Other diseases of the respiratory system"),
+    # 11: Diseases of the digestive system
+    CodeRange("K00", "K14", "Diseases of oral cavity and salivary glands"),
+    CodeRange("K20", "K31", "Diseases of esophagus, stomach and duodenum"),
+    CodeRange("K35", "K38", "Diseases of appendix"),
+    CodeRange("K40", "K46", "Hernia"),
+    CodeRange("K50", "K52", "Noninfective enteritis and colitis"),
+    CodeRange("K55", "K64", "Other diseases of intestines"),
+    CodeRange("K65", "K68", "Diseases of peritoneum and retroperitoneum"),
+    CodeRange("K70", "K77", "Diseases of liver"),
+    CodeRange("K80", "K87", "Disorders of gallbladder, biliary tract and pancreas"),
+    CodeRange("K90", "K95", "Other diseases of the digestive system"),
+    # 12: Diseases of the skin and subcutaneous tissue
+    CodeRange("L00", "L08", "Infections of the skin and subcutaneous tissue"),
+    CodeRange("L10", "L14", "Bullous disorders"),
+    CodeRange("L20", "L30", "Dermatitis and eczema"),
+    CodeRange("L40", "L45", "Papulosquamous disorders"),
+    CodeRange("L49", "L54", "Urticaria and erythema"),
+    CodeRange("L55", "L59", "Radiation-related disorders of the skin and subcutaneous tissue"),
+    CodeRange("L60", "L75", "Disorders of skin appendages"),
+    CodeRange("L76", "L76", "Intraoperative and postprocedural complications of skin and subcutaneous tissue"),
+    CodeRange("L80", "L99", "Other disorders of the skin and subcutaneous tissue"),
+    # 13: Diseases of the musculoskeletal system and connective tissue
+    CodeRange("M00", "M02", "Infectious arthropathies"),
+    CodeRange("M04", "M04", "Autoinflammatory syndromes"),
+    CodeRange("M05", "M14", "Inflammatory polyarthropathies"),
+    CodeRange("M15", "M19", "Osteoarthritis"),
+    CodeRange("M20", "M25", "Other joint disorders"),
+    CodeRange("M26", "M27", "Dentofacial anomalies [including malocclusion] and other disorders of jaw"),
+    CodeRange("M30", "M36", "Systemic connective tissue disorders"),
+    CodeRange("M40", "M43", "Deforming dorsopathies"),
+    CodeRange("M45", "M49", "Spondylopathies"),
+    CodeRange("M50", "M54", "Other dorsopathies"),
+    CodeRange("M60", "M63", "Disorders of muscles"),
+    CodeRange("M65", "M67", "Disorders of synovium and tendon"),
+    CodeRange("M70", "M79", "Other soft tissue disorders"),
+    CodeRange("M80", "M85", "Disorders of bone density and structure"),
+    CodeRange("M86", "M90", "Other osteopathies"),
+    CodeRange("M91", "M94", "Chondropathies"),
+    CodeRange("M95", "M95", "Other disorders of the musculoskeletal system and connective tissue"),
+    CodeRange("M96", "M96", "Intraoperative and postprocedural complications and disorders of musculoskeletal system, not elsewhere classified"),
+    CodeRange("M97", "M97", "Periprosthetic fracture around internal prosthetic joint"),
+    CodeRange("M99", "M99", "Biomechanical lesions, not elsewhere classified"),
+    # 14: Diseases of the genitourinary system
+    CodeRange("N00", "N08", "Glomerular diseases"),
+    CodeRange("N10", "N16", "Renal tubulo-interstitial diseases"),
+    CodeRange("N17", "N19", "Acute kidney failure and chronic kidney disease"),
+    CodeRange("N20", "N23", "Urolithiasis"),
+    CodeRange("N25", "N29", "Other disorders of kidney and ureter"),
+    CodeRange("N30", "N39", "Other diseases of the urinary system"),
+    CodeRange("N40", "N53", "Diseases of male genital organs"),
+    CodeRange("N60", "N65", "Disorders of breast"),
+    CodeRange("N70", "N77", "Inflammatory diseases of female pelvic organs"),
+    CodeRange("N80", "N98", "Noninflammatory disorders of female genital tract"),
+    CodeRange("N99", "N99", "Intraoperative and postprocedural complications and disorders of genitourinary system, not elsewhere classified"),
+    # 15: Pregnancy, childbirth and the puerperium
+    CodeRange("O00", "O08", "Pregnancy with abortive outcome"),
+    CodeRange("O09", "O09", "Supervision of high risk pregnancy"),
+    CodeRange("O10", "O16", "Edema, proteinuria and hypertensive disorders in pregnancy, childbirth and the puerperium"),
+    CodeRange("O20", "O29", "Other maternal disorders predominantly related to pregnancy"),
+    CodeRange("O30", "O48", "Maternal care related to the fetus and amniotic cavity and possible delivery problems"),
+    CodeRange("O60", "O77", "Complications of labor and delivery"),
+    CodeRange("O80", "O82", "Encounter for delivery"),
+    CodeRange("O85", "O92", "Complications predominantly related to the puerperium"),
+    CodeRange("O94", "O9A", "Other obstetric conditions, not elsewhere classified"),
+    # 16: Certain conditions originating in the perinatal period
+    CodeRange("P00", "P04", "Newborn affected by maternal factors and by complications of pregnancy, labor, and delivery"),
+    CodeRange("P05", "P08", "Disorders of newborn related to length of gestation and fetal growth"),
+    CodeRange("P09", "P09", "Abnormal findings on neonatal screening"),
+    CodeRange("P10", "P15", "Birth trauma"),
+    CodeRange("P19", "P29", "Respiratory and cardiovascular disorders specific to the perinatal period"),
+    CodeRange("P35", "P39", "Infections specific to the perinatal period"),
+    CodeRange("P50", "P61", "Hemorrhagic and hematological disorders of newborn"),
+    CodeRange("P70", "P74", "Transitory endocrine and metabolic disorders specific to newborn"),
+    CodeRange("P76", "P78", "Digestive system disorders of newborn"),
+    CodeRange("P80", "P83", "Conditions involving the integument and temperature regulation of newborn"),
+    CodeRange("P84", "P84", "Other problems with newborn"),
+    CodeRange("P90", "P96", "Other disorders originating in the perinatal period"),
+    # 17: Congenital malformations, deformations and chromosomal abnormalities
+    CodeRange("Q00", "Q07", "Congenital malformations of the nervous system"),
+    CodeRange("Q10", "Q18", "Congenital malformations of eye, ear, face and neck"),
+    CodeRange("Q20", "Q28", "Congenital malformations of the circulatory system"),
+    CodeRange("Q30", "Q34", "Congenital malformations of the respiratory system"),
+    CodeRange("Q35", "Q37", "Cleft lip and cleft palate"),
+    CodeRange("Q38", "Q45", "Other congenital malformations of the digestive system"),
+    CodeRange("Q50", "Q56", "Congenital malformations of genital organs"),
+    CodeRange("Q60", "Q64", "Congenital malformations of the urinary system"),
+    CodeRange("Q65", "Q79", "Congenital malformations and deformations of the musculoskeletal system"),
+    CodeRange("Q80", "Q89", "Other congenital malformations"),
+    CodeRange("Q90", "Q99", "Chromosomal abnormalities, not elsewhere classified"),
+    # 18: Symptoms, signs and abnormal clinical and laboratory findings
+    CodeRange("R00", "R09", "Symptoms and signs involving the circulatory and respiratory systems"),
+    CodeRange("R10", "R19", "Symptoms and signs involving the digestive system and abdomen"),
+    CodeRange("R20", "R23", "Symptoms and signs involving the skin and subcutaneous tissue"),
+    CodeRange("R25", "R29", "Symptoms and signs involving the nervous and musculoskeletal systems"),
+    CodeRange("R30", "R39", "Symptoms and signs involving the genitourinary system"),
+    CodeRange("R40", "R46", "Symptoms and signs involving cognition, perception, emotional state and behavior"),
+    CodeRange("R47", "R49", "Symptoms and signs involving speech and voice"),
+    CodeRange("R50", "R69", "General symptoms and signs"),
+    CodeRange("R70", "R79", "Abnormal findings on examination of blood, without diagnosis"),
+    CodeRange("R80", "R82", "Abnormal findings on examination of urine, without diagnosis"),
+    CodeRange("R83", "R89", "Abnormal findings on examination of other body fluids, substances and tissues, without diagnosis"),
+    CodeRange("R90", "R94", "Abnormal findings on diagnostic imaging and in function studies, without diagnosis"),
+    CodeRange("R97", "R97", "Abnormal tumor markers"),
+    CodeRange("R99", "R99", "Ill-defined and unknown cause of mortality"),
+    # 19: Injury, poisoning and certain other consequences of external causes
+    CodeRange("S00", "S09", "Injuries to the head"),
+    CodeRange("S10", "S19", "Injuries to the neck"),
+    CodeRange("S20", "S29", "Injuries to the thorax"),
+    CodeRange("S30", "S39", "Injuries to the abdomen, lower back, lumbar spine, pelvis and external genitals"),
+    CodeRange("S40", "S49", "Injuries to the shoulder and upper arm"),
+    CodeRange("S50", "S59", "Injuries to the elbow and forearm"),
+    CodeRange("S60", "S69", "Injuries to the wrist, hand and fingers"),
+    CodeRange("S70", "S79", "Injuries to the hip and thigh"),
+    CodeRange("S80", "S89", "Injuries to the knee and lower leg"),
+    CodeRange("S90", "S99", "Injuries to the ankle and foot"),
+    CodeRange("T07", "T07", "Injuries involving multiple body regions"),
+    CodeRange("T14", "T14", "Injury of unspecified body region"),
+    CodeRange("T15", "T19", "Effects of foreign body entering through natural orifice"),
+    CodeRange("T20", "T25", "Burns and corrosions of external body surface, specified by site"),
+    CodeRange("T26", "T28", "Burns and corrosions confined to eye and internal organs"),
+    CodeRange("T30", "T32", "Burns and corrosions of multiple and unspecified body regions"),
+    CodeRange("T33", "T34", "Frostbite"),
+    CodeRange("T36", "T50", "Poisoning by, adverse effect of and underdosing of drugs, medicaments and biological substances"),
+    CodeRange("T51", "T65", "Toxic effects of substances chiefly nonmedicinal as to source"),
+    CodeRange("T66", "T78", "Other and unspecified effects of external causes"),
+    CodeRange("T79", "T79", "Certain early complications of trauma"),
+    CodeRange("T80", "T88", "Complications of surgical and medical care, not elsewhere classified"),
+    # 20: External causes of morbidity
+    CodeRange("V00", "V09", "Pedestrian injured in transport accident"),
+    CodeRange("V10", "V19", "Pedal cycle rider injured in transport accident"),
+    CodeRange("V20", "V29", "Motorcycle rider injured in transport accident"),
+    CodeRange("V30", "V39", "Occupant of three-wheeled motor vehicle injured in transport accident"),
+    CodeRange("V40", "V49", "Car occupant injured in transport accident"),
+    CodeRange("V50", "V59", "Occupant of pick-up truck or van injured in transport accident"),
+    CodeRange("V60", "V69", "Occupant of heavy transport vehicle injured in transport accident"),
+    CodeRange("V70", "V79", "Bus occupant injured in transport accident"),
+    CodeRange("V80", "V89", "Other land transport accidents"),
+    CodeRange("V90", "V94", "Water transport accidents"),
+    CodeRange("V95", "V97", "Air and space transport accidents"),
+    CodeRange("V98", "V99", "Other and unspecified transport accidents"),
+    CodeRange("W00", "W19", "Slipping, tripping, stumbling and falls"),
+    CodeRange("W20", "W49", "Exposure to inanimate mechanical forces"),
+    CodeRange("W50", "W64", "Exposure to animate mechanical forces"),
+    CodeRange("W65", "W74", "Accidental non-transport drowning and submersion"),
+    CodeRange("W85", "W99", "Exposure to electric current, radiation and extreme ambient air temperature and pressure"),
+    CodeRange("X00", "X08", "Exposure to smoke, fire and flames"),
+    CodeRange("X10", "X19", "Contact with heat and hot substances"),
+    CodeRange("X30", "X39", "Exposure to forces of nature"),
+    CodeRange("X50", "X50", "Overexertion and strenuous or repetitive movements"),
+    CodeRange("X52", "X58", "Accidental exposure to other specified factors"),
+    CodeRange("X71", "X83", "Intentional self-harm"),
+    CodeRange("X92", "Y09", "Assault"),
+    CodeRange("Y21", "Y33", "Event of undetermined intent"),
+    CodeRange("Y35", "Y38", "Legal intervention, operations of war, military operations, and terrorism"),
+    CodeRange("Y62", "Y84", "Complications of medical and surgical care"),
+    CodeRange("Y90", "Y99", "Supplementary factors related to causes of morbidity classified elsewhere"),
+    # 21: Factors influencing health status and contact with health services
+    CodeRange("Z00", "Z13", "Persons encountering health services for examinations"),
+    CodeRange("Z14", "Z15", "Genetic carrier and genetic susceptibility to disease"),
+    CodeRange("Z16", "Z16", "Resistance to antimicrobial drugs"),
+    CodeRange("Z17", "Z17", "Estrogen receptor status"),
+    CodeRange("Z18", "Z18", "Retained foreign body fragments"),
+    CodeRange("Z19", "Z19", "Hormone sensitivity malignancy status"),
+    CodeRange("Z20", "Z29", "Persons with potential health hazards related to communicable diseases"),
+    CodeRange("Z30", "Z39", "Persons encountering health services in circumstances related to reproduction"),
+    CodeRange("Z40", "Z53", "Encounters for other specific health care"),
+    CodeRange("Z55", "Z65", "Persons with potential health hazards related to socioeconomic and psychosocial circumstances"),
+    CodeRange("Z66", "Z66", "Do not resuscitate status"),
+    CodeRange("Z67", "Z67", "Blood type"),
+    CodeRange("Z68", "Z68", "Body mass index [BMI]"),
+    CodeRange("Z69", "Z76", "Persons encountering health services in other circumstances"),
+    CodeRange("Z77", "Z99", "Persons with potential health hazards related to family and personal history and certain conditions influencing health status"),
+    # 22: Codes for special purposes
+    CodeRange("U00", "U49", "Provisional assignment of new diseases of uncertain etiology or emergency use"),
+]
+BLOCKS_BY_KEY = {block.key: block for block in BLOCKS}
+
+# Letter-suffixed categories placed in a block whose range, compared as
+# strings, does not cover them (M1A sorts after M19, Z3A after Z39)
+CATEGORY_BLOCKS = {
+    "M1A": "M05-M14",
+    "Z3A": "Z30-Z39",
+}
+
+# Range starts in order, for bisecting
+_CHAPTER_ORDER = sorted(CHAPTERS, key=lambda number: CHAPTERS[number].first)
+_CHAPTER_FIRSTS = [CHAPTERS[number].first for number in _CHAPTER_ORDER]
+_BLOCK_ORDER = sorted(BLOCKS, key=lambda block: block.first)
+_BLOCK_FIRSTS = [block.first for block in _BLOCK_ORDER]
+# Highest ``last`` among the blocks up to each position: a singleton block
+# such as C7A sits inside C76-C80, so the block covering a category is not
+# always the nearest one starting before it
+_BLOCK_REACH = list(accumulate((block.last for block in _BLOCK_ORDER), max))
+
+
+def category_of(code: str) -> str:
+    return code.replace(".", "").strip().upper()[:3]
+
+
+def classify(code: str) -> Classification:
+    """The chapter, block and category of ``code``; chapter and block are
+    None when no known range covers it."""
+    category = category_of(code)
+
+    chapter = None
+    position = bisect_right(_CHAPTER_FIRSTS, category) - 1
+    if position >= 0 and category <= CHAPTERS[_CHAPTER_ORDER[position]].last:
+        chapter = _CHAPTER_ORDER[position]
+
+    block = CATEGORY_BLOCKS.get(category)
+    position = bisect_right(_BLOCK_FIRSTS, category) - 1
+    while block is None and position >= 0 and _BLOCK_REACH[position] >= category:
+        if category <= _BLOCK_ORDER[position].last:
+            block = _BLOCK_ORDER[position].key
+        position -= 1
+
+    return Classification(chapter, block, category)
@@ -0,0 +1,118 @@
+"""Idempotency-Key support for creating consultations.
+
+A client that sends ``Idempotency-Key: <unique value>`` with a POST can
+retry it after a timeout without creating a duplicate. The key, a hash of
+the request body and the response are stored in ``idempotency_keys`` in the
+same transaction as the consultation, so either both exist or neither does.
+
+- A retry with the same key and body gets the stored response back, marked
+  ``Idempotent-Replayed: true``, without touching ``consultations``.
+- The same key with a different body is rejected with 422.
+- Two concurrent requests with one key race on the table's primary key; the
+  loser's transaction rolls back and it replays the winner's response.
+
+Only successful creates are stored: a request that failed validation did
+not change anything, so retrying it is already safe. Keys expire after
+``IDEMPOTENCY_TTL_SECONDS`` and are purged in the background.
+"""
+
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import orjson
+from fastapi import HTTPException, Response, status
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import config
+from models import IdempotencyKey
+
+logger = logging.getLogger("cliniccare.idempotency")
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+PURGE_BATCH_SIZE = 1000
+
+
+def request_fingerprint(payload) -> str:
+    """Hash of a request body, independent of key order."""
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+async def find_stored_response(db: AsyncSession, key: str) -> Optional[IdempotencyKey]:
+    """The unexpired stored response for ``key``, if any."""
+    record = await db.get(IdempotencyKey, key)
+    if record is None or record.expires_at <= datetime.utcnow():
+        return None
+    return record
+
+
+def replay_response(record: IdempotencyKey, request_hash: str) -> Response:
+    """The stored response, or 422 if the key was used for another request."""
+    if record.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{IDEMPOTENCY_HEADER} was already used with a different request"
+        )
+    return Response(
+        content=record.response_body,
+        status_code=record.status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"}
+    )
+
+
+async def remember_response(db: AsyncSession, key: str, request_hash: str,
+                            status_code: int, body: bytes) -> None:
+    """Store a response under ``key``; the caller commits.
+
+    An expired row for the same key is replaced. A live one makes the
+    commit fail with an IntegrityError.
+    """
+    now = datetime.utcnow()
+    await db.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= now)
+    )
+    db.add(IdempotencyKey(
+        key=key,
+        request_hash=request_hash,
+        status_code=status_code,
+        response_body=body.decode(),
+        created_at=now,
+        expires_at=now + timedelta(seconds=config.IDEMPOTENCY_TTL_SECONDS)
+    ))
+
+
+async def purge_expired_keys(db: AsyncSession, batch_size: int = PURGE_BATCH_SIZE) -> int:
+    """Delete expired keys in short transactions. Returns the number deleted."""
+    deleted = 0
+    while True:
+        expired = (
+            select(IdempotencyKey.key)
+            .where(IdempotencyKey.expires_at <= datetime.utcnow())
+            .limit(batch_size)
+        )
+        result = await db.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(expired)))
+        await db.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+async def purge_periodically(session_factory: Callable[[], AsyncSession],
+                             interval: float) -> None:
+    """Run ``purge_expired_keys`` every ``interval`` seconds until cancelled."""
+    while True:
+        try:
+            async with session_factory() as db:
+                deleted = await purge_expired_keys(db)
+            if deleted:
+                logger.info("Purged %d expired idempotency keys", deleted)
+        except Exception:
+            logger.exception("Purging expired idempotency keys failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,51 @@
+"""Bulk import consultations from an NDJSON or CSV file."""
+
+import argparse
+import sys
+
+from database import engine, SessionLocal, Base
+from migrations import run_migrations
+from ingest import ingest_consultations, iter_records, detect_format, DEFAULT_BATCH_SIZE, FORMATS
+
+
+def import_file(path: str, fmt: str = None, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Stream a file into the consultations table and print a report."""
+    print("Preparing database tables...")
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    
+    fmt = fmt or detect_format(path)
+    db = SessionLocal()
+    
+    try:
+        print(f"Importing {fmt.upper()} consultations from {path} (batches of {batch_size})...")
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            report = ingest_consultations(db, iter_records(stream, fmt), batch_size)
+        
+        rate = report.inserted / report.elapsed_seconds if report.elapsed_seconds else 0
+        print(f"Read {report.total} rows: {report.inserted} inserted, {report.failed} failed "
+              f"in {report.elapsed_seconds:.2f}s ({rate:,.0f} rows/s).")
+        
+        if report.errors:
+            print("\nRows with errors:")
+            print("-" * 60)
+            for error in report.errors:
+                print(f"  row {error.row}: {error.error}")
+            if report.errors_truncated:
+                print("  ... (more errors not shown)")
+        
+        return report
+    
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", help="NDJSON or CSV file to import")
+    parser.add_argument("--format", choices=FORMATS, help="Input format (defaults to the file extension)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per insert batch")
+    args = parser.parse_args()
+    
+    result = import_file(args.path, args.format, args.batch_size)
+    sys.exit(1 if result.failed else 0)
@@ -0,0 +1,184 @@
+"""Streaming bulk import of consultations from NDJSON or CSV.
+
+Input is read one record at a time and handled in fixed-size batches:
+each batch is validated with ``ConsultationCreate``, its diagnosis codes
+are checked with a single query, and the valid rows are written with one
+executemany-style INSERT in their own transaction. Only the current batch
+is ever held in memory.
+"""
+
+import csv
+import json
+import time
+from datetime import datetime
+from itertools import islice
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from models import Consultation
+from schemas import ConsultationCreate, ImportErrorDetail, ImportReport
+from validation import find_invalid_diagnosis_codes, invalid_codes_message
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ("ndjson", "csv")
+
+# (row number, parsed record or None, parse error or None)
+RawRecord = Tuple[int, Optional[dict], Optional[str]]
+
+
+def detect_format(filename: Optional[str]) -> str:
+    """Guess the input format from a file name, defaulting to NDJSON."""
+    if filename and filename.lower().endswith(".csv"):
+        return "csv"
+    return "ndjson"
+
+
+def iter_ndjson(lines: Iterable[str]) -> Iterator[RawRecord]:
+    """Yield one record per non-blank line of NDJSON input."""
+    for row_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "Expected a JSON object"
+            continue
+        yield row_number, record, None
+
+
+def _split_codes(value: str) -> List[str]:
+    value = (value or "").strip()
+    if value.startswith("["):
+        return json.loads(value)
+    return value.replace("|", ";").split(";")
+
+
+def iter_csv(stream: IO[str]) -> Iterator[RawRecord]:
+    """Yield one record per CSV row.
+
+    The header must name ``patient_name``, ``diagnosis_codes`` and
+    ``treatment_notes`` (``consultation_date`` is optional). Diagnosis codes
+    are separated by ``;`` or ``|``, or given as a JSON array.
+    """
+    reader = csv.DictReader(stream)
+    # Row 1 is the header
+    for row_number, row in enumerate(reader, start=2):
+        # DictReader puts fields beyond the header in a list under None
+        extra = row.pop(None, None)
+        if extra:
+            yield row_number, None, f"Row has {len(extra)} more field(s) than the header"
+            continue
+        try:
+            record = dict(row)
+            record["diagnosis_codes"] = _split_codes(record.get("diagnosis_codes"))
+            if not record.get("consultation_date"):
+                record.pop("consultation_date", None)
+        except (ValueError, AttributeError) as e:
+            yield row_number, None, f"Invalid diagnosis_codes: {e}"
+            continue
+        yield row_number, record, None
+
+
+def iter_records(stream: IO[str], fmt: str) -> Iterator[RawRecord]:
+    """Dispatch to the reader for ``fmt``."""
+    if fmt == "csv":
+        return iter_csv(stream)
+    if fmt == "ndjson":
+        return iter_ndjson(stream)
+    raise ValueError(f"Unsupported format: {fmt}")
+
+
+def _batches(records: Iterator[RawRecord], size: int) -> Iterator[List[RawRecord]]:
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'record'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+def ingest_consultations(
+    db: Session,
+    records: Iterable[RawRecord],
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> ImportReport:
+    """Validate and insert consultations batch by batch.
+
+    Invalid rows are skipped and reported; valid rows in the same batch are
+    still inserted. Each batch is committed on its own, so a failure only
+    rolls back the batch it happened in.
+    """
+    report = ImportReport()
+    started = time.perf_counter()
+
+    def record_error(row_number: int, message: str) -> None:
+        report.failed += 1
+        if len(report.errors) < MAX_REPORTED_ERRORS:
+            report.errors.append(ImportErrorDetail(row=row_number, error=message))
+        else:
+            report.errors_truncated = True
+
+    for batch in _batches(iter(records), batch_size):
+        validated = []
+        report.total += len(batch)
+        for row_number, record, parse_error in batch:
+            if parse_error:
+                record_error(row_number, parse_error)
+                continue
+            try:
+                validated.append((row_number, ConsultationCreate(**record)))
+            except ValidationError as e:
+                record_error(row_number, _validation_message(e))
+            except TypeError as e:
+                record_error(row_number, f"Invalid record: {e}")
+
+        invalid_codes = set(find_invalid_diagnosis_codes(
+            db, (code for _, item in validated for code in item.diagnosis_codes)
+        ))
+
+        now = datetime.utcnow()
+        rows = []
+        for row_number, item in validated:
+            bad = [code for code in item.diagnosis_codes if code in invalid_codes]
+            if bad:
+                record_error(row_number, invalid_codes_message(list(dict.fromkeys(bad))))
+                continue
+            rows.append({
+                "patient_name": item.patient_name,
+                "diagnosis_codes": item.diagnosis_codes,
+                "treatment_notes": item.treatment_notes,
+                "consultation_date": item.consultation_date or now,
+                "created_at": now,
+            })
+
+        if rows:
+            try:
+                db.execute(insert(Consultation), rows)
+                db.commit()
+                report.inserted += len(rows)
+            except Exception as e:
+                db.rollback()
+                first_row = batch[0][0]
+                last_row = batch[-1][0]
+                report.failed += len(rows)
+                if len(report.errors) < MAX_REPORTED_ERRORS:
+                    report.errors.append(ImportErrorDetail(
+                        row=first_row,
+                        error=f"Batch of rows {first_row}-{last_row} failed: {e}"
+                    ))
+
+    report.elapsed_seconds = round(time.perf_counter() - started, 3)
+    return report
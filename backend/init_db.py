@@ -1,7 +1,34 @@
-"""Initialize database with ICD-10 diagnosis codes."""
+"""Initialize database with ICD-10 diagnosis codes.
+
+Usage::
+
+    python init_db.py                 # sample codes, asks before resetting
+    python init_db.py --force         # sample codes, no prompt
+    python init_db.py --codes-file icd10cm_order_2024.txt
+    python init_db.py --codes-file codes.csv --format csv
+
+``--codes-file`` upserts a full code set from the CMS ICD-10-CM order file
+(fixed width) or a ``code,description`` CSV.
+"""
+
+import argparse
+import csv
+import time
+from itertools import islice
+from typing import IO, Iterable, Iterator, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
 
 from database import engine, SessionLocal, Base
 from models import DiagnosisCode, Consultation
+from http_cache import DIAGNOSIS_CODES_VERSION, bump_version
+from fts import drop_fts_triggers, fts_installed, rebuild_fts
+
+CODE_BATCH_SIZE = 5000
+CODE_FILE_FORMATS = ("cms", "csv")
 
 # 100 ICD-10 Codes — Certain Infectious and Parasitic Diseases (A00-B99)
 ICD10_CODES = [
@@ -161,10 +188,13 @@ def init_database():
         # Insert ICD-10 codes
         print(f"Inserting {len(ICD10_CODES)} ICD-10 diagnosis codes...")
         
-        for code, description in ICD10_CODES:
-            diagnosis = DiagnosisCode(code=code, description=description)
-            db.add(diagnosis)
+        db.execute(insert(DiagnosisCode), [
+            {"code": code, "description": description}
+            for code, description in ICD10_CODES
+        ])
         
+        # New stamp so cached /api/diagnosis responses are revalidated
+        bump_version(db, DIAGNOSIS_CODES_VERSION)
         db.commit()
         
         # Verify insertion
@@ -203,10 +233,13 @@ def force_init_database():
         # Insert ICD-10 codes
         print(f"Inserting {len(ICD10_CODES)} ICD-10 diagnosis codes...")
         
-        for code, description in ICD10_CODES:
-            diagnosis = DiagnosisCode(code=code, description=description)
-            db.add(diagnosis)
+        db.execute(insert(DiagnosisCode), [
+            {"code": code, "description": description}
+            for code, description in ICD10_CODES
+        ])
         
+        # New stamp so cached /api/diagnosis responses are revalidated
+        bump_version(db, DIAGNOSIS_CODES_VERSION)
         db.commit()
         
         final_count = db.query(DiagnosisCode).count()
@@ -221,10 +254,141 @@ def force_init_database():
         db.close()
 
 
+def format_code(raw: str) -> str:
+    """``A000`` -> ``A00.0``: CMS files omit the dot after the category."""
+    code = raw.strip().upper()
+    if "." not in code and len(code) > 3:
+        code = f"{code[:3]}.{code[3:]}"
+    return code
+
+
+def iter_cms_order_file(stream: IO[str], billable_only: bool = True) -> Iterator[Tuple[str, str]]:
+    """Yield ``(code, description)`` from a CMS ``icd10cm_order_*.txt`` file.
+
+    Fixed-width layout: order number (1-5), code without dot (7-13),
+    billable flag 0/1 (15), short description (17-76), long description
+    (78-). Header rows (flag 0) are categories that cannot be billed.
+    """
+    for line in stream:
+        if len(line) < 17:
+            continue
+        if billable_only and line[14] != "1":
+            continue
+        description = line[77:].strip() or line[16:76].strip()
+        yield format_code(line[6:13]), description
+
+
+def iter_code_csv(stream: IO[str]) -> Iterator[Tuple[str, str]]:
+    """Yield ``(code, description)`` from a CSV with those two columns."""
+    reader = csv.DictReader(stream)
+    fields = {name.lower().strip(): name for name in reader.fieldnames or ()}
+    if "code" not in fields or "description" not in fields:
+        raise ValueError("CSV header must name 'code' and 'description' columns")
+    for row in reader:
+        code = (row[fields["code"]] or "").strip()
+        if code:
+            yield format_code(code), (row[fields["description"]] or "").strip()
+
+
+def _upsert_statement(bind: Engine):
+    """INSERT that updates the description of codes already present."""
+    dialect = {"sqlite": sqlite, "postgresql": postgresql}.get(bind.dialect.name)
+    if dialect is None:
+        raise RuntimeError(f"Bulk code upsert is not supported on {bind.dialect.name}")
+    stmt = dialect.insert(DiagnosisCode)
+    return stmt.on_conflict_do_update(
+        index_elements=[DiagnosisCode.code],
+        set_={"description": stmt.excluded.description},
+        where=DiagnosisCode.description != stmt.excluded.description
+    )
+
+
+def load_codes(
+    rows: Iterable[Tuple[str, str]],
+    bind: Engine = engine,
+    batch_size: int = CODE_BATCH_SIZE
+) -> dict:
+    """Upsert diagnosis codes in batches, all in a single transaction.
+
+    Non-unique indexes on ``diagnosis_codes`` and the FTS sync triggers are
+    dropped for the duration of the load and rebuilt once at the end, which
+    is far cheaper than maintaining them row by row. The unique index on
+    ``code`` stays: the upsert needs it.
+    """
+    started = time.perf_counter()
+    statement = _upsert_statement(bind)
+    secondary = [index for index in DiagnosisCode.__table__.indexes if not index.unique]
+    total = 0
+    
+    with bind.begin() as conn:
+        with_fts = bind.dialect.name == "sqlite" and fts_installed(conn, "diagnosis_codes")
+        if with_fts:
+            drop_fts_triggers(conn, "diagnosis_codes")
+        for index in secondary:
+            index.drop(bind=conn, checkfirst=True)
+        
+        rows = iter(rows)
+        while True:
+            batch = [
+                {"code": code, "description": description}
+                for code, description in islice(rows, batch_size)
+            ]
+            if not batch:
+                break
+            conn.execute(statement, batch)
+            total += len(batch)
+        
+        for index in secondary:
+            index.create(bind=conn)
+        if with_fts:
+            rebuild_fts(conn, "diagnosis_codes")
+        
+        # New stamp so cached /api/diagnosis responses and indexes refresh
+        with Session(bind=conn) as db:
+            bump_version(db, DIAGNOSIS_CODES_VERSION)
+            db.flush()
+    
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": total,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(total / elapsed) if elapsed else None,
+    }
+
+
+def load_code_file(path: str, fmt: Optional[str] = None, billable_only: bool = True,
+                   batch_size: int = CODE_BATCH_SIZE) -> dict:
+    """Stream a CMS order file or CSV from ``path`` into ``diagnosis_codes``."""
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "cms")
+    if fmt not in CODE_FILE_FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    
+    Base.metadata.create_all(bind=engine)
+    # CMS files are plain ASCII; latin-1 never fails on stray bytes
+    encoding = "utf-8-sig" if fmt == "csv" else "latin-1"
+    with open(path, encoding=encoding, newline="") as stream:
+        rows = iter_code_csv(stream) if fmt == "csv" else iter_cms_order_file(stream, billable_only)
+        return load_codes(rows, batch_size=batch_size)
+
+
 if __name__ == "__main__":
-    import sys
+    parser = argparse.ArgumentParser(description="Initialize the ClinicCare database")
+    parser.add_argument("--force", action="store_true", help="Reset the sample codes without asking")
+    parser.add_argument("--codes-file", help="CMS ICD-10-CM order file or code,description CSV to upsert")
+    parser.add_argument("--format", choices=CODE_FILE_FORMATS, help="Format of --codes-file (default: by extension)")
+    parser.add_argument("--include-headers", action="store_true",
+                        help="Also load non-billable category rows from a CMS order file")
+    parser.add_argument("--batch-size", type=int, default=CODE_BATCH_SIZE)
+    args = parser.parse_args()
     
-    if len(sys.argv) > 1 and sys.argv[1] == "--force":
+    if args.codes_file:
+        print(f"Loading diagnosis codes from {args.codes_file}...")
+        result = load_code_file(args.codes_file, args.format, not args.include_headers, args.batch_size)
+        print(
+            f"Upserted {result['rows']} codes in {result['elapsed_seconds']}s "
+            f"({result['rows_per_second']} rows/s)"
+        )
+    elif args.force:
         force_init_database()
     else:
         init_database()
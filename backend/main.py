@@ -1,24 +1,138 @@
 """FastAPI main application for ClinicCare Mini EMR."""
 
-from datetime import datetime
-from typing import Optional, List
-from fastapi import FastAPI, Depends, HTTPException, Query, status
+import asyncio
+from datetime import date, datetime
+import heapq
+from typing import Optional, List, Union
+import io
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, File, UploadFile, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
 
-from database import engine, get_db, Base
-from models import DiagnosisCode, Consultation
+from database import (
+    engine,
+    async_engine,
+    read_engine,
+    async_read_engine,
+    has_read_pool,
+    get_db,
+    get_async_db,
+    Base,
+    SessionLocal,
+    AsyncSessionLocal
+)
+from read_routing import (
+    ReadYourWritesMiddleware,
+    get_read_db,
+    may_fill_cache,
+    may_read_cache,
+    sync_read_session_factory,
+)
+from models import (
+    DiagnosisCode,
+    Consultation,
+    ConsultationDiagnosis,
+    RowCount,
+    DailyConsultationCount,
+    DailyDiagnosisCount
+)
+from migrations import run_migrations
+from pagination import encode_cursor, decode_cursor, InvalidCursor
+from validation import find_invalid_diagnosis_codes, invalid_codes_message
+from ingest import ingest_consultations, iter_records, detect_format, DEFAULT_BATCH_SIZE
+from export import export_consultations, MEDIA_TYPES
+from compression import CompressionMiddleware
+from metrics import MetricsMiddleware, instrument_engine, registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from rollups import BUCKETS, bucket_expression, rollups_supported
+from diagnosis_index import diagnosis_index, diagnosis_codes_version
+from diagnosis_tree import diagnosis_tree
+from http_cache import make_etag, etag_matches
+from serialization import CONSULTATION_COLUMNS, PROJECTIONS, dumps, rows_to_dicts, json_response
+from group_commit import GroupCommitter, PendingConsultation, save_consultations
+from idempotency import (
+    IDEMPOTENCY_HEADER,
+    MAX_KEY_LENGTH,
+    REPLAYED_HEADER,
+    request_fingerprint,
+    find_stored_response,
+    replay_response,
+    purge_periodically
+)
+from retention import purge_deleted_periodically
+from archive import archive_periodically, find_archived_consultation
+from changes import (
+    ChangesExpired,
+    change_events,
+    change_notifier,
+    changes_supported,
+    latest_change_seq,
+    read_changes,
+    trim_periodically,
+    watch_changes
+)
+from cache import (
+    result_cache,
+    consultation_key,
+    consultation_list_key,
+    invalidate_consultation,
+    invalidate_consultation_lists
+)
+import config
+from fts import (
+    fts_supported,
+    search_diagnosis_codes_fts,
+    search_consultations_fts
+)
 from schemas import (
     DiagnosisCodeResponse,
     ConsultationCreate,
     ConsultationResponse,
     ConsultationListResponse,
+    ConsultationSummaryListResponse,
+    ConsultationBatchResponse,
+    ConsultationSummaryBatchResponse,
+    ConsultationChangesResponse,
+    ConsultationSummaryChangesResponse,
+    DiagnosisCountsResponse,
+    DiagnosisTreeResponse,
+    ConsultationAnalyticsResponse,
+    ImportReport,
+    BulkDeleteResponse,
+    SearchResponse,
+    CacheStatsResponse,
     ErrorResponse
 )
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+
+# Count and time SQL per request (after migrations, so startup DDL is not counted)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+if has_read_pool:
+    instrument_engine(read_engine)
+    instrument_engine(async_read_engine.sync_engine)
+
+# Batch concurrent creates into shared transactions (GROUP_COMMIT_WINDOW_MS)
+group_committer = (
+    GroupCommitter(
+        AsyncSessionLocal,
+        config.GROUP_COMMIT_WINDOW_MS / 1000,
+        config.GROUP_COMMIT_MAX_BATCH
+    )
+    if config.GROUP_COMMIT_WINDOW_MS > 0 else None
+)
+background_tasks = set()
+
+# Larger deletes should use a date range
+BULK_DELETE_MAX_IDS = 1000
+# Keeps the IN list well below SQLite's bound-parameter limit
+BATCH_FETCH_MAX_IDS = 500
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -36,8 +150,105 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", REPLAYED_HEADER],
 )
 
+# Let clients read their own writes from the primary for a few seconds
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Compress large JSON and streamed exports for clients that accept it
+app.add_middleware(CompressionMiddleware)
+
+# Outermost, so latency includes the other middleware
+app.add_middleware(MetricsMiddleware)
+
+
+async def count_consultations(db: AsyncSession) -> int:
+    """Total consultations, from the trigger-maintained counter when present."""
+    counter = await db.scalar(
+        select(RowCount.row_count).where(
+            RowCount.table_name == Consultation.__tablename__
+        )
+    )
+    if counter is not None:
+        return counter
+    return await db.scalar(
+        select(func.count()).select_from(Consultation).where(Consultation.deleted_at.is_(None))
+    )
+
+
+def cached_json(payload: bytes, status_code: int = status.HTTP_200_OK) -> Response:
+    """Return an already serialized JSON body as is."""
+    return Response(content=payload, status_code=status_code, media_type="application/json")
+
+
+@app.on_event("startup")
+def build_diagnosis_index():
+    """Load diagnosis codes into the in-memory search index and tree."""
+    db = SessionLocal()
+    try:
+        diagnosis_index.load(db)
+        diagnosis_tree.load(db)
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    """Purge expired idempotency keys and deleted consultations, trim the
+    change feed, watch it for writes by other processes and archive old
+    consultations."""
+    background_tasks.add(asyncio.create_task(
+        purge_periodically(AsyncSessionLocal, config.IDEMPOTENCY_PURGE_SECONDS)
+    ))
+    background_tasks.add(asyncio.create_task(
+        purge_deleted_periodically(
+            AsyncSessionLocal,
+            config.PURGE_INTERVAL_SECONDS,
+            config.PURGE_AFTER_SECONDS,
+            config.PURGE_BATCH_SIZE
+        )
+    ))
+    if changes_supported(engine):
+        background_tasks.add(asyncio.create_task(
+            watch_changes(AsyncSessionLocal, config.CHANGE_FEED_POLL_SECONDS)
+        ))
+        background_tasks.add(asyncio.create_task(
+            trim_periodically(
+                AsyncSessionLocal,
+                config.PURGE_INTERVAL_SECONDS,
+                config.CHANGE_FEED_RETENTION_SECONDS
+            )
+        ))
+    if config.ARCHIVE_AFTER_DAYS > 0:
+        background_tasks.add(asyncio.create_task(
+            archive_periodically(
+                SessionLocal,
+                config.ARCHIVE_DIR,
+                config.ARCHIVE_INTERVAL_SECONDS,
+                config.ARCHIVE_AFTER_DAYS,
+                config.ARCHIVE_BATCH_SIZE
+            )
+        ))
+
+
+@app.on_event("shutdown")
+async def close_connection_pools():
+    """End change streams, finish queued writes, stop background tasks and
+    close pooled connections so their driver threads exit cleanly."""
+    change_notifier.close()
+    if group_committer is not None:
+        await group_committer.drain()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    await async_engine.dispose()
+    engine.dispose()
+    if has_read_pool:
+        await async_read_engine.dispose()
+        read_engine.dispose()
+
 
 @app.get("/", tags=["Health"])
 async def root():
@@ -56,39 +267,481 @@ async def root():
     summary="Search ICD-10 diagnosis codes",
     responses={
         200: {"description": "List of matching diagnosis codes"},
+        304: {"description": "Not modified since the version in If-None-Match"},
         500: {"model": ErrorResponse, "description": "Internal server error"}
     }
 )
 async def search_diagnosis_codes(
+    request: Request,
     search: Optional[str] = Query(None, description="Search term for code or description"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Search ICD-10 diagnosis codes by code or description.
     
-    - **search**: Optional search term (case-insensitive partial match)
+    - **search**: Optional search term matched against code prefixes and
+      description words (case-insensitive, partial words allowed)
+    - Results are ranked by relevance and served from an in-memory index
     - Returns maximum 20 results for performance
+    - Responses carry an ETag tied to the code table's version stamp;
+      send it back in If-None-Match to get 304 Not Modified
+    """
+    try:
+        # Only touches the database when codes changed since the last build,
+        # in this process or (via the version stamp) in another one
+        version = await diagnosis_codes_version.get(db)
+        await diagnosis_index.refresh(db, version)
+
+        headers = None
+        if diagnosis_index.version:
+            headers = {
+                "ETag": make_etag(diagnosis_index.version),
+                "Cache-Control": f"public, max-age={config.DIAGNOSIS_CACHE_MAX_AGE}",
+            }
+            if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        results = diagnosis_index.search(search, limit=20)
+        return json_response([entry._asdict() for entry in results], headers=headers)
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error searching diagnosis codes: {str(e)}"
+        )
+
+
+@app.get(
+    "/api/diagnosis/tree",
+    response_model=DiagnosisTreeResponse,
+    tags=["Diagnosis Codes"],
+    summary="Browse the ICD-10 hierarchy with usage counts",
+    responses={
+        200: {"description": "The node's ancestors and children"},
+        404: {"model": ErrorResponse, "description": "Unknown node"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+async def browse_diagnosis_tree(
+    node: Optional[str] = Query(None, description="Key of the node to open; omit for the chapters"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Browse diagnosis codes as chapter → block → category → code.
+    
+    - **node**: A `key` from a previous response: chapter number (`1`),
+      block (`A00-A09`), category (`A04`) or code (`A04.72`)
+    
+    Returns the node, its ancestors and its children. Each carries `usage`,
+    the number of times codes in its subtree are recorded on current
+    consultations. Served from an in-memory tree whose counts are updated
+    as consultations are created and deleted.
+    """
+    try:
+        # Only touches the database when codes changed or usage is due for a recount
+        version = await diagnosis_codes_version.get(db)
+        await diagnosis_tree.refresh(db, version)
+        
+        try:
+            return json_response(diagnosis_tree.browse(node.strip().upper() if node else None))
+        except KeyError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No diagnosis hierarchy node {node!r}"
+            )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error browsing diagnosis codes: {str(e)}"
+        )
+
+
+@app.get(
+    "/api/diagnosis/counts",
+    response_model=DiagnosisCountsResponse,
+    tags=["Diagnosis Codes"],
+    summary="Consultation counts per diagnosis code",
+    responses={
+        200: {"description": "Diagnosis codes ordered by number of consultations"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+async def count_consultations_by_diagnosis(
+    start: Optional[datetime] = Query(None, description="Only count consultations on or after this date"),
+    end: Optional[datetime] = Query(None, description="Only count consultations before this date"),
+    limit: int = Query(20, ge=1, le=500, description="Maximum number of codes to return"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Count consultations per diagnosis code, most frequent first.
+    
+    - **start** / **end**: Optional date range (end is exclusive)
+    - **limit**: Maximum number of codes to return
+    """
+    try:
+        query = select(
+            ConsultationDiagnosis.code,
+            func.count().label("count")
+        )
+        if start:
+            query = query.where(ConsultationDiagnosis.consultation_date >= start)
+        if end:
+            query = query.where(ConsultationDiagnosis.consultation_date < end)
+        
+        top_codes = (await db.execute(
+            query.group_by(ConsultationDiagnosis.code)
+            .order_by(func.count().desc(), ConsultationDiagnosis.code)
+            .limit(limit)
+        )).all()
+        
+        descriptions = dict((await db.execute(
+            select(DiagnosisCode.code, DiagnosisCode.description)
+            .where(DiagnosisCode.code.in_([code for code, _ in top_codes]))
+        )).all())
+        
+        return DiagnosisCountsResponse(
+            start=start,
+            end=end,
+            counts=[
+                {"code": code, "description": descriptions.get(code), "count": count}
+                for code, count in top_codes
+            ]
+        )
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error counting diagnoses: {str(e)}"
+        )
+
+
+@app.get(
+    "/api/analytics/consultations",
+    response_model=ConsultationAnalyticsResponse,
+    tags=["Analytics"],
+    summary="Consultation volume and top diagnoses per day or week",
+    responses={
+        200: {"description": "One entry per bucket with consultations"},
+        501: {"model": ErrorResponse, "description": "Rollups require SQLite"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+async def consultation_analytics(
+    start: Optional[date] = Query(None, description="First day to include"),
+    end: Optional[date] = Query(None, description="Day after the last one to include"),
+    bucket: str = Query("day", pattern=f"^({'|'.join(BUCKETS)})$", description="Bucket size: day or week"),
+    top: int = Query(5, ge=0, le=50, description="Top diagnosis codes per bucket and overall"),
+    db: AsyncSession = Depends(get_read_db)
+):
     """
+    Dashboard aggregates read from trigger-maintained daily rollups, so the
+    cost grows with the number of days in range, not with consultations.
+    
+    - **start** / **end**: Optional day range (end is exclusive)
+    - **bucket**: `day`, or `week` (weeks start on Monday)
+    - **top**: Number of most frequent codes per bucket and overall
+    """
+    if not rollups_supported(engine):
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Analytics rollups require SQLite"
+        )
+    
+    def in_range(query, day_column):
+        if start:
+            query = query.where(day_column >= start)
+        if end:
+            query = query.where(day_column < end)
+        return query
+    
     try:
-        query = db.query(DiagnosisCode)
-        
-        if search and search.strip():
-            search_term = f"%{search.strip().lower()}%"
-            query = query.filter(
-                or_(
-                    DiagnosisCode.code.ilike(search_term),
-                    DiagnosisCode.description.ilike(search_term)
+        period = bucket_expression(DailyConsultationCount.day, bucket).label("period")
+        volume = (await db.execute(
+            in_range(
+                select(period, func.sum(DailyConsultationCount.count)),
+                DailyConsultationCount.day
+            ).group_by(period).order_by(period)
+        )).all()
+        
+        top_per_period = {}
+        top_overall = []
+        if top:
+            code_period = bucket_expression(DailyDiagnosisCount.day, bucket).label("period")
+            code_count = func.sum(DailyDiagnosisCount.count)
+            by_period = {}
+            for day, code, count in await db.execute(
+                in_range(
+                    select(code_period, DailyDiagnosisCount.code, code_count),
+                    DailyDiagnosisCount.day
+                ).group_by(code_period, DailyDiagnosisCount.code)
+            ):
+                by_period.setdefault(day, []).append((-count, code))
+            top_per_period = {
+                day: heapq.nsmallest(top, counts) for day, counts in by_period.items()
+            }
+            top_overall = [
+                (-count, code) for code, count in await db.execute(
+                    in_range(
+                        select(DailyDiagnosisCount.code, code_count),
+                        DailyDiagnosisCount.day
+                    ).group_by(DailyDiagnosisCount.code)
+                    .order_by(code_count.desc(), DailyDiagnosisCount.code)
+                    .limit(top)
                 )
+            ]
+        
+        codes = {code for counts in top_per_period.values() for _, code in counts}
+        codes.update(code for _, code in top_overall)
+        descriptions = dict((await db.execute(
+            select(DiagnosisCode.code, DiagnosisCode.description)
+            .where(DiagnosisCode.code.in_(codes))
+        )).all()) if codes else {}
+        
+        def code_counts(counts):
+            return [
+                {"code": code, "description": descriptions.get(code), "count": -negative}
+                for negative, code in counts
+            ]
+        
+        return ConsultationAnalyticsResponse(
+            bucket=bucket,
+            start=start,
+            end=end,
+            total=sum(count for _, count in volume),
+            periods=[
+                {
+                    "period": day,
+                    "consultations": count,
+                    "top_diagnoses": code_counts(top_per_period.get(day, [])),
+                }
+                for day, count in volume
+            ],
+            top_diagnoses=code_counts(top_overall)
+        )
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error computing analytics: {str(e)}"
+        )
+
+
+@app.get(
+    "/api/diagnosis/{code}/consultations",
+    response_model=ConsultationListResponse,
+    tags=["Diagnosis Codes"],
+    summary="List consultations with a diagnosis code",
+    responses={
+        200: {"description": "Consultations recorded with the code, newest first"},
+        400: {"model": ErrorResponse, "description": "Invalid cursor"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+async def list_consultations_by_diagnosis(
+    code: str,
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of records to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    include_total: bool = Query(True, description="Include the number of matching consultations"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    List consultations recorded with a diagnosis code, newest first.
+    
+    - **code**: ICD-10 code, e.g. `A09`
+    - **limit**: Maximum number of records to return
+    - **cursor**: Continue after the page that returned this `next_cursor`
+    - **include_total**: Set to false to skip counting matches
+    """
+    try:
+        query = (
+            select(*CONSULTATION_COLUMNS)
+            .join(ConsultationDiagnosis, ConsultationDiagnosis.consultation_id == Consultation.id)
+            .where(ConsultationDiagnosis.code == code)
+            .order_by(
+                ConsultationDiagnosis.consultation_date.desc(),
+                ConsultationDiagnosis.consultation_id.desc()
             )
+        )
         
-        # Limit results for performance
-        codes = query.order_by(DiagnosisCode.code).limit(20).all()
-        return codes
+        if cursor:
+            try:
+                last_date, last_id = decode_cursor(cursor)
+            except InvalidCursor as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+            query = query.where(
+                tuple_(ConsultationDiagnosis.consultation_date, ConsultationDiagnosis.consultation_id)
+                < tuple_(last_date, last_id)
+            )
+        
+        rows = (await db.execute(query.limit(limit + 1))).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last.consultation_date, last.id)
+        
+        total = None
+        if include_total:
+            total = await db.scalar(
+                select(func.count())
+                .select_from(ConsultationDiagnosis)
+                .where(ConsultationDiagnosis.code == code)
+            )
+        
+        return json_response({
+            "consultations": rows_to_dicts(rows),
+            "total": total,
+            "next_cursor": next_cursor,
+        })
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error searching diagnosis codes: {str(e)}"
+            detail=f"Error fetching consultations: {str(e)}"
+        )
+
+
+@app.get(
+    # :path, so names containing "/" (sent as %2F) still match
+    "/api/patients/{patient_name:path}/consultations",
+    response_model=Union[ConsultationListResponse, ConsultationSummaryListResponse],
+    tags=["Patients"],
+    summary="A patient's consultation timeline",
+    responses={
+        200: {"description": "The patient's consultations, newest first"},
+        400: {"model": ErrorResponse, "description": "Invalid cursor"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+async def patient_timeline(
+    patient_name: str,
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of records to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    include_total: bool = Query(True, description="Include the patient's number of consultations"),
+    fields: str = Query("full", pattern="^(full|summary)$", description="`summary` replaces treatment_notes with a short preview"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    List one patient's consultations, newest first.
+    
+    Served by the (patient_name, consultation_date, id) index: each page is
+    a single range scan over that patient's rows, however many
+    consultations other patients have.
+    
+    - **patient_name**: Exact name as recorded (case-sensitive)
+    - **limit**: Maximum number of records to return
+    - **cursor**: Continue after the page that returned this `next_cursor`
+    - **include_total**: Set to false to skip counting the patient's consultations
+    - **fields**: `full` (default) or `summary`
+    """
+    try:
+        columns, names = PROJECTIONS[fields]
+        # Matches ix_consultations_live_patient_date_id
+        live = (Consultation.patient_name == patient_name, Consultation.deleted_at.is_(None))
+        query = select(*columns).where(*live).order_by(
+            Consultation.consultation_date.desc(),
+            Consultation.id.desc()
+        )
+        
+        if cursor:
+            try:
+                last_date, last_id = decode_cursor(cursor)
+            except InvalidCursor as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+            query = query.where(
+                tuple_(Consultation.consultation_date, Consultation.id)
+                < tuple_(last_date, last_id)
+            )
+        
+        rows = (await db.execute(query.limit(limit + 1))).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last.consultation_date, last.id)
+        
+        total = None
+        if include_total:
+            total = await db.scalar(
+                select(func.count()).select_from(Consultation).where(*live)
+            )
+        
+        return json_response({
+            "consultations": rows_to_dicts(rows, names),
+            "total": total,
+            "next_cursor": next_cursor,
+        })
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error fetching patient timeline: {str(e)}"
+        )
+
+
+@app.get(
+    "/api/search",
+    response_model=SearchResponse,
+    tags=["Search"],
+    summary="Full-text search over diagnosis codes and consultations",
+    responses={
+        200: {"description": "Ranked search results with highlighted snippets"},
+        501: {"model": ErrorResponse, "description": "Full-text search not supported by the database"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+async def full_text_search(
+    q: str = Query(..., min_length=1, description="Search terms (all words must match, prefixes allowed)"),
+    scope: str = Query("all", pattern="^(all|diagnosis|consultations)$", description="What to search"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results per scope"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Search diagnosis descriptions and consultation patient names and
+    treatment notes through SQLite FTS5 indexes.
+    
+    - **q**: Search terms; every word must match, partial words are allowed
+    - **scope**: `all`, `diagnosis` or `consultations`
+    - **limit**: Maximum number of results per scope
+    - Results are ordered by bm25 relevance and include highlighted snippets
+    """
+    if not fts_supported(engine):
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Full-text search requires SQLite FTS5"
+        )
+
+    try:
+        diagnosis_hits = []
+        consultation_hits = []
+        if scope in ("all", "diagnosis"):
+            diagnosis_hits = await db.run_sync(search_diagnosis_codes_fts, q, limit)
+        if scope in ("all", "consultations"):
+            consultation_hits = await db.run_sync(search_consultations_fts, q, limit)
+        
+        return json_response({
+            "query": q,
+            "diagnosis_codes": diagnosis_hits,
+            "consultations": consultation_hits,
+        })
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error searching: {str(e)}"
         )
 
 
@@ -107,7 +760,14 @@ async def search_diagnosis_codes(
 )
 async def create_consultation(
     consultation: ConsultationCreate,
-    db: Session = Depends(get_db)
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias=IDEMPOTENCY_HEADER,
+        min_length=1,
+        max_length=MAX_KEY_LENGTH,
+        description="Unique value per logical request; retries with it are not duplicated"
+    ),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new patient consultation.
@@ -116,79 +776,323 @@ async def create_consultation(
     - **diagnosis_codes**: List of ICD-10 codes (required, at least one)
     - **treatment_notes**: Treatment notes and recommendations (required)
     - **consultation_date**: Optional date of consultation (defaults to current time)
+    - **Idempotency-Key** header: retrying with the same key and body returns
+      the original response (`Idempotent-Replayed: true`) instead of creating
+      a duplicate; the same key with a different body is rejected with 422
     """
     try:
-        # Validate diagnosis codes exist in database
-        for code in consultation.diagnosis_codes:
-            existing_code = db.query(DiagnosisCode).filter(
-                DiagnosisCode.code == code
-            ).first()
-            if not existing_code:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Invalid diagnosis code: {code}"
-                )
+        request_hash = None
+        if idempotency_key:
+            request_hash = request_fingerprint(consultation.model_dump(mode="json"))
+            stored = await find_stored_response(db, idempotency_key)
+            if stored is not None:
+                return replay_response(stored, request_hash)
         
-        # Create consultation
-        db_consultation = Consultation(
-            patient_name=consultation.patient_name,
-            diagnosis_codes=consultation.diagnosis_codes,
-            treatment_notes=consultation.treatment_notes,
-            consultation_date=consultation.consultation_date or datetime.utcnow(),
-            created_at=datetime.utcnow()
+        # Validate all diagnosis codes with one query, reporting every bad one
+        invalid_codes = await db.run_sync(
+            find_invalid_diagnosis_codes, consultation.diagnosis_codes
         )
+        if invalid_codes:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=invalid_codes_message(invalid_codes)
+            )
         
-        db.add(db_consultation)
-        db.commit()
-        db.refresh(db_consultation)
+        pending = PendingConsultation(
+            values={
+                "patient_name": consultation.patient_name,
+                "diagnosis_codes": consultation.diagnosis_codes,
+                "treatment_notes": consultation.treatment_notes,
+                "consultation_date": consultation.consultation_date or datetime.utcnow(),
+                "created_at": datetime.utcnow(),
+            },
+            idempotency_key=idempotency_key,
+            request_hash=request_hash
+        )
+        try:
+            if group_committer is not None:
+                # Hand the connection (and any read lock) back before waiting:
+                # requests holding every pooled connection would starve the batch
+                await db.close()
+                body = await group_committer.submit(pending)
+            else:
+                body = (await save_consultations(db, [pending]))[0]
+        except IntegrityError:
+            if not idempotency_key:
+                raise
+            # A concurrent request with the same key committed first
+            await db.rollback()
+            stored = await find_stored_response(db, idempotency_key)
+            if stored is None:
+                raise
+            return replay_response(stored, request_hash)
+        invalidate_consultation_lists()
+        change_notifier.notify()
+        diagnosis_tree.record_usage(consultation.diagnosis_codes, 1)
         
-        return db_consultation
+        return cached_json(body, status_code=status.HTTP_201_CREATED)
     
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating consultation: {str(e)}"
         )
 
 
+@app.post(
+    "/api/consultations/import",
+    response_model=ImportReport,
+    tags=["Consultations"],
+    summary="Bulk import consultations from NDJSON or CSV",
+    responses={
+        200: {"description": "Import report with per-row errors"},
+        400: {"model": ErrorResponse, "description": "Unreadable upload"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+def import_consultations(
+    file: UploadFile = File(..., description="NDJSON (one consultation per line) or CSV file"),
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$", description="Input format (defaults to the file extension)"),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=10000, description="Rows per insert batch and transaction"),
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk import consultations.
+    
+    The upload is streamed from disk and processed in batches: each batch is
+    validated, its diagnosis codes checked with one query, and inserted with
+    one bulk INSERT in its own transaction. Invalid rows are skipped and
+    listed in the report.
+    
+    - **file**: NDJSON or CSV (`patient_name`, `diagnosis_codes` separated by
+      `;`, `treatment_notes`, optional `consultation_date`)
+    - **format**: `ndjson` or `csv`; guessed from the file name when omitted
+    - **batch_size**: Rows per batch
+    """
+    # A plain (sync) handler: FastAPI runs it in the threadpool, so a long
+    # import does not block other requests.
+    fmt = format or detect_format(file.filename)
+    try:
+        stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        report = ingest_consultations(db, iter_records(stream, fmt), batch_size)
+        if report.inserted:
+            invalidate_consultation_lists()
+            diagnosis_tree.expire_usage()
+        return report
+    
+    except UnicodeDecodeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Upload is not valid UTF-8: {str(e)}"
+        )
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error importing consultations: {str(e)}"
+        )
+
+
+@app.get(
+    "/api/consultations/export",
+    response_class=StreamingResponse,
+    tags=["Consultations"],
+    summary="Export consultations as NDJSON or CSV",
+    responses={
+        200: {"description": "Streamed export file"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+async def export_consultations_file(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Export format"),
+    start: Optional[datetime] = Query(None, description="Only export consultations on or after this date"),
+    end: Optional[datetime] = Query(None, description="Only export consultations before this date"),
+    compress: Optional[str] = Query(None, pattern="^gzip$", description="Set to gzip for a .gz file"),
+    include_archived: bool = Query(False, description="Also export consultations moved to the archive"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Stream consultations ordered by consultation date.
+    
+    Rows are fetched from the database in chunks and written to the response
+    as they are encoded, so memory use does not grow with the export size.
+    
+    - **format**: `ndjson` or `csv`
+    - **start** / **end**: Optional date range (end is exclusive)
+    - **compress**: `gzip` to download a gzip-compressed file; without it
+      the stream is still compressed in transit if the client sends
+      `Accept-Encoding: gzip` or `br`
+    - **include_archived**: Merge in archived consultations (slower: reads
+      the monthly archive files in range)
+    """
+    try:
+        # Surface database errors as a 500 before the stream starts
+        await db.execute(select(Consultation.id).limit(1))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error exporting consultations: {str(e)}"
+        )
+    
+    gzip = compress == "gzip"
+    filename = f"consultations.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_consultations(
+            sync_read_session_factory(request), format, start, end, gzip=gzip,
+            archive_dir=config.ARCHIVE_DIR if include_archived else None
+        ),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @app.get(
     "/api/consultations",
-    response_model=ConsultationListResponse,
+    response_model=Union[ConsultationListResponse, ConsultationSummaryListResponse],
     tags=["Consultations"],
     summary="List all consultations",
     responses={
         200: {"description": "List of consultations"},
+        400: {"model": ErrorResponse, "description": "Invalid cursor"},
         500: {"model": ErrorResponse, "description": "Internal server error"}
     }
 )
 async def list_consultations(
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    request: Request,
+    skip: int = Query(0, ge=0, description="Number of records to skip (ignored when a cursor is given)"),
     limit: int = Query(100, ge=1, le=500, description="Maximum number of records to return"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    include_total: bool = Query(True, description="Include the total number of consultations"),
+    fields: str = Query("full", pattern="^(full|summary)$", description="`summary` replaces treatment_notes with a short preview"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     List all patient consultations ordered by date descending.
     
-    - **skip**: Number of records to skip (pagination)
+    - **skip**: Number of records to skip (offset pagination)
     - **limit**: Maximum number of records to return
+    - **cursor**: Continue after the page that returned this `next_cursor`
+      (keyset pagination, constant cost per page)
+    - **include_total**: Set to false to skip the total count
+    - **fields**: `full` (default) or `summary`, which returns
+      `notes_preview`/`notes_truncated` instead of `treatment_notes`;
+      fetch the full notes from `GET /api/consultation/{id}`
+    
+    Pages are served from the result cache until the next write, except to
+    a client that just wrote.
     """
     try:
-        total = db.query(Consultation).count()
-        consultations = (
-            db.query(Consultation)
-            .order_by(Consultation.consultation_date.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
+        cache_key = consultation_list_key(skip, limit, cursor, include_total, fields)
+        if may_read_cache(request):
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                return cached_json(cached)
+        
+        columns, names = PROJECTIONS[fields]
+        # Matches the partial index on live rows
+        query = select(*columns).where(Consultation.deleted_at.is_(None)).order_by(
+            Consultation.consultation_date.desc(),
+            Consultation.id.desc()
         )
         
-        return ConsultationListResponse(
-            consultations=consultations,
-            total=total
+        if cursor:
+            try:
+                last_date, last_id = decode_cursor(cursor)
+            except InvalidCursor as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+            query = query.where(
+                tuple_(Consultation.consultation_date, Consultation.id)
+                < tuple_(last_date, last_id)
+            )
+        elif skip:
+            query = query.offset(skip)
+        
+        # Fetch one extra row to know whether another page exists
+        rows = (await db.execute(query.limit(limit + 1))).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last.consultation_date, last.id)
+        
+        payload = dumps({
+            "consultations": rows_to_dicts(rows, names),
+            "total": await count_consultations(db) if include_total else None,
+            "next_cursor": next_cursor,
+        })
+        if may_fill_cache(request):
+            result_cache.set(cache_key, payload)
+        return cached_json(payload)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error fetching consultations: {str(e)}"
         )
+
+
+@app.get(
+    "/api/consultations/batch",
+    response_model=Union[ConsultationBatchResponse, ConsultationSummaryBatchResponse],
+    tags=["Consultations"],
+    summary="Get many consultations by ID",
+    responses={
+        200: {"description": "Found consultations and the IDs that were not"},
+        400: {"model": ErrorResponse, "description": "No IDs or too many IDs"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+async def get_consultations_batch(
+    ids: Optional[List[int]] = Query(None, description="Consultation IDs (repeat the parameter)"),
+    fields: str = Query("full", pattern="^(full|summary)$", description="`summary` replaces treatment_notes with a short preview"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Fetch several consultations in one query instead of one request per ID.
+    
+    - **ids**: Up to 500 IDs, e.g. `?ids=3&ids=17&ids=42`; duplicates are
+      returned once
+    - **fields**: `full` (default) or `summary`
+    
+    Consultations come back in the requested order; IDs that do not exist
+    or were deleted are listed under `missing`.
+    """
+    if not ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass at least one id"
+        )
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > BATCH_FETCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BATCH_FETCH_MAX_IDS} ids per request"
+        )
+    
+    try:
+        columns, names = PROJECTIONS[fields]
+        rows = (await db.execute(
+            select(*columns)
+            .where(Consultation.id.in_(ids), Consultation.deleted_at.is_(None))
+        )).all()
+        by_id = {row.id: row for row in rows}
+        
+        return json_response({
+            "consultations": rows_to_dicts(
+                [by_id[consultation_id] for consultation_id in ids if consultation_id in by_id],
+                names
+            ),
+            "missing": [consultation_id for consultation_id in ids if consultation_id not in by_id],
+        })
     
     except Exception as e:
         raise HTTPException(
@@ -197,6 +1101,134 @@ async def list_consultations(
         )
 
 
+@app.get(
+    "/api/consultations/changes",
+    response_model=Union[ConsultationChangesResponse, ConsultationSummaryChangesResponse],
+    tags=["Consultations"],
+    summary="Consultations changed since a change feed position",
+    responses={
+        200: {"description": "Changed consultations and deleted IDs"},
+        410: {"model": ErrorResponse, "description": "Position too old; reload the list"},
+        501: {"model": ErrorResponse, "description": "The change feed requires SQLite"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+async def consultation_changes(
+    since: Optional[int] = Query(None, ge=0, description="seq from the previous response; omit to get the current position"),
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of changes to return"),
+    fields: str = Query("full", pattern="^(full|summary)$", description="`summary` replaces treatment_notes with a short preview"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Delta sync for the consultation list.
+    
+    - **since**: Feed position from a previous response. Without it only the
+      current position is returned: read it before loading the list, then
+      poll with it to receive what changed afterwards
+    - **limit**: Maximum number of changes; `has_more` is true when more
+      are pending, continue from the returned `seq`
+    - **fields**: `full` (default) or `summary`, as for the list
+    
+    Returns the current state of each created or updated consultation and
+    the IDs of deleted ones. A position older than
+    `CHANGE_FEED_RETENTION_SECONDS` gets 410; reload the list instead.
+    """
+    if not changes_supported(engine):
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="The change feed requires SQLite"
+        )
+    
+    try:
+        if since is None:
+            delta = {
+                "seq": await latest_change_seq(db),
+                "consultations": [],
+                "deleted": [],
+                "has_more": False,
+            }
+        else:
+            columns, names = PROJECTIONS[fields]
+            delta = await read_changes(db, since, limit, columns, names)
+        delta["total"] = await count_consultations(db)
+        return json_response(delta)
+    
+    except ChangesExpired as e:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error reading consultation changes: {str(e)}"
+        )
+
+
+@app.get(
+    "/api/consultations/stream",
+    tags=["Consultations"],
+    summary="Server-sent events for consultation changes",
+    responses={
+        200: {"description": "text/event-stream of `changes` events", "content": {"text/event-stream": {}}},
+        410: {"model": ErrorResponse, "description": "Position too old; reload the list"},
+        501: {"model": ErrorResponse, "description": "The change feed requires SQLite"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+async def stream_consultation_changes(
+    since: Optional[int] = Query(None, ge=0, description="Feed position to stream from (defaults to now)"),
+    fields: str = Query("full", pattern="^(full|summary)$", description="`summary` replaces treatment_notes with a short preview"),
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID", ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Push consultation changes as they are committed.
+    
+    - **since**: Feed position, e.g. `seq` from `/api/consultations/changes`
+      read before loading the list
+    - **fields**: `full` (default) or `summary`
+    
+    Each `changes` event has the same body as `/api/consultations/changes`
+    and the new position as its id, so an `EventSource` that reconnects
+    resumes where it stopped. The server closes the stream after
+    `CHANGE_STREAM_SECONDS`; EventSource then reconnects on its own.
+    """
+    if not changes_supported(engine):
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="The change feed requires SQLite"
+        )
+    
+    columns, names = PROJECTIONS[fields]
+    position = last_event_id if last_event_id is not None else since
+    try:
+        if position is None:
+            position = await latest_change_seq(db)
+        else:
+            # Surface a stale position as a 410 before the stream starts
+            await read_changes(db, position, 1, columns, names)
+    except ChangesExpired as e:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error reading consultation changes: {str(e)}"
+        )
+    
+    return StreamingResponse(
+        change_events(
+            AsyncSessionLocal, position, columns, names,
+            limit=500, count=count_consultations, duration=config.CHANGE_STREAM_SECONDS
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get(
     "/api/consultation/{consultation_id}",
     response_model=ConsultationResponse,
@@ -209,18 +1241,34 @@ async def list_consultations(
     }
 )
 async def get_consultation(
+    request: Request,
     consultation_id: int,
-    db: Session = Depends(get_db)
+    include_archived: bool = Query(False, description="Look in the archive if the consultation is not in the hot table"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get a specific consultation by ID.
     
     - **consultation_id**: The unique identifier of the consultation
+    - **include_archived**: Also find consultations moved to the archive
     """
     try:
-        consultation = db.query(Consultation).filter(
-            Consultation.id == consultation_id
-        ).first()
+        if may_read_cache(request):
+            cached = result_cache.get(consultation_key(consultation_id))
+            if cached is not None:
+                return cached_json(cached)
+        
+        consultation = await db.scalar(
+            select(Consultation).where(
+                Consultation.id == consultation_id,
+                Consultation.deleted_at.is_(None)
+            )
+        )
+        
+        if not consultation and include_archived:
+            archived = await db.run_sync(find_archived_consultation, config.ARCHIVE_DIR, consultation_id)
+            if archived:
+                return json_response(archived)
         
         if not consultation:
             raise HTTPException(
@@ -228,7 +1276,10 @@ async def get_consultation(
                 detail=f"Consultation with ID {consultation_id} not found"
             )
         
-        return consultation
+        payload = ConsultationResponse.model_validate(consultation).model_dump_json().encode()
+        if may_fill_cache(request):
+            result_cache.set(consultation_key(consultation_id), payload)
+        return cached_json(payload)
     
     except HTTPException:
         raise
@@ -252,39 +1303,142 @@ async def get_consultation(
 )
 async def delete_consultation(
     consultation_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a consultation by ID.
     
     - **consultation_id**: The unique identifier of the consultation to delete
+    
+    The consultation disappears from every endpoint at once and is removed
+    from the database for good after `PURGE_AFTER_SECONDS`.
     """
     try:
-        consultation = db.query(Consultation).filter(
-            Consultation.id == consultation_id
-        ).first()
+        # One UPDATE statement; triggers keep counts and links in step
+        diagnosis_codes = (await db.execute(
+            update(Consultation)
+            .where(Consultation.id == consultation_id, Consultation.deleted_at.is_(None))
+            .values(deleted_at=datetime.utcnow())
+            .returning(Consultation.diagnosis_codes)
+            .execution_options(synchronize_session=False)
+        )).scalar_one_or_none()
         
-        if not consultation:
+        if diagnosis_codes is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Consultation with ID {consultation_id} not found"
             )
         
-        db.delete(consultation)
-        db.commit()
+        await db.commit()
+        invalidate_consultation(consultation_id)
+        change_notifier.notify()
+        diagnosis_tree.record_usage(diagnosis_codes, -1)
         
         return None
     
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error deleting consultation: {str(e)}"
         )
 
 
+@app.delete(
+    "/api/consultations",
+    response_model=BulkDeleteResponse,
+    tags=["Consultations"],
+    summary="Delete consultations by ID or date range",
+    responses={
+        200: {"description": "Number of consultations deleted"},
+        400: {"model": ErrorResponse, "description": "No filter given or too many IDs"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+async def bulk_delete_consultations(
+    ids: Optional[List[int]] = Query(None, description="Consultation IDs to delete (repeat the parameter)"),
+    start: Optional[datetime] = Query(None, description="Delete consultations on or after this date"),
+    end: Optional[datetime] = Query(None, description="Delete consultations before this date"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Delete many consultations with one statement.
+    
+    - **ids**: Consultation IDs, e.g. `?ids=1&ids=2`
+    - **start** / **end**: Date range (end is exclusive)
+    
+    At least one filter is required; combined filters must all match.
+    Unknown or already deleted IDs are ignored.
+    """
+    if not ids and start is None and end is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Give ids, start or end"
+        )
+    if ids and len(ids) > BULK_DELETE_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BULK_DELETE_MAX_IDS} ids per request"
+        )
+    
+    try:
+        query = update(Consultation).where(Consultation.deleted_at.is_(None))
+        if ids:
+            query = query.where(Consultation.id.in_(ids))
+        if start:
+            query = query.where(Consultation.consultation_date >= start)
+        if end:
+            query = query.where(Consultation.consultation_date < end)
+        
+        deleted = (await db.execute(
+            query.values(deleted_at=datetime.utcnow())
+            .returning(Consultation.id, Consultation.diagnosis_codes)
+            .execution_options(synchronize_session=False)
+        )).all()
+        await db.commit()
+        
+        for consultation_id, diagnosis_codes in deleted:
+            result_cache.delete(consultation_key(consultation_id))
+            diagnosis_tree.record_usage(diagnosis_codes, -1)
+        invalidate_consultation_lists()
+        change_notifier.notify()
+        
+        return BulkDeleteResponse(deleted=len(deleted))
+    
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error deleting consultations: {str(e)}"
+        )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Request, latency and SQL metrics in Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get(
+    "/api/cache/stats",
+    response_model=CacheStatsResponse,
+    tags=["Health"],
+    summary="Result cache counters"
+)
+async def cache_stats():
+    """
+    Hit, miss and eviction counters of the consultation result cache.
+    """
+    stats = result_cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    return CacheStatsResponse(
+        **stats,
+        hit_ratio=round(stats["hits"] / lookups, 4) if lookups else 0.0
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,272 @@
+"""Request and SQL instrumentation exposed in Prometheus text format.
+
+``MetricsMiddleware`` times every request and labels it with the route
+template (``/api/consultation/{consultation_id}``, not the raw path, so the
+number of series stays bounded). SQLAlchemy cursor events attribute every
+statement to the request that issued it through a context variable, which
+gives per-request statement counts and SQL time: an N+1 loop shows up as a
+statement-count histogram skewed to the right for one route.
+
+Set ``SLOW_QUERY_MS`` to log statements slower than that threshold. Only
+the SQL text is logged; bound parameters may contain patient data and are
+replaced by their types.
+"""
+
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import config
+
+logger = logging.getLogger("cliniccare.sql")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [
+                f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+                for labels, value in sorted(self._values.items())
+            ]
+
+
+class Gauge(Counter):
+    """A value that goes up and down."""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for labels, series in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), series):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _format_value(bound)
+                    bucket_labels = _format_labels(self.label_names, labels, f'le="{le}"')
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                label_text = _format_labels(self.label_names, labels)
+                lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+                lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status code",
+    ("method", "route", "status")
+))
+REQUEST_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response is sent",
+    ("method", "route")
+))
+IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled"
+))
+REQUEST_SQL_STATEMENTS = registry.register(Histogram(
+    "http_request_sql_statements", "SQL statements executed per HTTP request",
+    ("method", "route"), buckets=STATEMENT_COUNT_BUCKETS
+))
+REQUEST_SQL_DURATION = registry.register(Histogram(
+    "http_request_sql_duration_seconds", "Time spent in SQL per HTTP request",
+    ("method", "route")
+))
+SQL_STATEMENTS = registry.register(Counter(
+    "db_statements_total", "SQL statements executed, in or outside requests"
+))
+SLOW_STATEMENTS = registry.register(Counter(
+    "db_slow_statements_total", "SQL statements slower than SLOW_QUERY_MS"
+))
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+class RequestSQLStats:
+    """SQL statements issued while handling one request."""
+
+    __slots__ = ("statements", "duration")
+
+    def __init__(self):
+        self.statements = 0
+        self.duration = 0.0
+
+
+# The stats object is shared (not copied) with the threadpool and the
+# greenlets that run async driver calls, so increments land in one place.
+current_sql_stats: ContextVar[Optional[RequestSQLStats]] = ContextVar(
+    "current_sql_stats", default=None
+)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def redact_parameters(parameters, executemany: bool) -> str:
+    """Describe bound parameters without their values."""
+    if executemany:
+        return f"<{len(parameters)} parameter sets redacted>"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: <{type(value).__name__}>" for key, value in parameters.items()) + "}"
+    return "(" + ", ".join(f"<{type(value).__name__}>" for value in parameters or ()) + ")"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    SQL_STATEMENTS.inc()
+    stats = current_sql_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.duration += elapsed
+
+    if config.SLOW_QUERY_MS and elapsed * 1000 >= config.SLOW_QUERY_MS:
+        SLOW_STATEMENTS.inc()
+        logger.warning(
+            "Slow query (%.1f ms): %s parameters=%s",
+            elapsed * 1000,
+            _WHITESPACE_RE.sub(" ", statement).strip(),
+            redact_parameters(parameters, executemany)
+        )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count and time every statement run through ``engine``."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and SQL use per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSQLStats()
+        token = current_sql_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+        IN_FLIGHT.inc()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec()
+            current_sql_stats.reset(token)
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            REQUESTS.inc(method, route_path, str(status_code))
+            REQUEST_LATENCY.observe(elapsed, method, route_path)
+            REQUEST_SQL_STATEMENTS.observe(stats.statements, method, route_path)
+            REQUEST_SQL_DURATION.observe(stats.duration, method, route_path)
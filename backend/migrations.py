@@ -0,0 +1,354 @@
+"""Schema upgrades for existing databases.
+
+``Base.metadata.create_all`` only creates missing tables. Indexes added to
+existing tables and trigger-maintained bookkeeping are installed here, and
+every step is idempotent so it can run on each startup.
+"""
+
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.orm import Session
+
+from database import Base
+from fts import install_fts
+from changes import install_change_feed
+from rollups import install_rollups
+from http_cache import DIAGNOSIS_CODES_VERSION, bump_version, read_version
+from icd10 import classify
+from models import Consultation, ConsultationArchive
+
+# Counted tables are soft-deletable: rows with deleted_at set do not count.
+COUNTED_TABLES = ["consultations"]
+
+
+def _counter_triggers(table: str):
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_count_ai AFTER INSERT ON {table}
+        WHEN new.deleted_at IS NULL BEGIN
+            UPDATE row_counts SET row_count = row_count + 1 WHERE table_name = '{table}';
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_count_ad AFTER DELETE ON {table}
+        WHEN old.deleted_at IS NULL BEGIN
+            UPDATE row_counts SET row_count = row_count - 1 WHERE table_name = '{table}';
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_count_au_deleted AFTER UPDATE OF deleted_at ON {table}
+        WHEN (old.deleted_at IS NULL) != (new.deleted_at IS NULL) BEGIN
+            UPDATE row_counts
+            SET row_count = row_count + CASE WHEN new.deleted_at IS NULL THEN 1 ELSE -1 END
+            WHERE table_name = '{table}';
+        END
+        """,
+    ]
+
+
+# Links exist for live consultations only, so everything built on them
+# (lookups by code, per-code counts and rollups) ignores deleted ones.
+DIAGNOSIS_LINK_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS consultation_diagnoses_ai AFTER INSERT ON consultations
+    WHEN new.deleted_at IS NULL BEGIN
+        INSERT OR IGNORE INTO consultation_diagnoses (consultation_id, code, consultation_date)
+        SELECT new.id, value, new.consultation_date FROM json_each(new.diagnosis_codes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS consultation_diagnoses_au
+    AFTER UPDATE OF diagnosis_codes, consultation_date, deleted_at ON consultations BEGIN
+        DELETE FROM consultation_diagnoses WHERE consultation_id = old.id;
+        INSERT OR IGNORE INTO consultation_diagnoses (consultation_id, code, consultation_date)
+        SELECT new.id, value, new.consultation_date FROM json_each(new.diagnosis_codes)
+        WHERE new.deleted_at IS NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS consultation_diagnoses_ad AFTER DELETE ON consultations BEGIN
+        DELETE FROM consultation_diagnoses WHERE consultation_id = old.id;
+    END
+    """,
+]
+
+# Triggers whose definitions changed when soft delete was introduced.
+# Dropping them makes the installers below recreate them and re-derive
+# their tables, all from rows that are not deleted.
+PRE_SOFT_DELETE_TRIGGERS = [
+    "consultations_count_ai",
+    "consultations_count_ad",
+    "consultation_diagnoses_ai",
+    "consultation_diagnoses_au",
+    "daily_consultation_counts_ai",
+    "daily_consultation_counts_ad",
+    "daily_consultation_counts_au",
+    "consultations_fts_au",
+]
+
+
+# Stand-ins for NOT NULL on consultations.consultation_date, which SQLite
+# cannot add to an existing column
+CONSULTATION_DATE_GUARDS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS consultations_date_not_null_bi BEFORE INSERT ON consultations
+    WHEN new.consultation_date IS NULL BEGIN
+        SELECT RAISE(ABORT, 'NOT NULL constraint failed: consultations.consultation_date');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS consultations_date_not_null_bu
+    BEFORE UPDATE OF consultation_date ON consultations
+    WHEN new.consultation_date IS NULL BEGIN
+        SELECT RAISE(ABORT, 'NOT NULL constraint failed: consultations.consultation_date');
+    END
+    """,
+]
+
+
+# Indexes replaced by a composite index that serves the same lookups
+SUPERSEDED_INDEXES = [
+    # by ix_consultations_live_patient_date_id
+    "ix_consultations_patient_name",
+]
+
+
+def _trigger_exists(conn, name: str) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name"),
+        {"name": name}
+    ).first() is not None
+
+
+def create_missing_indexes(engine: Engine) -> None:
+    """Create indexes declared on models that an older database lacks."""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
+def drop_superseded_indexes(engine: Engine) -> None:
+    """Drop indexes a newer composite index made redundant.
+
+    Every index slows down writes to its table; one the planner no longer
+    picks is pure cost.
+    """
+    with engine.begin() as conn:
+        for name in SUPERSEDED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def install_soft_delete(engine: Engine) -> None:
+    """Add ``consultations.deleted_at`` to databases created before it.
+
+    The superseded full-table index and the triggers that did not know
+    about deleted rows go in the same transaction.
+    """
+    with engine.begin() as conn:
+        columns = {column["name"] for column in inspect(conn).get_columns("consultations")}
+        if "deleted_at" in columns:
+            return
+        conn.execute(text("ALTER TABLE consultations ADD COLUMN deleted_at DATETIME"))
+        conn.execute(text("DROP INDEX IF EXISTS ix_consultations_date_id"))
+        if engine.dialect.name == "sqlite":
+            for name in PRE_SOFT_DELETE_TRIGGERS:
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+
+def install_code_hierarchy(engine: Engine) -> None:
+    """Add the ICD-10 hierarchy columns to ``diagnosis_codes`` and fill them.
+
+    New codes get them on insert; this classifies the codes loaded before
+    the columns existed, and places codes left without a block in blocks
+    added to icd10.py since.
+    """
+    with engine.begin() as conn:
+        columns = {column["name"] for column in inspect(conn).get_columns("diagnosis_codes")}
+        if "category" not in columns:
+            conn.execute(text("ALTER TABLE diagnosis_codes ADD COLUMN chapter INTEGER"))
+            conn.execute(text("ALTER TABLE diagnosis_codes ADD COLUMN block VARCHAR(7)"))
+            conn.execute(text("ALTER TABLE diagnosis_codes ADD COLUMN category VARCHAR(3)"))
+
+        rows = conn.execute(text(
+            "SELECT id, code, chapter, block, category FROM diagnosis_codes "
+            "WHERE category IS NULL OR block IS NULL"
+        )).all()
+        changed = []
+        for row_id, code, *stored in rows:
+            classification = classify(code)
+            if tuple(stored) != classification:
+                changed.append({"id": row_id, **classification._asdict()})
+        if changed:
+            conn.execute(
+                text(
+                    "UPDATE diagnosis_codes SET chapter = :chapter, block = :block, "
+                    "category = :category WHERE id = :id"
+                ),
+                changed
+            )
+
+    if changed:
+        # Processes holding the tree rebuild it
+        with Session(engine) as db:
+            bump_version(db, DIAGNOSIS_CODES_VERSION)
+            db.commit()
+
+
+def install_row_counters(engine: Engine) -> None:
+    """Seed ``row_counts`` and install the triggers that maintain it."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.begin() as conn:
+        for table in COUNTED_TABLES:
+            if not _trigger_exists(conn, f"{table}_count_ai"):
+                # Seed and install in one transaction so no write is missed.
+                conn.execute(
+                    text(
+                        f"INSERT OR REPLACE INTO row_counts (table_name, row_count) "
+                        f"SELECT '{table}', COUNT(*) FROM {table} WHERE deleted_at IS NULL"
+                    )
+                )
+            for ddl in _counter_triggers(table):
+                conn.execute(text(ddl))
+
+
+def install_diagnosis_links(engine: Engine) -> None:
+    """Backfill ``consultation_diagnoses`` from the JSON column and install
+    the triggers that keep it in sync."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.begin() as conn:
+        if not _trigger_exists(conn, "consultation_diagnoses_ai"):
+            conn.execute(text("""
+                INSERT OR IGNORE INTO consultation_diagnoses (consultation_id, code, consultation_date)
+                SELECT c.id, j.value, c.consultation_date
+                FROM consultations AS c, json_each(c.diagnosis_codes) AS j
+                WHERE c.deleted_at IS NULL
+            """))
+        for ddl in DIAGNOSIS_LINK_TRIGGERS:
+            conn.execute(text(ddl))
+
+
+def install_consultation_autoincrement(engine: Engine) -> None:
+    """Rebuild ``consultations`` with AUTOINCREMENT on older SQLite databases.
+
+    Without it SQLite hands the highest IDs out again once those rows are
+    gone, and archival removes rows from the hot table for good: an archived
+    consultation and a new one would share an ID. SQLite cannot add
+    AUTOINCREMENT to a table, so the rows move to a new one; its indexes
+    and triggers are recreated as they were, so nothing derived from the
+    table is rebuilt. The sequence starts above every archived ID too.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.connect() as conn:
+        table_sql = conn.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'consultations'"
+        )).scalar()
+        if "AUTOINCREMENT" in table_sql.upper():
+            return
+        # Dropping the old table must not cascade into consultation_diagnoses;
+        # the pragma only changes outside a transaction
+        foreign_keys = conn.exec_driver_sql("PRAGMA foreign_keys").scalar()
+        conn.exec_driver_sql("PRAGMA foreign_keys = OFF")
+        conn.commit()
+        try:
+            with conn.begin():
+                _rebuild_consultations(conn)
+        finally:
+            conn.exec_driver_sql(f"PRAGMA foreign_keys = {int(foreign_keys)}")
+            conn.commit()
+
+
+def _rebuild_consultations(conn) -> None:
+    dependents = conn.execute(text(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = 'consultations' "
+        "AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+    )).scalars().all()
+    table = Consultation.__table__
+    columns = ", ".join(column.name for column in table.columns)
+    create = str(CreateTable(table).compile(dialect=conn.dialect))
+    # Left over if an earlier attempt failed before the rename
+    conn.execute(text("DROP TABLE IF EXISTS consultations_rebuilt"))
+    conn.execute(text(create.replace(
+        "CREATE TABLE consultations", "CREATE TABLE consultations_rebuilt", 1
+    )))
+    conn.execute(text(
+        f"INSERT INTO consultations_rebuilt ({columns}) SELECT {columns} FROM consultations"
+    ))
+    conn.execute(text("DROP TABLE consultations"))
+    conn.execute(text("ALTER TABLE consultations_rebuilt RENAME TO consultations"))
+    for ddl in dependents:
+        conn.execute(text(ddl))
+
+    high_water = max(
+        conn.execute(select(func.max(Consultation.id))).scalar() or 0,
+        conn.execute(select(func.max(ConsultationArchive.max_id))).scalar() or 0,
+    )
+    conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'consultations'"))
+    conn.execute(
+        text("INSERT INTO sqlite_sequence (name, seq) VALUES ('consultations', :seq)"),
+        {"seq": high_water}
+    )
+
+
+def require_consultation_date(engine: Engine) -> None:
+    """Make ``consultations.consultation_date`` NOT NULL on older databases.
+
+    Keyset cursors encode the date of a page's last row, and NULLs sort
+    inconsistently between databases, so undated consultations get their
+    ``created_at``. Runs before the installers below backfill the links and
+    rollups from the dates; triggers installed earlier follow the update.
+    """
+    with engine.begin() as conn:
+        column = next(
+            column for column in inspect(conn).get_columns("consultations")
+            if column["name"] == "consultation_date"
+        )
+        if not column["nullable"]:
+            return
+
+        if engine.dialect.name == "sqlite":
+            # Same text format SQLAlchemy stores, so dates keep sorting as text
+            now = "strftime('%Y-%m-%d %H:%M:%S.000000', 'now')"
+        else:
+            now = "CURRENT_TIMESTAMP"
+        conn.execute(text(
+            f"UPDATE consultations SET consultation_date = COALESCE(created_at, {now}) "
+            f"WHERE consultation_date IS NULL"
+        ))
+
+        if engine.dialect.name == "sqlite":
+            for ddl in CONSULTATION_DATE_GUARDS:
+                conn.execute(text(ddl))
+        else:
+            conn.execute(text("ALTER TABLE consultations ALTER COLUMN consultation_date SET NOT NULL"))
+
+
+def seed_version_stamps(engine: Engine) -> None:
+    """Give databases created before version stamps existed a first stamp."""
+    with Session(engine) as db:
+        if read_version(db, DIAGNOSIS_CODES_VERSION) is None:
+            bump_version(db, DIAGNOSIS_CODES_VERSION)
+            db.commit()
+
+
+def run_migrations(engine: Engine) -> None:
+    """Bring an existing database up to date with the current models."""
+    install_soft_delete(engine)
+    require_consultation_date(engine)
+    install_consultation_autoincrement(engine)
+    install_code_hierarchy(engine)
+    create_missing_indexes(engine)
+    drop_superseded_indexes(engine)
+    install_row_counters(engine)
+    install_diagnosis_links(engine)
+    install_rollups(engine)
+    install_fts(engine)
+    install_change_feed(engine)
+    seed_version_stamps(engine)
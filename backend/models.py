@@ -1,9 +1,14 @@
 """SQLAlchemy ORM models."""
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, JSON, Index, ForeignKey, text
 
 from database import Base
+from icd10 import classify
+
+
+def _classify_code(context):
+    return classify(context.get_current_parameters()["code"])
 
 
 class DiagnosisCode(Base):
@@ -14,6 +19,11 @@ class DiagnosisCode(Base):
     id = Column(Integer, primary_key=True, index=True)
     code = Column(String(20), unique=True, index=True, nullable=False)
     description = Column(Text, nullable=False)
+    # Position in the ICD-10 hierarchy (see icd10.py), derived from the
+    # code on insert; chapter and block are NULL outside the known ranges
+    chapter = Column(Integer, nullable=True, default=lambda context: _classify_code(context).chapter)
+    block = Column(String(7), nullable=True, default=lambda context: _classify_code(context).block)
+    category = Column(String(3), nullable=True, default=lambda context: _classify_code(context).category)
 
 
 class Consultation(Base):
@@ -22,8 +32,141 @@ class Consultation(Base):
     __tablename__ = "consultations"
     
     id = Column(Integer, primary_key=True, index=True)
-    patient_name = Column(String(255), nullable=False, index=True)
+    patient_name = Column(String(255), nullable=False)
     diagnosis_codes = Column(JSON, nullable=False, default=list)
     treatment_notes = Column(Text, nullable=False)
-    consultation_date = Column(DateTime, default=datetime.utcnow)
+    # Part of every keyset cursor, so never NULL (see require_consultation_date)
+    consultation_date = Column(DateTime, nullable=False, default=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Set by a delete; the row is hidden from every read and purged later
+    deleted_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        # Keyset pagination over live rows: ORDER BY consultation_date DESC, id DESC
+        Index(
+            "ix_consultations_live_date_id", "consultation_date", "id",
+            sqlite_where=text("deleted_at IS NULL"),
+            postgresql_where=text("deleted_at IS NULL")
+        ),
+        # A patient's timeline, newest first, with keyset paging
+        Index(
+            "ix_consultations_live_patient_date_id", "patient_name", "consultation_date", "id",
+            sqlite_where=text("deleted_at IS NULL"),
+            postgresql_where=text("deleted_at IS NULL")
+        ),
+        # Purge scan over deleted rows only
+        Index(
+            "ix_consultations_deleted_at", "deleted_at",
+            sqlite_where=text("deleted_at IS NOT NULL"),
+            postgresql_where=text("deleted_at IS NOT NULL")
+        ),
+        # AUTOINCREMENT: IDs of purged or archived rows are never reused
+        {"sqlite_autoincrement": True},
+    )
+
+
+class ConsultationDiagnosis(Base):
+    """Consultation to diagnosis code link, one row per code.
+    
+    Mirrors ``Consultation.diagnosis_codes`` (kept in sync by triggers) so
+    lookups by code and per-code counts are index scans instead of JSON
+    parsing. ``consultation_date`` is copied from the consultation so date
+    range queries never need the join.
+    """
+    
+    __tablename__ = "consultation_diagnoses"
+    
+    consultation_id = Column(
+        Integer,
+        ForeignKey("consultations.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    code = Column(String(20), ForeignKey("diagnosis_codes.code"), primary_key=True)
+    consultation_date = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        # Consultations with a code, newest first
+        Index("ix_consultation_diagnoses_code_date", "code", "consultation_date", "consultation_id"),
+        # Per-code counts over a date range
+        Index("ix_consultation_diagnoses_date_code", "consultation_date", "code"),
+    )
+
+
+class RowCount(Base):
+    """Row counts maintained by triggers, so totals never need COUNT(*)."""
+    
+    __tablename__ = "row_counts"
+    
+    table_name = Column(String(64), primary_key=True)
+    row_count = Column(Integer, nullable=False, default=0)
+
+
+class DailyConsultationCount(Base):
+    """Consultations per day, maintained by triggers (see rollups.py)."""
+    
+    __tablename__ = "daily_consultation_counts"
+    
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class DailyDiagnosisCount(Base):
+    """Consultations per day and diagnosis code, maintained by triggers."""
+    
+    __tablename__ = "daily_diagnosis_counts"
+    
+    day = Column(Date, primary_key=True)
+    code = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class AppMeta(Base):
+    """Key/value application metadata, such as table version stamps."""
+    
+    __tablename__ = "app_meta"
+    
+    key = Column(String(64), primary_key=True)
+    value = Column(String(255), nullable=False)
+
+
+class IdempotencyKey(Base):
+    """Stored response of a create request, replayed for retries with the same key."""
+    
+    __tablename__ = "idempotency_keys"
+    
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class ConsultationChange(Base):
+    """One row per consultation write, in commit order (see changes.py)."""
+    
+    __tablename__ = "consultation_changes"
+    
+    # AUTOINCREMENT: sequence numbers are never reused, even after trimming
+    seq = Column(Integer, primary_key=True)
+    consultation_id = Column(Integer, nullable=False)
+    changed_at = Column(DateTime, nullable=False, index=True)
+    
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class ConsultationArchive(Base):
+    """Manifest entry for one month of consultations moved to an archive file (see archive.py)."""
+    
+    __tablename__ = "consultation_archives"
+    
+    # "YYYY-MM" of the consultation dates in the file
+    month = Column(String(7), primary_key=True)
+    # File name inside ARCHIVE_DIR
+    path = Column(String(255), nullable=False)
+    row_count = Column(Integer, nullable=False)
+    # Narrows ID lookups to the files that can hold the ID
+    min_id = Column(Integer, nullable=False)
+    max_id = Column(Integer, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,102 @@
+"""Send reads to the read-only pool, except right after a client's own write.
+
+GET handlers take their session from ``get_read_db``; writes keep using
+``get_async_db``. Heavy reads (lists, search, exports) then no longer
+compete with writes for pooled connections, and with a replica not for the
+primary's CPU either.
+
+A replica can lag behind the primary, so a client that just created or
+deleted a consultation might not see it on its next read. Every successful
+write therefore sets a short-lived ``cc_last_write`` cookie, and requests
+carrying a recent one read from the primary. A local read-only pool on a
+WAL database sees every commit at once and never lags.
+
+The result cache has to respect the same split. A recent writer never
+takes a cached result, which may have been cached before its write
+reached this worker (or, with a replica, read from a replica that had not
+replayed it yet). And results read from a replica are never cached, since
+a lagging page would otherwise outlive the lag by the cache TTL.
+"""
+
+import math
+import time
+from typing import Callable
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import config
+from database import (
+    AsyncReadSessionLocal,
+    AsyncSessionLocal,
+    ReadSessionLocal,
+    SessionLocal,
+    has_read_pool,
+)
+
+LAST_WRITE_COOKIE = "cc_last_write"
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Reads may come from a replica that lags, rather than the primary file
+reads_from_replica = has_read_pool and config.READ_DATABASE_URL is not None
+
+
+def recently_wrote(request: Request) -> bool:
+    """Whether the client wrote within ``READ_YOUR_WRITES_SECONDS``."""
+    try:
+        written_at = float(request.cookies.get(LAST_WRITE_COOKIE, ""))
+    except ValueError:
+        return False
+    return time.time() - written_at < config.READ_YOUR_WRITES_SECONDS
+
+
+def may_read_cache(request: Request) -> bool:
+    """Whether this client's read may be served from the result cache."""
+    return not recently_wrote(request)
+
+
+def may_fill_cache(request: Request) -> bool:
+    """Whether this client's read result may be stored in the result cache:
+    only when it came from the primary or a read pool that cannot lag."""
+    return not reads_from_replica or recently_wrote(request)
+
+
+def read_session_factory(request: Request) -> Callable[[], AsyncSession]:
+    """Async sessions for a read made by this request's client."""
+    return AsyncSessionLocal if recently_wrote(request) else AsyncReadSessionLocal
+
+
+def sync_read_session_factory(request: Request) -> Callable[[], Session]:
+    """Sync sessions (for streamed exports) for a read by this request's client."""
+    return SessionLocal if recently_wrote(request) else ReadSessionLocal
+
+
+async def get_read_db(request: Request):
+    """Dependency to get an async session for a read-only handler."""
+    async with read_session_factory(request)() as db:
+        yield db
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware setting ``cc_last_write`` on successful writes."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not has_read_pool or scope["method"] not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = (
+                    f"{LAST_WRITE_COOKIE}={time.time():.3f}; "
+                    f"Max-Age={math.ceil(config.READ_YOUR_WRITES_SECONDS)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
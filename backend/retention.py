@@ -0,0 +1,64 @@
+"""Hard deletion of soft-deleted consultations.
+
+Deleting a consultation only sets ``deleted_at``: one small UPDATE, after
+which triggers take the row out of the counter, the code links and the
+rollups, and every read filters it out. A background task removes the rows
+for good once they have been deleted for ``PURGE_AFTER_SECONDS``. It deletes
+``PURGE_BATCH_SIZE`` rows per transaction, so even after a bulk delete of a
+whole year the write lock is only ever held for a few milliseconds.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Consultation
+
+logger = logging.getLogger("cliniccare.retention")
+
+
+async def purge_deleted_consultations(db: AsyncSession, deleted_before: datetime,
+                                      batch_size: int = 500) -> int:
+    """Hard-delete consultations soft-deleted before ``deleted_before``.
+
+    Returns the number of rows removed.
+    """
+    purged = 0
+    while True:
+        batch = (
+            select(Consultation.id)
+            .where(Consultation.deleted_at <= deleted_before)
+            .limit(batch_size)
+        )
+        result = await db.execute(
+            delete(Consultation)
+            .where(Consultation.id.in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        purged += result.rowcount
+        if result.rowcount < batch_size:
+            return purged
+        # Let queued requests take the write lock between batches
+        await asyncio.sleep(0)
+
+
+async def purge_deleted_periodically(session_factory: Callable[[], AsyncSession],
+                                     interval: float, purge_after: float,
+                                     batch_size: int) -> None:
+    """Run ``purge_deleted_consultations`` every ``interval`` seconds until cancelled."""
+    while True:
+        try:
+            async with session_factory() as db:
+                purged = await purge_deleted_consultations(
+                    db, datetime.utcnow() - timedelta(seconds=purge_after), batch_size
+                )
+            if purged:
+                logger.info("Purged %d deleted consultations", purged)
+        except Exception:
+            logger.exception("Purging deleted consultations failed")
+        await asyncio.sleep(interval)
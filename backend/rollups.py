@@ -0,0 +1,162 @@
+"""Trigger-maintained daily rollups for the analytics dashboard.
+
+``daily_consultation_counts`` holds consultations per day and
+``daily_diagnosis_counts`` consultations per day and diagnosis code. SQLite
+triggers update them on every insert, (soft) delete and date/code change,
+so dashboard queries read one row per day (and code) instead of scanning
+``consultations`` and parsing its JSON column.
+
+Rebuild them from scratch (e.g. after restoring a backup) with::
+
+    python rollups.py
+"""
+
+import time
+
+from sqlalchemy import Date, Integer, cast, func, text
+from sqlalchemy.engine import Engine
+
+BUCKETS = ("day", "week")
+
+ROLLUP_TRIGGERS = [
+    # Soft-deleted consultations are not counted
+    """
+    CREATE TRIGGER IF NOT EXISTS daily_consultation_counts_ai AFTER INSERT ON consultations
+    WHEN new.deleted_at IS NULL BEGIN
+        INSERT INTO daily_consultation_counts (day, count)
+        VALUES (date(new.consultation_date), 1)
+        ON CONFLICT(day) DO UPDATE SET count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS daily_consultation_counts_ad AFTER DELETE ON consultations
+    WHEN old.deleted_at IS NULL BEGIN
+        UPDATE daily_consultation_counts SET count = count - 1
+        WHERE day = date(old.consultation_date);
+        DELETE FROM daily_consultation_counts
+        WHERE day = date(old.consultation_date) AND count <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS daily_consultation_counts_au
+    AFTER UPDATE OF consultation_date ON consultations
+    WHEN old.deleted_at IS NULL AND new.deleted_at IS NULL
+    AND date(old.consultation_date) IS NOT date(new.consultation_date) BEGIN
+        UPDATE daily_consultation_counts SET count = count - 1
+        WHERE day = date(old.consultation_date);
+        DELETE FROM daily_consultation_counts
+        WHERE day = date(old.consultation_date) AND count <= 0;
+        INSERT INTO daily_consultation_counts (day, count)
+        VALUES (date(new.consultation_date), 1)
+        ON CONFLICT(day) DO UPDATE SET count = count + 1;
+    END
+    """,
+    # Deleting or restoring moves the row out of or back into its day
+    """
+    CREATE TRIGGER IF NOT EXISTS daily_consultation_counts_au_deleted
+    AFTER UPDATE OF deleted_at ON consultations
+    WHEN (old.deleted_at IS NULL) != (new.deleted_at IS NULL) BEGIN
+        UPDATE daily_consultation_counts SET count = count - 1
+        WHERE day = date(old.consultation_date) AND old.deleted_at IS NULL;
+        DELETE FROM daily_consultation_counts
+        WHERE day = date(old.consultation_date) AND count <= 0;
+        INSERT INTO daily_consultation_counts (day, count)
+        SELECT date(new.consultation_date), 1 WHERE new.deleted_at IS NULL
+        ON CONFLICT(day) DO UPDATE SET count = count + 1;
+    END
+    """,
+    # Per-code counts follow consultation_diagnoses, whose own triggers
+    # already expand (and deduplicate) the diagnosis_codes JSON.
+    """
+    CREATE TRIGGER IF NOT EXISTS daily_diagnosis_counts_ai AFTER INSERT ON consultation_diagnoses BEGIN
+        INSERT INTO daily_diagnosis_counts (day, code, count)
+        VALUES (date(new.consultation_date), new.code, 1)
+        ON CONFLICT(day, code) DO UPDATE SET count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS daily_diagnosis_counts_ad AFTER DELETE ON consultation_diagnoses BEGIN
+        UPDATE daily_diagnosis_counts SET count = count - 1
+        WHERE day = date(old.consultation_date) AND code = old.code;
+        DELETE FROM daily_diagnosis_counts
+        WHERE day = date(old.consultation_date) AND code = old.code AND count <= 0;
+    END
+    """,
+]
+
+REBUILD_STATEMENTS = [
+    "DELETE FROM daily_consultation_counts",
+    """
+    INSERT INTO daily_consultation_counts (day, count)
+    SELECT date(consultation_date), COUNT(*) FROM consultations
+    WHERE deleted_at IS NULL
+    GROUP BY date(consultation_date)
+    """,
+    "DELETE FROM daily_diagnosis_counts",
+    """
+    INSERT INTO daily_diagnosis_counts (day, code, count)
+    SELECT date(consultation_date), code, COUNT(*) FROM consultation_diagnoses
+    GROUP BY date(consultation_date), code
+    """,
+]
+
+
+def rollups_supported(engine: Engine) -> bool:
+    """The rollup triggers are SQLite-only."""
+    return engine.dialect.name == "sqlite"
+
+
+def rebuild_rollups(engine: Engine) -> None:
+    """Recompute both rollup tables from the source tables."""
+    with engine.begin() as conn:
+        for statement in REBUILD_STATEMENTS:
+            conn.execute(text(statement))
+
+
+def install_rollups(engine: Engine) -> None:
+    """Backfill the rollups and install their triggers if missing.
+
+    Both happen in one transaction so no write between them is lost.
+    """
+    if not rollups_supported(engine):
+        return
+
+    with engine.begin() as conn:
+        installed = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' "
+            "AND name = 'daily_consultation_counts_ai'"
+        )).first() is not None
+        if not installed:
+            for statement in REBUILD_STATEMENTS:
+                conn.execute(text(statement))
+        for ddl in ROLLUP_TRIGGERS:
+            conn.execute(text(ddl))
+
+
+def bucket_expression(day_column, bucket: str):
+    """Period start for ``day_column``: the day itself, or the Monday of its week."""
+    if bucket == "week":
+        # strftime('%w') is 0 for Sunday; step back to Monday
+        return func.date(
+            day_column,
+            func.printf("-%d days", (cast(func.strftime("%w", day_column), Integer) + 6) % 7),
+            type_=Date
+        )
+    return day_column
+
+
+if __name__ == "__main__":
+    from database import engine, Base
+    from migrations import run_migrations
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    started = time.perf_counter()
+    rebuild_rollups(engine)
+    with engine.connect() as conn:
+        days = conn.execute(text("SELECT COUNT(*) FROM daily_consultation_counts")).scalar()
+        pairs = conn.execute(text("SELECT COUNT(*) FROM daily_diagnosis_counts")).scalar()
+    print(
+        f"Rebuilt rollups: {days} days, {pairs} day/code pairs "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
@@ -1,6 +1,6 @@
 """Pydantic schemas for request/response validation."""
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional
 from pydantic import BaseModel, Field, validator
 
@@ -20,6 +20,57 @@ class DiagnosisCodeResponse(DiagnosisCodeBase):
         from_attributes = True
 
 
+class DiagnosisCountResponse(BaseModel):
+    """Number of consultations recorded with a diagnosis code."""
+    code: str
+    description: Optional[str] = None
+    count: int
+
+
+class DiagnosisCountsResponse(BaseModel):
+    """Response schema for per-code consultation counts over a date range."""
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    counts: List[DiagnosisCountResponse]
+
+
+class DiagnosisTreeNode(BaseModel):
+    """A chapter, block, category or code in the ICD-10 hierarchy."""
+    key: str = Field(..., description="Chapter number, block range, category or code; pass as node= to open it")
+    level: str = Field(..., description="chapter, block, category or code")
+    title: Optional[str] = None
+    code_range: Optional[str] = Field(None, description="Categories covered by a chapter or block")
+    usage: int = Field(..., description="Times codes in this subtree are recorded on current consultations")
+    child_count: int
+    is_code: bool = Field(..., description="The node is itself a diagnosis code")
+
+
+class DiagnosisTreeResponse(BaseModel):
+    """One level of the ICD-10 hierarchy."""
+    node: Optional[DiagnosisTreeNode] = Field(None, description="The opened node, null at the top level")
+    path: List[DiagnosisTreeNode] = Field(..., description="Ancestors of the node, chapter first")
+    usage: int = Field(..., description="Usage over the node's subtree (all codes at the top level)")
+    children: List[DiagnosisTreeNode]
+
+
+# Analytics Schemas
+class AnalyticsPeriod(BaseModel):
+    """Consultation volume and most frequent codes in one bucket."""
+    period: date = Field(..., description="First day of the bucket (Monday for weeks)")
+    consultations: int
+    top_diagnoses: List[DiagnosisCountResponse] = []
+
+
+class ConsultationAnalyticsResponse(BaseModel):
+    """Response schema for dashboard aggregates."""
+    bucket: str
+    start: Optional[date] = None
+    end: Optional[date] = None
+    total: int = Field(..., description="Consultations in the whole range")
+    periods: List[AnalyticsPeriod]
+    top_diagnoses: List[DiagnosisCountResponse] = Field(..., description="Most frequent codes in the whole range")
+
+
 # Consultation Schemas
 class ConsultationCreate(BaseModel):
     """Schema for creating a consultation."""
@@ -42,9 +93,10 @@ class ConsultationCreate(BaseModel):
     
     @validator('diagnosis_codes')
     def validate_diagnosis_codes(cls, v):
-        if not v:
+        codes = [code.strip() for code in v if code.strip()]
+        if not codes:
             raise ValueError('At least one diagnosis code is required')
-        return [code.strip() for code in v if code.strip()]
+        return codes
 
 
 class ConsultationResponse(BaseModel):
@@ -63,7 +115,112 @@ class ConsultationResponse(BaseModel):
 class ConsultationListResponse(BaseModel):
     """Response schema for consultation list."""
     consultations: List[ConsultationResponse]
-    total: int
+    total: Optional[int] = Field(None, description="Total consultations (omitted when include_total=false)")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, null on the last page")
+
+
+class ConsultationSummary(BaseModel):
+    """Consultation list row without the full treatment notes."""
+    id: int
+    patient_name: str
+    diagnosis_codes: List[str]
+    notes_preview: str = Field(..., description="Start of the treatment notes")
+    notes_truncated: bool = Field(..., description="True when the notes are longer than the preview")
+    consultation_date: datetime
+    created_at: datetime
+
+
+class ConsultationSummaryListResponse(BaseModel):
+    """Response schema for consultation list with fields=summary."""
+    consultations: List[ConsultationSummary]
+    total: Optional[int] = Field(None, description="Total consultations (omitted when include_total=false)")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, null on the last page")
+
+
+class ConsultationBatchResponse(BaseModel):
+    """Consultations fetched by ID in one request."""
+    consultations: List[ConsultationResponse] = Field(..., description="Found consultations, in the requested order")
+    missing: List[int] = Field(..., description="Requested IDs that do not exist or were deleted")
+
+
+class ConsultationSummaryBatchResponse(ConsultationBatchResponse):
+    """Batch fetch response with fields=summary."""
+    consultations: List[ConsultationSummary]
+
+
+# Change Feed Schemas
+class ConsultationChangesResponse(BaseModel):
+    """Consultations changed since a change feed position."""
+    seq: int = Field(..., description="Position to pass as since= next time")
+    consultations: List[ConsultationResponse] = Field(..., description="Created or updated consultations, current state")
+    deleted: List[int] = Field(..., description="IDs of deleted consultations")
+    total: Optional[int] = Field(None, description="Total consultations")
+    has_more: bool = Field(False, description="True when more changes are pending after seq")
+
+
+class ConsultationSummaryChangesResponse(ConsultationChangesResponse):
+    """Change feed response with fields=summary."""
+    consultations: List[ConsultationSummary]
+
+
+# Bulk Import Schemas
+class ImportErrorDetail(BaseModel):
+    """A row that could not be imported."""
+    row: int = Field(..., description="1-based line (NDJSON) or row (CSV, header is row 1) number")
+    error: str
+
+
+class ImportReport(BaseModel):
+    """Result of a bulk consultation import."""
+    total: int = 0
+    inserted: int = 0
+    failed: int = 0
+    errors: List[ImportErrorDetail] = []
+    errors_truncated: bool = Field(False, description="True when more errors occurred than are listed")
+    elapsed_seconds: float = 0.0
+
+
+class BulkDeleteResponse(BaseModel):
+    """Result of a bulk consultation delete."""
+    deleted: int = Field(..., description="Consultations deleted by this request")
+
+
+# Search Schemas
+class DiagnosisSearchHit(DiagnosisCodeResponse):
+    """Full-text search hit for a diagnosis code."""
+    snippet: str = Field(..., description="HTML-escaped description with matches wrapped in <mark> tags")
+    score: float = Field(..., description="Relevance score (higher is better)")
+
+
+class ConsultationSearchHit(BaseModel):
+    """Full-text search hit for a consultation."""
+    id: int
+    patient_name: str
+    diagnosis_codes: List[str]
+    consultation_date: datetime
+    snippet: str = Field(..., description="HTML-escaped excerpt with matches wrapped in <mark> tags")
+    score: float = Field(..., description="Relevance score (higher is better)")
+
+
+class SearchResponse(BaseModel):
+    """Response schema for full-text search."""
+    query: str
+    diagnosis_codes: List[DiagnosisSearchHit] = []
+    consultations: List[ConsultationSearchHit] = []
+
+
+# Cache Schemas
+class CacheStatsResponse(BaseModel):
+    """Counters of the consultation result cache."""
+    backend: str = Field(..., description="memory or redis")
+    entries: Optional[int] = Field(None, description="Cached entries (memory backend only)")
+    max_entries: Optional[int] = None
+    ttl_seconds: float
+    hits: int
+    misses: int
+    evictions: Optional[int] = Field(None, description="Entries dropped by the LRU bound (memory backend only)")
+    expirations: Optional[int] = Field(None, description="Entries dropped after their TTL (memory backend only)")
+    hit_ratio: float = Field(..., description="hits / (hits + misses)")
 
 
 # Error Schemas
@@ -0,0 +1,82 @@
+"""Lean JSON serialization for the list and search endpoints.
+
+Returning ORM objects from a route makes FastAPI build one Pydantic model
+per row, validate it against ``response_model``, convert it back to plain
+Python objects and only then encode it with the stdlib ``json`` module. A
+500-row page pays for identity-map entities, 500 models and three passes
+over the data.
+
+These endpoints select plain column tuples instead, turn them into dicts
+and encode them once with orjson. The rows already have the declared types
+because they come straight from typed columns, so nothing is re-validated.
+Routes keep their ``response_model`` for the OpenAPI schema; returning a
+``Response`` makes FastAPI skip it at runtime.
+"""
+
+from typing import Iterable, List, Optional, Sequence
+
+import orjson
+from fastapi.responses import Response
+from sqlalchemy import func
+
+from models import Consultation
+
+CONSULTATION_FIELDS = (
+    "id",
+    "patient_name",
+    "diagnosis_codes",
+    "treatment_notes",
+    "consultation_date",
+    "created_at",
+)
+CONSULTATION_COLUMNS = tuple(getattr(Consultation, field) for field in CONSULTATION_FIELDS)
+
+# fields=summary: list rows with a preview instead of the full notes. The
+# preview and length are computed in SQL, so the database still reads every
+# row's full notes (including overflow pages); what shrinks is the data
+# fetched into Python, encoded and sent.
+NOTES_PREVIEW_LENGTH = 120
+SUMMARY_FIELDS = (
+    "id",
+    "patient_name",
+    "diagnosis_codes",
+    "notes_preview",
+    "notes_truncated",
+    "consultation_date",
+    "created_at",
+)
+SUMMARY_COLUMNS = (
+    Consultation.id,
+    Consultation.patient_name,
+    Consultation.diagnosis_codes,
+    func.substr(Consultation.treatment_notes, 1, NOTES_PREVIEW_LENGTH).label("notes_preview"),
+    (func.length(Consultation.treatment_notes) > NOTES_PREVIEW_LENGTH).label("notes_truncated"),
+    Consultation.consultation_date,
+    Consultation.created_at,
+)
+PROJECTIONS = {
+    "full": (CONSULTATION_COLUMNS, CONSULTATION_FIELDS),
+    "summary": (SUMMARY_COLUMNS, SUMMARY_FIELDS),
+}
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def dumps(content) -> bytes:
+    """Encode ``content`` as JSON (datetimes as ISO 8601, like Pydantic)."""
+    return orjson.dumps(content)
+
+
+def rows_to_dicts(rows: Iterable[Sequence], fields: Sequence[str] = CONSULTATION_FIELDS) -> List[dict]:
+    """Pair each row tuple with ``fields``."""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def json_response(content, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """Serialize ``content`` with orjson into a ready-made response."""
+    return Response(
+        content=dumps(content),
+        status_code=status_code,
+        headers=headers,
+        media_type=JSON_MEDIA_TYPE
+    )
@@ -0,0 +1,60 @@
+"""Shared fixtures: every test run gets its own throwaway SQLite file."""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+
+_DB_DIR = tempfile.mkdtemp(prefix="cliniccare-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from migrations import run_migrations  # noqa: E402
+from models import DiagnosisCode  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with SessionLocal() as db:
+        db.add(DiagnosisCode(code="A09", description="Infectious gastroenteritis and colitis, unspecified"))
+        db.commit()
+    yield
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def get_concurrently(app, paths, timeout=10.0):
+    """GET every path at once on one event loop; fail instead of hanging
+    if the loop gets stuck."""
+    import httpx
+
+    async def fetch_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get(path) for path in paths))
+
+    outcome = {}
+
+    def run():
+        outcome["responses"] = asyncio.run(fetch_all())
+
+    # A blocked loop never times out its own awaits, so watch it from outside
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), f"Requests still running after {timeout} s"
+    return outcome["responses"]
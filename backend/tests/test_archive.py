@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from archive import archive_consultations, find_archived_consultation
+from database import SessionLocal
+from export import merge_archived_rows
+from models import Consultation
+
+
+def test_archived_ids_are_not_reused(db, tmp_path):
+    old = Consultation(
+        patient_name="Archie Old", diagnosis_codes=["A09"], treatment_notes="Fluids",
+        consultation_date=datetime(2000, 1, 15)
+    )
+    db.add(old)
+    db.commit()
+    old_id = old.id
+
+    # The archived row held the highest id in the hot table
+    assert archive_consultations(SessionLocal, str(tmp_path), datetime(2000, 2, 1)) == 1
+    db.expire_all()
+    assert db.get(Consultation, old_id) is None
+
+    new = Consultation(patient_name="Nina New", diagnosis_codes=["A09"], treatment_notes="Rest")
+    db.add(new)
+    db.commit()
+    assert new.id > old_id
+
+    archived = find_archived_consultation(db, str(tmp_path), old_id)
+    assert archived["patient_name"] == "Archie Old"
+
+
+def test_merge_emits_each_id_once():
+    hot = [
+        {"id": 1, "consultation_date": datetime(2000, 1, 1)},
+        # Left behind by an interrupted archival run, then re-dated
+        {"id": 2, "consultation_date": datetime(2000, 3, 1)},
+    ]
+    archived = [
+        {"id": 2, "consultation_date": datetime(2000, 1, 2)},
+        {"id": 3, "consultation_date": datetime(2000, 1, 3)},
+    ]
+    assert [row["id"] for row in merge_archived_rows(hot, archived)] == [1, 2, 3]
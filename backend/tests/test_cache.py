@@ -0,0 +1,57 @@
+from fastapi.testclient import TestClient
+
+from cache import result_cache
+from main import app
+
+LIST_PARAMS = {"limit": 500, "include_total": True}
+
+
+def _reader():
+    # A client without the last-write cookie reads through the cache
+    return TestClient(app)
+
+
+def _list(params=LIST_PARAMS):
+    response = _reader().get("/api/consultations", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_writes_invalidate_cached_reads():
+    writer = TestClient(app)
+    before = _list()
+    hits = result_cache.hits
+    assert _list() == before
+    assert result_cache.hits == hits + 1
+
+    created = writer.post("/api/consultation", json={
+        "patient_name": "Cary Cache",
+        "diagnosis_codes": ["A09"],
+        "treatment_notes": "Fluids",
+    }).json()["id"]
+    after_create = _list()
+    assert created in {item["id"] for item in after_create["consultations"]}
+    assert after_create["total"] == before["total"] + 1
+
+    # The single consultation is cached, then dropped by its delete
+    assert _reader().get(f"/api/consultation/{created}").status_code == 200
+    hits = result_cache.hits
+    assert _reader().get(f"/api/consultation/{created}").status_code == 200
+    assert result_cache.hits == hits + 1
+    assert writer.delete(f"/api/consultation/{created}").status_code == 204
+    assert _reader().get(f"/api/consultation/{created}").status_code == 404
+    after_delete = _list()
+    assert created not in {item["id"] for item in after_delete["consultations"]}
+    assert after_delete["total"] == before["total"]
+
+    # Bulk deletes bump the list generation too
+    second = writer.post("/api/consultation", json={
+        "patient_name": "Cary Cache",
+        "diagnosis_codes": ["A09"],
+        "treatment_notes": "Rest",
+    }).json()["id"]
+    assert second in {item["id"] for item in _list()["consultations"]}
+    assert _reader().get(f"/api/consultation/{second}").status_code == 200
+    assert writer.delete("/api/consultations", params={"ids": [second]}).json() == {"deleted": 1}
+    assert second not in {item["id"] for item in _list()["consultations"]}
+    assert _reader().get(f"/api/consultation/{second}").status_code == 404
@@ -0,0 +1,71 @@
+from fastapi.testclient import TestClient
+
+import config
+from main import app
+
+
+def _create(client, name):
+    response = client.post("/api/consultation", json={
+        "patient_name": name,
+        "diagnosis_codes": ["A09"],
+        "treatment_notes": "Fluids",
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _changes(client, **params):
+    return client.get("/api/consultations/changes", params=params)
+
+
+def test_changes_since_a_position():
+    client = TestClient(app)
+    start = _changes(client).json()
+    assert (start["consultations"], start["deleted"]) == ([], [])
+
+    kept = _create(client, "Felix Feed")
+    gone = _create(client, "Fiona Feed")
+    assert client.delete(f"/api/consultation/{gone}").status_code == 204
+
+    delta = _changes(client, since=start["seq"]).json()
+    assert delta["seq"] > start["seq"]
+    assert [item["id"] for item in delta["consultations"]] == [kept]
+    assert delta["deleted"] == [gone]
+    assert delta["has_more"] is False
+
+    # Nothing new after the returned position
+    caught_up = _changes(client, since=delta["seq"]).json()
+    assert caught_up["seq"] == delta["seq"]
+    assert (caught_up["consultations"], caught_up["deleted"]) == ([], [])
+
+    # Pages of one change continue from each returned seq
+    first = _changes(client, since=start["seq"], limit=1).json()
+    assert first["has_more"] is True
+    assert start["seq"] < first["seq"] < delta["seq"]
+
+    # A position the feed never reached cannot be resumed
+    assert _changes(client, since=delta["seq"] + 1000).status_code == 410
+
+
+def test_stream_starts_after_since_or_last_event_id(monkeypatch):
+    # End each stream after its first check instead of holding it open
+    monkeypatch.setattr(config, "CHANGE_STREAM_SECONDS", 0)
+    client = TestClient(app)
+    since = _changes(client).json()["seq"]
+    created = _create(client, "Stella Stream")
+    seq = _changes(client).json()["seq"]
+
+    response = client.get("/api/consultations/stream", params={"since": since})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert f"id: {seq}\nevent: changes\n" in response.text
+    assert f'"id":{created}' in response.text
+
+    # A reconnecting EventSource resumes from Last-Event-ID, not since
+    response = client.get(
+        "/api/consultations/stream", params={"since": since}, headers={"Last-Event-ID": str(seq)}
+    )
+    assert response.status_code == 200
+    assert "event: changes" not in response.text
+
+    assert client.get("/api/consultations/stream", params={"since": seq + 1000}).status_code == 410
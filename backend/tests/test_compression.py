@@ -0,0 +1,65 @@
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from compression import CompressionMiddleware
+from http_cache import etag_matches, make_etag
+from main import app as clinic_app
+
+ETAG = make_etag("v1")
+BIG = b"[" + b",".join(b'{"code":"A09","n":%d}' % n for n in range(200)) + b"]"
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, encodings=["gzip"], minimum_size=1400)
+
+    @app.get("/big")
+    def big(request: Request):
+        if etag_matches(request.headers.get("if-none-match"), ETAG):
+            return Response(status_code=304, headers={"ETag": ETAG})
+        return Response(BIG, media_type="application/json", headers={"ETag": ETAG})
+
+    @app.get("/small")
+    def small():
+        return Response(b'{"ok":true}', media_type="application/json")
+
+    return app
+
+
+def test_large_json_is_gzipped_with_a_weak_etag():
+    client = TestClient(_app())
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.headers["etag"] == "W/" + ETAG
+    assert response.content == BIG
+    assert int(response.headers["content-length"]) < len(BIG)
+
+    # The weak tag revalidates the same resource
+    revalidated = client.get("/big", headers={
+        "Accept-Encoding": "gzip",
+        "If-None-Match": response.headers["etag"],
+    })
+    assert revalidated.status_code == 304
+    assert "content-encoding" not in revalidated.headers
+    assert revalidated.content == b""
+
+
+def test_small_or_unaccepted_responses_are_sent_as_is():
+    client = TestClient(_app())
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    identity = client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] == ETAG
+
+
+def test_diagnosis_search_revalidates_with_the_weak_etag():
+    client = TestClient(clinic_app)
+    response = client.get("/api/diagnosis", params={"search": "A09"})
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert client.get(
+        "/api/diagnosis", params={"search": "A09"}, headers={"If-None-Match": "W/" + etag}
+    ).status_code == 304
@@ -0,0 +1,17 @@
+from fastapi.testclient import TestClient
+
+from conftest import get_concurrently
+from diagnosis_index import diagnosis_index
+from main import app
+
+
+def test_concurrent_searches_share_one_reload():
+    # With the version stamp cached, every request reaches the reload at once
+    assert TestClient(app).get("/api/diagnosis").status_code == 200
+    diagnosis_index.invalidate()
+
+    responses = get_concurrently(app, ["/api/diagnosis?search=a09"] * 5)
+
+    assert [response.status_code for response in responses] == [200] * 5
+    assert all(response.json()[0]["code"] == "A09" for response in responses)
+    assert not diagnosis_index.stale
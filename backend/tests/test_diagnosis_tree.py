@@ -0,0 +1,57 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import get_concurrently
+from diagnosis_tree import DiagnosisTree, _Tree, diagnosis_tree
+from icd10 import BLOCKS, classify
+from main import app
+
+
+@pytest.mark.parametrize("code, chapter, block", [
+    ("A09", 1, "A00-A09"),
+    ("E11.9", 4, "E08-E13"),
+    ("J06.9", 10, "J00-J06"),
+    ("C7A.00", 2, "C7A-C7A"),
+    ("C80.1", 2, "C76-C80"),
+    ("D3A.00", 2, "D3A-D3A"),
+    ("D40.0", 2, "D37-D48"),
+    ("I1A.0", 9, "I10-I1A"),
+    ("M1A.00", 13, "M05-M14"),
+    ("Z3A.20", 21, "Z30-Z39"),
+    ("U07.1", 22, "U00-U49"),
+])
+def test_classify_places_codes_in_their_block(code, chapter, block):
+    assert classify(code)[:2] == (chapter, block)
+
+
+def test_every_block_lies_in_one_chapter():
+    for block in BLOCKS:
+        first, last = classify(block.first), classify(block.last)
+        assert first.block == last.block == block.key
+        assert first.chapter == last.chapter is not None
+
+
+def test_browse_reports_the_usage_of_the_opened_node():
+    codes = ["A09", "A04.72", "E11.9", "E10.9"]
+    rows = [(code, code, *classify(code)) for code in codes]
+    tree = DiagnosisTree()
+    tree._tree = _Tree(rows, {"A09": 2, "A04.72": 1, "E11.9": 5, "E10.9": 1})
+
+    assert tree.browse()["usage"] == 9
+    assert tree.browse("4")["usage"] == 6
+    opened = tree.browse("A00-A09")
+    assert opened["usage"] == 3
+    assert [node["key"] for node in opened["path"]] == ["1"]
+    assert [child["key"] for child in opened["children"]] == ["A04", "A09"]
+
+
+def test_concurrent_browses_share_one_reload():
+    # With the version stamp cached, every request reaches the reload at once
+    assert TestClient(app).get("/api/diagnosis/tree").status_code == 200
+    diagnosis_tree.invalidate()
+
+    responses = get_concurrently(app, ["/api/diagnosis/tree?node=A00-A09"] * 5)
+
+    assert [response.status_code for response in responses] == [200] * 5
+    assert all(response.json()["node"]["key"] == "A00-A09" for response in responses)
+    assert not diagnosis_tree.needs_load()
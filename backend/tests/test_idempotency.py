@@ -0,0 +1,57 @@
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER
+from database import async_engine
+from main import app
+from models import Consultation
+
+
+def _count(db, name):
+    return db.scalar(select(func.count()).where(Consultation.patient_name == name))
+
+
+def _consultation(name, notes="Oral rehydration"):
+    return {"patient_name": name, "diagnosis_codes": ["A09"], "treatment_notes": notes}
+
+
+def test_retry_with_the_same_key_replays_the_first_response(db):
+    client = TestClient(app)
+    headers = {IDEMPOTENCY_HEADER: "retry-1"}
+    first = client.post("/api/consultation", json=_consultation("Rita Retry"), headers=headers)
+    assert first.status_code == 201
+    assert REPLAYED_HEADER not in first.headers
+
+    again = client.post("/api/consultation", json=_consultation("Rita Retry"), headers=headers)
+    assert again.status_code == 201
+    assert again.headers[REPLAYED_HEADER] == "true"
+    assert again.json() == first.json()
+    assert _count(db, "Rita Retry") == 1
+
+    # The same key cannot be reused for a different consultation
+    other = client.post("/api/consultation", json=_consultation("Rita Retry", "Rest"), headers=headers)
+    assert other.status_code == 422
+    assert _count(db, "Rita Retry") == 1
+
+
+def test_concurrent_requests_with_one_key_create_one_consultation(db):
+    async def post_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(
+                client.post("/api/consultation", json=_consultation("Cora Concurrent"),
+                            headers={IDEMPOTENCY_HEADER: "race-1"})
+                for _ in range(5)
+            ))
+            # Close the pooled connections before their event loop goes away
+            await async_engine.dispose()
+            return responses
+
+    responses = asyncio.run(post_all())
+    assert {response.status_code for response in responses} == {201}
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert sum(REPLAYED_HEADER in response.headers for response in responses) == 4
+    assert _count(db, "Cora Concurrent") == 1
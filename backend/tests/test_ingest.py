@@ -0,0 +1,20 @@
+import io
+
+from ingest import ingest_consultations, iter_csv
+
+
+def test_csv_row_with_extra_fields_is_reported_not_raised(db):
+    stream = io.StringIO(
+        "patient_name,diagnosis_codes,treatment_notes\n"
+        "Ada Lovelace,A09,Fluids\n"
+        "Grace Hopper,A09,Rest,unexpected\n"
+        "Alan Turing,A09,Review in a week\n"
+    )
+
+    report = ingest_consultations(db, iter_csv(stream), batch_size=2)
+
+    assert report.total == 3
+    assert report.inserted == 2
+    assert report.failed == 1
+    assert [error.row for error in report.errors] == [3]
+    assert "more field" in report.errors[0].error
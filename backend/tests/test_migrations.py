@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+
+from database import Base
+from migrations import run_migrations
+from pagination import decode_cursor, encode_cursor
+
+# consultations as created before consultation_date was NOT NULL
+LEGACY_CONSULTATIONS = """
+CREATE TABLE consultations (
+    id INTEGER NOT NULL,
+    patient_name VARCHAR(255) NOT NULL,
+    diagnosis_codes JSON NOT NULL,
+    treatment_notes TEXT NOT NULL,
+    consultation_date DATETIME,
+    created_at DATETIME,
+    PRIMARY KEY (id)
+)
+"""
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(LEGACY_CONSULTATIONS))
+        conn.execute(text(
+            "INSERT INTO consultations (patient_name, diagnosis_codes, treatment_notes, "
+            "consultation_date, created_at) VALUES "
+            "('Ada Lovelace', '[\"A09\"]', 'Fluids', NULL, '2024-01-02 03:04:05.000000'), "
+            "('Alan Turing', '[]', 'Rest', NULL, NULL)"
+        ))
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def test_undated_consultations_are_backfilled_and_rejected(legacy_engine):
+    run_migrations(legacy_engine)
+    run_migrations(legacy_engine)
+
+    with legacy_engine.begin() as conn:
+        dates = conn.execute(text("SELECT id, consultation_date FROM consultations ORDER BY id")).all()
+        assert dates[0].consultation_date == "2024-01-02 03:04:05.000000"
+        assert dates[1].consultation_date is not None
+        # Every row can end a page
+        for row_id, consultation_date in dates:
+            sort_value = datetime.fromisoformat(consultation_date)
+            assert decode_cursor(encode_cursor(sort_value, row_id)) == (sort_value, row_id)
+
+    with pytest.raises(IntegrityError):
+        with legacy_engine.begin() as conn:
+            conn.execute(text("UPDATE consultations SET consultation_date = NULL WHERE id = 1"))
+    with pytest.raises(IntegrityError):
+        with legacy_engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO consultations (patient_name, diagnosis_codes, treatment_notes) "
+                "VALUES ('Grace Hopper', '[]', 'Review')"
+            ))
+
+
+def test_consultation_ids_are_never_reused(legacy_engine):
+    run_migrations(legacy_engine)
+    run_migrations(legacy_engine)
+
+    with legacy_engine.begin() as conn:
+        ddl = conn.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'consultations'"
+        )).scalar()
+        assert "AUTOINCREMENT" in ddl
+        # Indexes and triggers were recreated on the rebuilt table
+        assert conn.execute(text(
+            "SELECT count(*) FROM sqlite_master WHERE name = 'ix_consultations_live_date_id'"
+        )).scalar() == 1
+        assert conn.execute(text(
+            "SELECT count(*) FROM sqlite_master WHERE name = 'consultations_fts_ai'"
+        )).scalar() == 1
+
+        conn.execute(text("DELETE FROM consultations WHERE id = 2"))
+        conn.execute(text(
+            "INSERT INTO consultations (patient_name, diagnosis_codes, treatment_notes, "
+            "consultation_date) VALUES ('Grace Hopper', '[]', 'Review', '2024-02-03 00:00:00.000000')"
+        ))
+        assert conn.execute(text(
+            "SELECT id FROM consultations WHERE patient_name = 'Grace Hopper'"
+        )).scalar() == 3
@@ -0,0 +1,51 @@
+from fastapi.testclient import TestClient
+
+from main import app
+
+
+def _walk(client, limit):
+    """Every page of the list, following next_cursor."""
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit, "include_total": True}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/consultations", params=params)
+        assert response.status_code == 200
+        body = response.json()
+        pages.append(body)
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_cursor_pages_split_rows_with_the_same_date():
+    client = TestClient(app)
+    created = []
+    for n in range(5):
+        response = client.post("/api/consultation", json={
+            "patient_name": f"Tess Tie {n}",
+            "diagnosis_codes": ["A09"],
+            "treatment_notes": "Same slot",
+            "consultation_date": "1995-03-04T10:00:00",
+        })
+        assert response.status_code == 201
+        created.append(response.json()["id"])
+
+    pages = _walk(client, limit=2)
+    rows = [item for page in pages for item in page["consultations"]]
+    ids = [item["id"] for item in rows]
+
+    # No row is skipped or repeated across page boundaries
+    assert len(ids) == len(set(ids)) == pages[0]["total"]
+    assert set(created) <= set(ids)
+    assert all(len(page["consultations"]) == 2 for page in pages[:-1])
+    # Newest first; equal dates fall back to the id
+    keys = [(item["consultation_date"], item["id"]) for item in rows]
+    assert keys == sorted(keys, reverse=True)
+    assert [i for i in ids if i in created] == sorted(created, reverse=True)
+
+
+def test_malformed_cursor_is_rejected():
+    response = TestClient(app).get("/api/consultations", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
@@ -0,0 +1,23 @@
+from urllib.parse import quote
+
+from fastapi.testclient import TestClient
+
+from main import app
+
+
+def test_timeline_of_a_name_with_a_slash():
+    client = TestClient(app)
+    name = "Jean-Luc Picard/Locutus"
+    created = client.post("/api/consultation", json={
+        "patient_name": name,
+        "diagnosis_codes": ["A09"],
+        "treatment_notes": "Assimilation reversed",
+    })
+    assert created.status_code == 201
+
+    # Encoded like the frontend's encodeURIComponent
+    response = client.get(f"/api/patients/{quote(name, safe='')}/consultations")
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["id"] for item in body["consultations"]] == [created.json()["id"]]
+    assert body["total"] == 1
@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import read_routing
+from cache import result_cache
+from database import engine
+from main import app
+
+
+class LaggingReplica:
+    """An async session factory reading a copy of the primary taken on ``sync``."""
+
+    def __init__(self, path):
+        self.path = path
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        self.sessions = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        self.sync()
+
+    def sync(self):
+        source = engine.raw_connection()
+        target = sqlite3.connect(self.path)
+        try:
+            source.driver_connection.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+    def __call__(self):
+        return self.sessions()
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    replica = LaggingReplica(tmp_path / "replica.db")
+    monkeypatch.setattr(read_routing, "has_read_pool", True)
+    monkeypatch.setattr(read_routing, "reads_from_replica", True)
+    monkeypatch.setattr(read_routing, "AsyncReadSessionLocal", replica)
+    result_cache.clear()
+    yield replica
+    result_cache.clear()
+
+
+def _listed_ids(client):
+    response = client.get("/api/consultations", params={"include_total": False})
+    assert response.status_code == 200
+    return {item["id"] for item in response.json()["consultations"]}
+
+
+def test_writer_reads_its_write_despite_replica_lag_and_cache(replica):
+    writer = TestClient(app)
+    reader = TestClient(app)
+
+    created = writer.post("/api/consultation", json={
+        "patient_name": "Ada Lovelace",
+        "diagnosis_codes": ["A09"],
+        "treatment_notes": "Oral rehydration",
+    })
+    assert created.status_code == 201
+    assert read_routing.LAST_WRITE_COOKIE in writer.cookies
+    new_id = created.json()["id"]
+
+    # Another client reads the lagging replica first
+    assert new_id not in _listed_ids(reader)
+    assert reader.get(f"/api/consultation/{new_id}").status_code == 404
+
+    # The writer still sees its consultation, from the primary
+    assert new_id in _listed_ids(writer)
+    assert writer.get(f"/api/consultation/{new_id}").status_code == 200
+
+    # The stale replica page was not cached for anyone else either
+    replica.sync()
+    assert new_id in _listed_ids(reader)
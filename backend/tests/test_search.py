@@ -0,0 +1,26 @@
+from fastapi.testclient import TestClient
+
+from main import app
+
+
+def test_snippets_escape_stored_markup():
+    client = TestClient(app)
+    created = client.post("/api/consultation", json={
+        "patient_name": "Bob <b>x</b>",
+        "diagnosis_codes": ["A09"],
+        "treatment_notes": "Zebrafish <script>alert(1)</script> exposure",
+    })
+    assert created.status_code == 201
+
+    by_name = client.get("/api/search", params={"q": "bob"}).json()
+    by_notes = client.get("/api/search", params={"q": "zebrafish"}).json()
+
+    snippets = [
+        hit["snippet"]
+        for result in (by_name, by_notes)
+        for hit in result["consultations"]
+        if hit["id"] == created.json()["id"]
+    ]
+    assert "<mark>Bob</mark> &lt;b&gt;x&lt;/b&gt;" in snippets
+    assert any("<mark>Zebrafish</mark> &lt;script&gt;" in snippet for snippet in snippets)
+    assert not any("<b>" in snippet or "<script>" in snippet for snippet in snippets)
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from database import AsyncSessionLocal, async_engine
+from main import app
+from models import Consultation
+from retention import purge_deleted_consultations
+
+MAY_1990 = {"start": "1990-05-01T00:00:00", "end": "1990-06-01T00:00:00"}
+
+
+def _create(client, name, day):
+    response = client.post("/api/consultation", json={
+        "patient_name": name,
+        "diagnosis_codes": ["A09"],
+        "treatment_notes": "Fluids",
+        "consultation_date": f"1990-05-{day:02d}T09:00:00",
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _purge(batch_size):
+    async def purge():
+        async with AsyncSessionLocal() as db:
+            purged = await purge_deleted_consultations(db, datetime.utcnow(), batch_size)
+        # Close the pooled connections before their event loop goes away
+        await async_engine.dispose()
+        return purged
+
+    return asyncio.run(purge())
+
+
+def test_deleted_consultations_are_hidden_then_purged_in_batches(db):
+    client = TestClient(app)
+    first, second, third = (_create(client, f"Della Delete {day}", day) for day in (1, 2, 3))
+    kept = _create(client, "Della Delete kept", 20)
+
+    assert client.delete(f"/api/consultation/{first}").status_code == 204
+    assert client.get(f"/api/consultation/{first}").status_code == 404
+    assert client.delete(f"/api/consultation/{first}").status_code == 404
+
+    # Already deleted rows are not counted again
+    response = client.delete("/api/consultations", params={**MAY_1990, "end": "1990-05-10T00:00:00"})
+    assert response.json() == {"deleted": 2}
+    assert client.delete("/api/consultations", params={"ids": [second, third]}).json() == {"deleted": 0}
+    assert client.delete("/api/consultations").status_code == 400
+
+    listed = client.get("/api/patients/Della Delete kept/consultations").json()["consultations"]
+    assert [item["id"] for item in listed] == [kept]
+
+    # Soft-deleted rows stay in the table until the purge
+    ids = {first, second, third, kept}
+    assert set(db.scalars(select(Consultation.id).where(Consultation.id.in_(ids)))) == ids
+
+    assert _purge(batch_size=1) >= 3
+    db.expire_all()
+    assert set(db.scalars(select(Consultation.id).where(Consultation.id.in_(ids)))) == {kept}
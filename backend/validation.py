@@ -0,0 +1,30 @@
+"""Set-based validation helpers shared by the consultation write paths."""
+
+from typing import Iterable, List
+
+from sqlalchemy.orm import Session
+
+from models import DiagnosisCode
+
+
+def find_invalid_diagnosis_codes(db: Session, codes: Iterable[str]) -> List[str]:
+    """Return the codes that do not exist, checked with a single query.
+    
+    The result keeps submission order and lists each invalid code once.
+    """
+    unique_codes = list(dict.fromkeys(codes))
+    if not unique_codes:
+        return []
+    
+    valid = {
+        code for (code,) in db.query(DiagnosisCode.code)
+        .filter(DiagnosisCode.code.in_(unique_codes))
+    }
+    return [code for code in unique_codes if code not in valid]
+
+
+def invalid_codes_message(invalid_codes: List[str]) -> str:
+    """Error message listing every invalid code."""
+    if len(invalid_codes) == 1:
+        return f"Invalid diagnosis code: {invalid_codes[0]}"
+    return f"Invalid diagnosis codes: {', '.join(invalid_codes)}"
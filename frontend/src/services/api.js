@@ -4,6 +4,8 @@ import axios from 'axios'
 const api = axios.create({
   baseURL: 'http://localhost:8000',
   timeout: 10000,
+  // Sends the last-write cookie, so reads right after a write see it
+  withCredentials: true,
   headers: {
     'Content-Type': 'application/json'
   }
@@ -31,16 +33,55 @@ api.interceptors.response.use(
   }
 )
 
+// Diagnosis lookups are cached by search term. Results within their
+// Cache-Control max-age are served from memory; older ones are revalidated
+// with If-None-Match, so an unchanged code table only costs a 304.
+const DIAGNOSIS_CACHE_LIMIT = 200
+const diagnosisCache = new Map()
+
+const maxAgeMs = (cacheControl) => {
+  const match = /max-age=(\d+)/.exec(cacheControl || '')
+  return match ? Number(match[1]) * 1000 : 0
+}
+
+const rememberDiagnosisResult = (key, entry) => {
+  diagnosisCache.delete(key)
+  diagnosisCache.set(key, entry)
+  if (diagnosisCache.size > DIAGNOSIS_CACHE_LIMIT) {
+    // Maps iterate in insertion order: drop the least recently stored term
+    diagnosisCache.delete(diagnosisCache.keys().next().value)
+  }
+}
+
 /**
  * Search ICD-10 diagnosis codes
  * @param {string} searchTerm - Search term for code or description
  * @returns {Promise<Array>} Array of diagnosis codes
  */
 export const searchDiagnosisCodes = async (searchTerm = '') => {
+  const key = searchTerm.trim().toLowerCase()
+  const cached = diagnosisCache.get(key)
+  if (cached && Date.now() < cached.expiresAt) {
+    return cached.data
+  }
+
   try {
     const response = await api.get('/api/diagnosis', {
-      params: { search: searchTerm }
+      params: { search: searchTerm },
+      headers: cached ? { 'If-None-Match': cached.etag } : {},
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304
     })
+    const expiresAt = Date.now() + maxAgeMs(response.headers['cache-control'])
+
+    if (response.status === 304) {
+      rememberDiagnosisResult(key, { ...cached, expiresAt })
+      return cached.data
+    }
+
+    const etag = response.headers.etag
+    if (etag) {
+      rememberDiagnosisResult(key, { etag, data: response.data, expiresAt })
+    }
     return response.data
   } catch (error) {
     console.error('Error searching diagnosis codes:', error)
@@ -48,35 +89,80 @@ export const searchDiagnosisCodes = async (searchTerm = '') => {
   }
 }
 
+/**
+ * Browse the ICD-10 hierarchy (chapter, block, category, code)
+ * @param {string|null} node - key of the node to open; null lists the chapters
+ * @returns {Promise<Object>} Object with node, path (ancestors), usage and children
+ */
+export const browseDiagnosisTree = async (node = null) => {
+  try {
+    const response = await api.get('/api/diagnosis/tree', {
+      params: node ? { node } : {}
+    })
+    return response.data
+  } catch (error) {
+    console.error('Error browsing diagnosis codes:', error)
+    throw error
+  }
+}
+
+// Attempts per create when no response arrives (timeout, network error)
+const CREATE_ATTEMPTS = 3
+
 /**
  * Create a new consultation
  * @param {Object} consultationData - Consultation data
  * @param {string} consultationData.patient_name - Patient's name
  * @param {Array<string>} consultationData.diagnosis_codes - Array of ICD-10 codes
  * @param {string} consultationData.treatment_notes - Treatment notes
+ * @param {string} [idempotencyKey] - Reuse the key of an earlier attempt at the same submission
  * @returns {Promise<Object>} Created consultation
  */
-export const createConsultation = async (consultationData) => {
-  try {
-    const response = await api.post('/api/consultation', consultationData)
-    return response.data
-  } catch (error) {
-    console.error('Error creating consultation:', error)
-    throw error
+export const createConsultation = async (consultationData, idempotencyKey = newIdempotencyKey()) => {
+  // Timeouts and dropped connections are retried with the same key, so the
+  // server returns the original consultation if the first attempt got through
+  for (let attempt = 1; ; attempt++) {
+    try {
+      const response = await api.post('/api/consultation', consultationData, {
+        headers: { 'Idempotency-Key': idempotencyKey }
+      })
+      return response.data
+    } catch (error) {
+      if (!error.response && attempt < CREATE_ATTEMPTS) {
+        continue
+      }
+      console.error('Error creating consultation:', error)
+      throw error
+    }
   }
 }
 
+/**
+ * Generate a key identifying one logical create request
+ * @returns {string} Random UUID
+ */
+export const newIdempotencyKey = () => crypto.randomUUID()
+
 /**
  * Get all consultations
  * @param {number} skip - Number of records to skip
  * @param {number} limit - Maximum number of records to return
- * @returns {Promise<Object>} Object containing consultations array and total count
+ * @param {Object} [options] - Keyset pagination options
+ * @param {string} [options.cursor] - next_cursor from the previous page (takes precedence over skip)
+ * @param {boolean} [options.includeTotal=true] - Whether to request the total count
+ * @param {string} [options.fields='full'] - 'summary' returns notes_preview instead of treatment_notes
+ * @returns {Promise<Object>} Object containing consultations array, total count and next_cursor
  */
-export const getConsultations = async (skip = 0, limit = 100) => {
+export const getConsultations = async (skip = 0, limit = 100, { cursor = null, includeTotal = true, fields = 'full' } = {}) => {
   try {
-    const response = await api.get('/api/consultations', {
-      params: { skip, limit }
-    })
+    const params = { skip, limit, include_total: includeTotal }
+    if (cursor) {
+      params.cursor = cursor
+    }
+    if (fields !== 'full') {
+      params.fields = fields
+    }
+    const response = await api.get('/api/consultations', { params })
     return response.data
   } catch (error) {
     console.error('Error fetching consultations:', error)
@@ -84,6 +170,61 @@ export const getConsultations = async (skip = 0, limit = 100) => {
   }
 }
 
+/**
+ * Get consultations changed since a change feed position
+ * @param {number|null} since - seq from a previous call; null returns only the current position
+ * @param {Object} [options]
+ * @param {string} [options.fields='full'] - 'summary' returns notes_preview instead of treatment_notes
+ * @param {number} [options.limit=100] - Maximum number of changes
+ * @returns {Promise<Object>} seq, changed consultations, deleted ids, total and has_more
+ */
+export const getConsultationChanges = async (since = null, { fields = 'full', limit = 100 } = {}) => {
+  try {
+    const params = { limit }
+    if (since !== null) {
+      params.since = since
+    }
+    if (fields !== 'full') {
+      params.fields = fields
+    }
+    const response = await api.get('/api/consultations/changes', { params })
+    return response.data
+  } catch (error) {
+    console.error('Error fetching consultation changes:', error)
+    throw error
+  }
+}
+
+/**
+ * Receive consultation changes as they happen (server-sent events)
+ * @param {number} since - Change feed position to start from
+ * @param {Object} handlers
+ * @param {Function} handlers.onChanges - Called with each change set (same shape as getConsultationChanges)
+ * @param {Function} [handlers.onReset] - Called when the feed cannot resume; reload the list then
+ * @param {string} [fields='full'] - 'summary' returns notes_preview instead of treatment_notes
+ * @returns {Function} Call to close the stream
+ */
+export const subscribeToConsultationChanges = (since, { onChanges, onReset }, fields = 'full') => {
+  const url = new URL('/api/consultations/stream', api.defaults.baseURL)
+  url.searchParams.set('since', since)
+  if (fields !== 'full') {
+    url.searchParams.set('fields', fields)
+  }
+
+  // EventSource reconnects by itself and resumes from the last event id
+  const source = new EventSource(url)
+  source.addEventListener('changes', (event) => {
+    onChanges(JSON.parse(event.data))
+  })
+  source.onerror = () => {
+    // CLOSED means the server refused to resume (e.g. 410 Gone)
+    if (source.readyState === EventSource.CLOSED) {
+      onReset?.()
+    }
+  }
+  return () => source.close()
+}
+
 /**
  * Get a single consultation by ID
  * @param {number} id - Consultation ID
@@ -99,6 +240,55 @@ export const getConsultation = async (id) => {
   }
 }
 
+/**
+ * Get many consultations by ID in one request
+ * @param {number[]} ids - Consultation IDs (at most 500)
+ * @param {Object} [options]
+ * @param {string} [options.fields='full'] - 'summary' returns notes_preview instead of treatment_notes
+ * @returns {Promise<Object>} Object with consultations (in the requested order) and missing IDs
+ */
+export const getConsultationsByIds = async (ids, { fields = 'full' } = {}) => {
+  try {
+    const params = new URLSearchParams()
+    ids.forEach((id) => params.append('ids', id))
+    if (fields !== 'full') {
+      params.append('fields', fields)
+    }
+    const response = await api.get('/api/consultations/batch', { params })
+    return response.data
+  } catch (error) {
+    console.error('Error fetching consultations:', error)
+    throw error
+  }
+}
+
+/**
+ * Get one patient's consultations, newest first
+ * @param {string} patientName - Patient name exactly as recorded
+ * @param {Object} [options] - Keyset pagination options
+ * @param {number} [options.limit=100] - Maximum number of records to return
+ * @param {string} [options.cursor] - next_cursor from the previous page
+ * @param {boolean} [options.includeTotal=true] - Whether to request the patient's total
+ * @param {string} [options.fields='full'] - 'summary' returns notes_preview instead of treatment_notes
+ * @returns {Promise<Object>} Object containing consultations array, total count and next_cursor
+ */
+export const getPatientConsultations = async (patientName, { limit = 100, cursor = null, includeTotal = true, fields = 'full' } = {}) => {
+  try {
+    const params = { limit, include_total: includeTotal }
+    if (cursor) {
+      params.cursor = cursor
+    }
+    if (fields !== 'full') {
+      params.fields = fields
+    }
+    const response = await api.get(`/api/patients/${encodeURIComponent(patientName)}/consultations`, { params })
+    return response.data
+  } catch (error) {
+    console.error('Error fetching patient consultations:', error)
+    throw error
+  }
+}
+
 /**
  * Delete a consultation by ID
  * @param {number} id - Consultation ID